@@ -0,0 +1,393 @@
+"""
+borrow_ledger.py
+------------------
+Ledger pinjaman saham (append-only) yang dibangun dari:
+
+- borrow_contracts.csv : Request Date, Borrower, Stock Code, Borrow Amount (shares),
+                         Borrow Price, Reimbursement Date, Status
+- return_events.csv    : Original Request Date, Borrower, Stock Code, Return Shares,
+                         Actual Return Date
+
+Posisi outstanding disimpan terindeks per kontrak, per (stock, borrower) dan per stock,
+jadi kontrak/pengembalian baru cukup update beberapa entri dict (tanpa re-agregasi
+seluruh buku pinjaman). Ledger mengingat offset byte terakhir tiap CSV; `sync()` hanya
+membaca baris yang ditambahkan setelah offset itu. Hasil `borrow_position()` langsung
+bisa menggantikan BorrPosition.xlsx di perhitungan Lendable Limit.
+"""
+
+import csv
+import os
+import threading
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+CONTRACTS_FILE = 'borrow_contracts.csv'
+RETURNS_FILE = 'return_events.csv'
+
+CONTRACT_COLUMNS = [
+    'Request Date', 'Borrower', 'Stock Code', 'Borrow Amount (shares)',
+    'Borrow Price', 'Reimbursement Date', 'Status'
+]
+RETURN_COLUMNS = [
+    'Original Request Date', 'Borrower', 'Stock Code', 'Return Shares', 'Actual Return Date'
+]
+BORROW_AMOUNT_COL = 'Borrow Amount (shares)'
+CONTRACT_KEY = ['Request Date', 'Borrower', 'Stock Code']
+
+# Status kontrak yang BELUM/TIDAK menjadi posisi pinjaman (case-insensitive)
+STATUS_PENDING = 'PENDING'
+STATUS_NOT_OUTSTANDING = {STATUS_PENDING, 'REJECTED', 'CANCELLED'}
+
+
+# ─────────────────────────────────────────────
+# HELPERS
+# ─────────────────────────────────────────────
+def _norm_stock(series):
+    return series.astype(str).str.strip().str.upper()
+
+
+def _norm_borrower(series):
+    return series.astype(str).str.strip()
+
+
+def _norm_date(series):
+    return pd.to_datetime(series, errors='coerce').dt.normalize()
+
+
+def is_outstanding_status(status_series):
+    """True untuk kontrak yang sudah jadi posisi pinjaman (bukan pending/ditolak)."""
+    return ~status_series.fillna('').astype(str).str.strip().str.upper().isin(STATUS_NOT_OUTSTANDING)
+
+
+def read_contracts(path=CONTRACTS_FILE):
+    """Baca & normalisasi borrow_contracts.csv (file kosong/tidak ada -> frame kosong)."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return pd.DataFrame(columns=CONTRACT_COLUMNS)
+    return normalise_contracts(pd.read_csv(path))
+
+
+def normalise_contracts(df):
+    """Kolom borrow_contracts.csv: tanggal dinormalisasi, kode saham huruf besar, angka numerik."""
+    df = df.copy()
+    df.columns = df.columns.str.strip()
+    df['Request Date'] = _norm_date(df['Request Date'])
+    df['Reimbursement Date'] = _norm_date(df['Reimbursement Date'])
+    df['Borrower'] = _norm_borrower(df['Borrower'])
+    df['Stock Code'] = _norm_stock(df['Stock Code'])
+    df[BORROW_AMOUNT_COL] = pd.to_numeric(df[BORROW_AMOUNT_COL], errors='coerce').fillna(0)
+    df['Borrow Price'] = pd.to_numeric(df['Borrow Price'], errors='coerce')
+    return df
+
+
+def read_returns(path=RETURNS_FILE):
+    """Baca & normalisasi return_events.csv (file kosong/tidak ada -> frame kosong)."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return pd.DataFrame(columns=RETURN_COLUMNS)
+    return normalise_returns(pd.read_csv(path))
+
+
+def normalise_returns(df):
+    """Kolom return_events.csv: tanggal dinormalisasi, kode saham huruf besar, angka numerik."""
+    df = df.copy()
+    df.columns = df.columns.str.strip()
+    df['Original Request Date'] = _norm_date(df['Original Request Date'])
+    df['Actual Return Date'] = _norm_date(df['Actual Return Date'])
+    df['Borrower'] = _norm_borrower(df['Borrower'])
+    df['Stock Code'] = _norm_stock(df['Stock Code'])
+    df['Return Shares'] = pd.to_numeric(df['Return Shares'], errors='coerce').fillna(0)
+    return df
+
+
+def _append_csv_row(path, columns, values):
+    """Tambah satu baris ke CSV (buat header kalau file belum ada/kosong)."""
+    write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(columns)
+        writer.writerow(values)
+
+
+def outstanding_by_contract(df_contracts, df_returns):
+    """Sisa lembar per kontrak (Request Date, Borrower, Stock Code), hanya yang > 0."""
+    active = df_contracts[is_outstanding_status(df_contracts['Status'])]
+    borrowed = active.groupby(CONTRACT_KEY, dropna=False)[BORROW_AMOUNT_COL].sum()
+    returned = (
+        df_returns.rename(columns={'Original Request Date': 'Request Date'})
+        .groupby(CONTRACT_KEY, dropna=False)['Return Shares'].sum()
+    )
+    outstanding = (borrowed - returned.reindex(borrowed.index, fill_value=0)).clip(lower=0)
+    return outstanding[outstanding > 0]
+
+
+# ─────────────────────────────────────────────
+# LEDGER
+# ─────────────────────────────────────────────
+class BorrowLedger:
+    """
+    State outstanding pinjaman:
+      _contracts : (request_date, borrower, stock) -> sisa lembar kontrak
+      _positions : (stock, borrower)               -> total outstanding
+      _stock     : stock                           -> total outstanding
+
+    Load awal dari CSV dilakukan vektor (groupby sekali); event berikutnya lewat
+    add_contract / add_return yang masing-masing hanya menyentuh O(1) entri.
+    Baris baru di CSV masuk lewat sync() (hanya baris setelah offset terakhir), event
+    dari aplikasi lewat record_contract / record_return.
+    """
+
+    def __init__(self):
+        self._contracts = {}
+        self._positions = {}
+        self._stock = {}
+        self.n_events = 0
+        # abspath CSV -> (offset byte sudah dibaca, header file)
+        self._offsets = {}
+        self._lock = threading.Lock()
+
+    # --- load awal ---
+    @classmethod
+    def from_frames(cls, df_contracts, df_returns):
+        ledger = cls()
+        outstanding = outstanding_by_contract(df_contracts, df_returns)
+
+        ledger._contracts = outstanding.to_dict()
+        by_pos = outstanding.groupby(level=['Stock Code', 'Borrower']).sum()
+        ledger._positions = by_pos.to_dict()
+        ledger._stock = by_pos.groupby(level='Stock Code').sum().to_dict()
+        ledger.n_events = len(df_contracts) + len(df_returns)
+        return ledger
+
+    @classmethod
+    def from_csv(cls, contracts_path=CONTRACTS_FILE, returns_path=RETURNS_FILE):
+        reader = cls()
+        df_contracts = reader._read_new_rows(contracts_path, CONTRACT_COLUMNS)
+        df_returns = reader._read_new_rows(returns_path, RETURN_COLUMNS)
+        ledger = cls.from_frames(normalise_contracts(df_contracts), normalise_returns(df_returns))
+        ledger._offsets = reader._offsets
+        return ledger
+
+    # --- baca baris CSV baru ---
+    def _read_new_rows(self, path, columns):
+        """
+        Baris lengkap setelah offset terakhir path (baris yang belum selesai ditulis
+        ditunda). None kalau file menyusut/ditulis ulang -> ledger perlu load ulang.
+        """
+        key = os.path.abspath(path)
+        offset, header = self._offsets.get(key, (0, None))
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size < offset:
+            return None
+        chunk = b''
+        if size > offset:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                chunk = f.read(size - offset)
+            chunk = chunk[:chunk.rfind(b'\n') + 1]
+        if not chunk.strip():
+            return pd.DataFrame(columns=header or columns)
+        if header is None:
+            df = pd.read_csv(BytesIO(chunk))
+            header = list(df.columns)
+        else:
+            df = pd.read_csv(BytesIO(chunk), header=None, names=header)
+        self._offsets[key] = (offset + len(chunk), header)
+        return df
+
+    def sync(self, contracts_path=CONTRACTS_FILE, returns_path=RETURNS_FILE):
+        """
+        Terapkan baris yang ditambahkan ke kedua CSV sejak sync/load terakhir, per baris
+        lewat add_contract / add_return. File yang menyusut (ditulis ulang) -> load ulang
+        penuh. Return jumlah event baru.
+        """
+        with self._lock:
+            df_contracts = self._read_new_rows(contracts_path, CONTRACT_COLUMNS)
+            df_returns = self._read_new_rows(returns_path, RETURN_COLUMNS)
+            if df_contracts is None or df_returns is None:
+                n_before = self.n_events
+                self.__dict__.update(BorrowLedger.from_csv(contracts_path, returns_path).__dict__)
+                return self.n_events - n_before
+            return self._apply_rows(df_contracts, df_returns)
+
+    def _apply_rows(self, df_contracts, df_returns):
+        n_before = self.n_events
+        df_contracts = normalise_contracts(df_contracts)
+        for date, borrower, stock, shares, status in df_contracts[
+            ['Request Date', 'Borrower', 'Stock Code', BORROW_AMOUNT_COL, 'Status']
+        ].itertuples(index=False, name=None):
+            self.add_contract(date, borrower, stock, shares, status)
+        df_returns = normalise_returns(df_returns)
+        for date, borrower, stock, shares in df_returns[
+            ['Original Request Date', 'Borrower', 'Stock Code', 'Return Shares']
+        ].itertuples(index=False, name=None):
+            self.add_return(date, borrower, stock, shares)
+        return self.n_events - n_before
+
+    # --- update incremental ---
+    def _bump(self, request_date, borrower, stock, delta):
+        key = (request_date, borrower, stock)
+        current = self._contracts.get(key, 0.0)
+        new_value = max(current + delta, 0.0)
+        applied = new_value - current
+        if new_value > 0:
+            self._contracts[key] = new_value
+        else:
+            self._contracts.pop(key, None)
+
+        pos_key = (stock, borrower)
+        self._positions[pos_key] = self._positions.get(pos_key, 0.0) + applied
+        if self._positions[pos_key] <= 0:
+            self._positions.pop(pos_key)
+        self._stock[stock] = self._stock.get(stock, 0.0) + applied
+        if self._stock[stock] <= 0:
+            self._stock.pop(stock)
+        self.n_events += 1
+        return applied
+
+    def add_contract(self, request_date, borrower, stock, shares, status=''):
+        """Kontrak baru. Kontrak pending/ditolak dicatat tapi tidak menambah posisi."""
+        request_date = pd.Timestamp(request_date).normalize()
+        borrower, stock = str(borrower).strip(), str(stock).strip().upper()
+        if str(status).strip().upper() in STATUS_NOT_OUTSTANDING:
+            self.n_events += 1
+            return 0.0
+        return self._bump(request_date, borrower, stock, float(shares))
+
+    def add_return(self, original_request_date, borrower, stock, shares):
+        """Pengembalian atas kontrak (Original Request Date, Borrower, Stock Code)."""
+        original_request_date = pd.Timestamp(original_request_date).normalize()
+        borrower, stock = str(borrower).strip(), str(stock).strip().upper()
+        return self._bump(original_request_date, borrower, stock, -float(shares))
+
+    def record_contract(self, request_date, borrower, stock, shares, price, reimbursement_date,
+                        status='', path=CONTRACTS_FILE):
+        """
+        add_contract + append baris ke borrow_contracts.csv (ledger tetap append-only).
+        Return 0.0 kalau baris ini ditunda ke sync() berikutnya (ada baris parsial di file).
+        """
+        if not self._append_row(path, CONTRACT_COLUMNS, [
+            pd.Timestamp(request_date).strftime('%Y-%m-%d'), borrower, stock, shares, price,
+            pd.Timestamp(reimbursement_date).strftime('%Y-%m-%d'), status,
+        ]):
+            return 0.0
+        return self.add_contract(request_date, borrower, stock, shares, status)
+
+    def record_return(self, original_request_date, borrower, stock, shares, actual_return_date,
+                      path=RETURNS_FILE):
+        """add_return + append baris ke return_events.csv (sama dengan record_contract)."""
+        if not self._append_row(path, RETURN_COLUMNS, [
+            pd.Timestamp(original_request_date).strftime('%Y-%m-%d'), borrower, stock, shares,
+            pd.Timestamp(actual_return_date).strftime('%Y-%m-%d'),
+        ]):
+            return 0.0
+        return self.add_return(original_request_date, borrower, stock, shares)
+
+    def _append_row(self, path, columns, values):
+        """
+        Terapkan dulu baris file ini yang belum di-sync, append satu baris, lalu geser offset
+        melewatinya supaya sync() tidak menerapkannya dua kali. Return True kalau offset
+        tergeser (baris harus diterapkan pemanggil); False -> baris dibaca sync() berikutnya.
+        """
+        with self._lock:
+            pending = self._read_new_rows(path, columns)
+            if pending is not None and len(pending):
+                empty_contracts = pd.DataFrame(columns=CONTRACT_COLUMNS)
+                empty_returns = pd.DataFrame(columns=RETURN_COLUMNS)
+                if columns == CONTRACT_COLUMNS:
+                    self._apply_rows(pending, empty_returns)
+                else:
+                    self._apply_rows(empty_contracts, pending)
+            key = os.path.abspath(path)
+            offset, header = self._offsets.get(key, (0, None))
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            _append_csv_row(path, columns, values)
+            if pending is None or offset != size:
+                return False
+            self._offsets[key] = (os.path.getsize(path), header or list(columns))
+            return True
+
+    # --- query ---
+    def outstanding(self, stock, borrower=None):
+        stock = str(stock).strip().upper()
+        if borrower is None:
+            return self._stock.get(stock, 0.0)
+        return self._positions.get((stock, str(borrower).strip()), 0.0)
+
+    def positions(self):
+        """Outstanding per (Stock Code, Borrower)."""
+        if not self._positions:
+            return pd.DataFrame(columns=['Stock Code', 'Borrower', BORROW_AMOUNT_COL])
+        s = pd.Series(self._positions)
+        s.index.names = ['Stock Code', 'Borrower']
+        return s.rename(BORROW_AMOUNT_COL).reset_index()
+
+    def borrow_position(self):
+        """[Stock Code, Borrow Position] -- pengganti agregasi BorrPosition.xlsx di LL."""
+        return pd.DataFrame({
+            'Stock Code': list(self._stock.keys()),
+            'Borrow Position': list(self._stock.values()),
+        })
+
+
+# ─────────────────────────────────────────────
+# ALOKASI PERMINTAAN PENDING
+# ─────────────────────────────────────────────
+DECISION_APPROVED = 'APPROVED'
+DECISION_PARTIAL = 'PARTIAL'
+DECISION_REJECTED = 'REJECTED'
+COL_KODE_DI_LL = 'Kode di LL'
+
+
+def pending_requests(df_contracts):
+    """Kontrak berstatus PENDING saja."""
+    status = df_contracts['Status'].fillna('').astype(str).str.strip().str.upper()
+    return df_contracts[status == STATUS_PENDING]
+
+
+def allocate_pending_requests(df_contracts, available_ll):
+    """
+    Alokasikan permintaan pending ke Available Lendable Limit per saham (first come first served).
+
+    available_ll: Series Stock Code -> Available Lendable Limit (nilai negatif dianggap 0).
+    Kode di kedua sisi dinormalisasi sama (_norm_stock); kolom 'Kode di LL' = False untuk
+    permintaan yang kodenya tidak ada di available_ll (Available LL awal dianggap 0).
+
+    Antrian prioritas = Request Date naik, lalu urutan baris di file. Daripada pop heap
+    satu-satu, antrian itu diurutkan sekali lalu dialokasikan dengan cumsum per saham:
+      approved_i = clip(avail_saham - kumulatif_sebelum_i, 0, request_i)
+    hasilnya identik dengan melayani antrian satu per satu.
+    """
+    df = pending_requests(df_contracts).copy()
+    df['_seq'] = np.arange(len(df))
+    df = df.sort_values(['Request Date', '_seq'], kind='stable', na_position='last')
+
+    avail = available_ll.groupby(_norm_stock(pd.Series(available_ll.index)).to_numpy()).sum().clip(lower=0)
+    requested = df[BORROW_AMOUNT_COL].to_numpy(dtype=float)
+    known = df['Stock Code'].isin(avail.index).to_numpy()
+    start = df['Stock Code'].map(avail).fillna(0).to_numpy(dtype=float)
+    taken_before = df.groupby('Stock Code', sort=False)[BORROW_AMOUNT_COL].cumsum().to_numpy(dtype=float) - requested
+
+    approved = np.clip(start - taken_before, 0, requested)
+    df[COL_KODE_DI_LL] = known
+    df['Available LL Awal'] = start
+    df['Approved Shares'] = approved
+    df['Rejected Shares'] = requested - approved
+    df['Sisa Available LL'] = np.maximum(start - taken_before - approved, 0)
+    df['Decision'] = np.select(
+        [approved >= requested, approved > 0],
+        [DECISION_APPROVED, DECISION_PARTIAL],
+        default=DECISION_REJECTED,
+    )
+    return df.drop(columns=['_seq']).reset_index(drop=True)
+
+
+def allocation_summary(df_alloc):
+    """Ringkasan per saham: total diminta / disetujui / ditolak dan jumlah keputusan."""
+    return df_alloc.groupby('Stock Code').agg(**{
+        'Requested': (BORROW_AMOUNT_COL, 'sum'),
+        'Approved': ('Approved Shares', 'sum'),
+        'Rejected': ('Rejected Shares', 'sum'),
+        'Requests': ('Decision', 'size'),
+    }).reset_index()
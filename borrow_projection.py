@@ -0,0 +1,110 @@
+"""
+borrow_projection.py
+------------------
+Proyeksi Borrow Position & Available Lendable Limit ke depan (N hari bursa)
+berdasarkan Reimbursement Date kontrak yang masih outstanding.
+
+Sisa lembar tiap kontrak (borrow_contracts.csv dikurangi return_events.csv) menjadi
+satu event "lembar kembali" di hari bursa pertama >= Reimbursement Date. Event
+di-bincount ke matriks (saham x hari) lalu di-cumsum per baris, jadi kurva seluruh
+saham keluar dalam satu operasi array tanpa menjalankan ulang LL per hari.
+
+Kontrak yang sudah lewat Reimbursement Date (overdue) atau tanpa tanggal dianggap
+tetap outstanding (tidak membebaskan kapasitas) dan dilaporkan terpisah.
+
+Titik awal kurva selalu Borrow Position versi ledger (total sisa lembar per saham),
+bukan Borrow Position hasil run LL -- run LL bisa memakai BorrPosition.xlsx upload,
+dan mengurangkan jadwal ledger dari angka sumber lain mencampur dua sumber.
+Selisih kedua sumber dilaporkan lewat borrow_baseline_diff.
+"""
+
+import numpy as np
+import pandas as pd
+
+from borrow_ledger import CONTRACT_KEY, outstanding_by_contract
+from ll_engine import ON_HAND_PCT, REPO_PCT, ll_arrays
+
+DEFAULT_HORIZON_DAYS = 10
+
+
+def scheduled_returns(df_contracts, df_returns):
+    """Sisa lembar per kontrak + Reimbursement Date-nya (satu baris per kontrak outstanding)."""
+    outstanding = outstanding_by_contract(df_contracts, df_returns).rename('Outstanding')
+    reimb = df_contracts.groupby(CONTRACT_KEY, dropna=False)['Reimbursement Date'].max()
+    df = outstanding.to_frame().join(reimb, how='left').reset_index()
+    return df.sort_values(['Reimbursement Date', 'Stock Code'], na_position='last').reset_index(drop=True)
+
+
+def ledger_borrow_position(df_schedule, stocks):
+    """Borrow Position versi ledger (sisa lembar semua kontrak outstanding) untuk urutan `stocks`."""
+    by_stock = df_schedule.groupby('Stock Code')['Outstanding'].sum()
+    return by_stock.reindex(stocks, fill_value=0).to_numpy(dtype=float)
+
+
+def borrow_baseline_diff(df_agg, df_schedule, tolerance=0.5):
+    """Saham yang Borrow Position run LL-nya beda dengan ledger (mis. run LL pakai BorrPosition.xlsx)."""
+    stocks = df_agg['Stock Code'].to_numpy()
+    bp_ledger = ledger_borrow_position(df_schedule, stocks)
+    bp_run = df_agg['Borrow Position'].to_numpy(dtype=float)
+    differs = np.abs(bp_run - bp_ledger) > tolerance
+    return pd.DataFrame({
+        'Stock Code': stocks[differs],
+        'Borrow Position (Run LL)': bp_run[differs],
+        'Borrow Position (Ledger)': bp_ledger[differs],
+        'Selisih': (bp_run - bp_ledger)[differs],
+    })
+
+
+def project_borrow_position(df_agg, df_schedule, as_of, n_days=DEFAULT_HORIZON_DAYS,
+                            on_hand_pct=ON_HAND_PCT, repo_pct=REPO_PCT):
+    """
+    Kurva ke depan per saham untuk hari bursa as_of .. as_of + n_days.
+
+    df_agg      : agregat LL (dipakai untuk Lendable Limit per saham)
+    df_schedule : hasil scheduled_returns(); total Outstanding per saham = titik awal kurva
+
+    Return (df_curve, df_overdue):
+      df_curve   : Stock Code, Date, Released, Borrow Position, Available Lendable Limit
+                   (hanya saham yang punya jadwal kembali di dalam horizon)
+      df_overdue : kontrak outstanding yang Reimbursement Date-nya < as_of atau kosong
+                   (dibandingkan dengan tanggal as_of sendiri, bukan hari bursa pertama --
+                   kontrak jatuh tempo akhir pekan >= as_of belum overdue)
+    """
+    as_of = pd.Timestamp(as_of).normalize()
+    days = pd.bdate_range(as_of, periods=n_days + 1)
+    stocks = df_agg['Stock Code'].to_numpy()
+    ll, _ = ll_arrays(df_agg, on_hand_pct, repo_pct)
+    bp_today = ledger_borrow_position(df_schedule, stocks)
+
+    reimb = df_schedule['Reimbursement Date']
+    overdue = reimb.isna() | (reimb < as_of)
+    events = df_schedule[~overdue]
+
+    # event -> (baris saham, hari bursa pertama >= Reimbursement Date)
+    s_idx = pd.Index(stocks).get_indexer(events['Stock Code'])
+    d_idx = days.searchsorted(events['Reimbursement Date'], side='left')
+    keep = (s_idx >= 0) & (d_idx < len(days))
+    s_idx, d_idx = s_idx[keep], d_idx[keep]
+    amount = events['Outstanding'].to_numpy(dtype=float)[keep]
+
+    released = np.bincount(
+        s_idx * len(days) + d_idx, weights=amount, minlength=len(stocks) * len(days)
+    ).reshape(len(stocks), len(days))
+    bp = np.maximum(bp_today[:, None] - np.cumsum(released, axis=1), 0)
+
+    rows = np.flatnonzero(released.any(axis=1))
+    df_curve = pd.DataFrame({
+        'Stock Code': np.repeat(stocks[rows], len(days)),
+        'Date': np.tile(days, len(rows)),
+        'Released': released[rows].ravel(),
+        'Borrow Position': bp[rows].ravel(),
+        'Available Lendable Limit': (ll[rows, None] - bp[rows]).ravel(),
+    })
+    return df_curve, df_schedule[overdue].reset_index(drop=True)
+
+
+def curve_pivot(df_curve, value='Available Lendable Limit'):
+    """Kurva panjang -> tabel lebar (saham x tanggal) untuk tampilan/unduhan."""
+    wide = df_curve.pivot(index='Stock Code', columns='Date', values=value)
+    wide.columns = [d.strftime('%d-%b') for d in wide.columns]
+    return wide.reset_index()
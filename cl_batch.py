@@ -0,0 +1,206 @@
+"""
+cl_batch.py
+------------------
+Mode batch HCCL multi-periode (mis. review akhir tahun 12 file HCCL_<bulan>.xlsx).
+
+Periode dibaca dari nama file (nama bulan Indonesia/Inggris + tahun opsional, atau
+YYYY-MM / YYYYMM). Tiap file di-parse dan dihitung calculate_concentration_limit di
+proses terpisah (ProcessPoolExecutor, pola yang sama dengan ll_batch), lalu digabung
+jadi satu workbook: sheet per periode + ringkasan CL & haircut per saham lintas periode.
+"""
+
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import pandas as pd
+import xlsxwriter
+
+from cl_engine import (
+    COL_HAIRCUT_USULAN, COL_RMCC, attach_pertimbangan_text, calculate_concentration_limit,
+)
+from ll_batch import expand_uploads
+from ll_template import write_frame
+
+MONTHS = {
+    'januari': 1, 'februari': 2, 'maret': 3, 'april': 4, 'mei': 5, 'juni': 6,
+    'juli': 7, 'agustus': 8, 'september': 9, 'oktober': 10, 'november': 11, 'desember': 12,
+    'january': 1, 'february': 2, 'march': 3, 'may': 5, 'june': 6,
+    'july': 7, 'august': 8, 'october': 10, 'december': 12,
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'jun': 6, 'jul': 7,
+    'agu': 8, 'agt': 8, 'aug': 8, 'sep': 9, 'okt': 10, 'oct': 10, 'nov': 11, 'des': 12, 'dec': 12,
+}
+_MONTH_PATTERN = re.compile(
+    r'(?<![A-Za-z])(' + '|'.join(sorted(MONTHS, key=len, reverse=True)) + r')(?![A-Za-z])', re.I
+)
+_YEAR_MONTH_PATTERN = re.compile(r'(20\d{2})[-_]?(0[1-9]|1[0-2])(?!\d)')
+_YEAR_PATTERN = re.compile(r'(?<!\d)(20\d{2})(?!\d)')
+
+SUMMARY_KEY = 'KODE EFEK'
+
+
+# ─────────────────────────────────────────────
+# PERIODE DARI NAMA FILE
+# ─────────────────────────────────────────────
+def detect_period(filename):
+    """
+    (tahun, bulan) dari nama file, tahun 0 kalau tidak ada; None kalau bulan tidak dikenali.
+    Contoh: HCCL_januari.xlsx, HCCL_Maret 2026.xlsx, HCCL_2026-03.xlsx.
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    m = _YEAR_MONTH_PATTERN.search(stem)
+    if m:
+        return int(m.group(1)), int(m.group(2))
+    m = _MONTH_PATTERN.search(stem)
+    if m is None:
+        return None
+    year = _YEAR_PATTERN.search(stem)
+    return (int(year.group(1)) if year else 0), MONTHS[m.group(1).lower()]
+
+
+def period_label(period):
+    """(2026, 3) -> 'Mar 2026'; (0, 3) -> 'Mar'."""
+    year, month = period
+    name = pd.Timestamp(2000, month, 1).strftime('%b')
+    return f'{name} {year}' if year else name
+
+
+def group_cl_inputs(named_files):
+    """
+    named_files: list (nama, bytes), .zip dibongkar.
+
+    Return (files, skipped):
+      files   : {label periode: bytes} urut periode
+      skipped : list (nama, alasan)
+    """
+    by_period, skipped = {}, []
+    for name, data in expand_uploads(named_files):
+        period = detect_period(name)
+        if period is None:
+            skipped.append((name, 'bulan tidak dikenali dari nama file'))
+        elif period in by_period:
+            skipped.append((name, f'periode {period_label(period)} sudah ada'))
+        else:
+            by_period[period] = data
+    files = {period_label(p): by_period[p] for p in sorted(by_period)}
+    return files, skipped
+
+
+# ─────────────────────────────────────────────
+# WORKER
+# ─────────────────────────────────────────────
+def run_cl_for_file(label, data, override_mapping=None):
+    """Parse + hitung CL satu file (dipanggil di worker process). Return (label, df_hasil, timing)."""
+    t0 = time.perf_counter()
+    df_source = pd.read_excel(BytesIO(data), engine='openpyxl')
+    t1 = time.perf_counter()
+    df_hasil = attach_pertimbangan_text(calculate_concentration_limit(df_source, override_mapping))
+    t2 = time.perf_counter()
+
+    timing = {
+        'Periode': label,
+        'Saham': len(df_hasil),
+        'Baca File (s)': round(t1 - t0, 3),
+        'Hitung CL (s)': round(t2 - t1, 3),
+        'Total (s)': round(t2 - t0, 3),
+        'PID Worker': os.getpid(),
+    }
+    return label, df_hasil, timing
+
+
+def run_cl_batch(files, override_mapping=None, max_workers=None):
+    """
+    Jalankan run_cl_for_file untuk semua periode secara paralel.
+
+    Return (results, df_timing): results = {label: df_hasil} urut periode,
+    df_timing = satu baris per periode (+ kolom Error kalau periode itu gagal).
+    """
+    max_workers = max_workers or min(len(files), os.cpu_count() or 1) or 1
+    results, timings = {}, []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            label: pool.submit(run_cl_for_file, label, data, override_mapping)
+            for label, data in files.items()
+        }
+        for label, fut in futures.items():
+            try:
+                _, df_hasil, timing = fut.result()
+                results[label] = df_hasil
+                timings.append(timing)
+            except Exception as e:
+                timings.append({'Periode': label, 'Error': str(e)})
+    return results, pd.DataFrame(timings)
+
+
+# ─────────────────────────────────────────────
+# RINGKASAN LINTAS PERIODE
+# ─────────────────────────────────────────────
+def cl_cross_period_summary(results):
+    """
+    Satu baris per saham: CL USULAN RMCC & HAIRCUT PEI USULAN DIVISI tiap periode
+    (kolom 'CL <periode>' / 'HC <periode>'), plus min/maks CL, selisih CL periode
+    terakhir vs pertama yang ada, dan jumlah perubahan haircut antar periode.
+    """
+    labels = list(results)
+    if not labels:
+        return pd.DataFrame(columns=[SUMMARY_KEY])
+
+    df_long = pd.concat(
+        {label: df[[SUMMARY_KEY, COL_RMCC, COL_HAIRCUT_USULAN]].drop_duplicates(SUMMARY_KEY, keep='first')
+         for label, df in results.items()},
+        names=['Periode'],
+    ).reset_index(level='Periode')
+
+    cl = df_long.pivot(index=SUMMARY_KEY, columns='Periode', values=COL_RMCC).reindex(columns=labels)
+    hc = df_long.pivot(index=SUMMARY_KEY, columns='Periode', values=COL_HAIRCUT_USULAN).reindex(columns=labels)
+    cl = cl.apply(pd.to_numeric, errors='coerce')
+    hc = hc.apply(pd.to_numeric, errors='coerce')
+
+    # nilai pertama/terakhir yang tidak kosong (saham bisa masuk/keluar di tengah tahun)
+    cl_first = cl.bfill(axis=1).iloc[:, 0]
+    cl_last = cl.ffill(axis=1).iloc[:, -1]
+    hc_filled = hc.ffill(axis=1)
+    hc_changes = (hc_filled.diff(axis=1).fillna(0) != 0).sum(axis=1)
+
+    df_summary = pd.concat([
+        cl.add_prefix('CL '),
+        hc.add_prefix('HC '),
+        pd.DataFrame({
+            'Jumlah Periode': cl.notna().sum(axis=1),
+            'CL Min': cl.min(axis=1),
+            'CL Maks': cl.max(axis=1),
+            'Δ CL (Akhir - Awal)': cl_last - cl_first,
+            'Perubahan Haircut': hc_changes,
+        }),
+    ], axis=1)
+    df_summary.columns.name = None
+    return df_summary.reset_index()
+
+
+# ─────────────────────────────────────────────
+# OUTPUT
+# ─────────────────────────────────────────────
+def write_cl_batch_workbook(results, df_summary, df_timing):
+    """
+    Satu workbook: sheet 'Ringkasan', sheet 'HCCL <periode>' per periode, + sheet 'Timing'.
+    Ditulis streaming (xlsxwriter constant_memory, sama dengan write_konsolidasi) karena
+    12 periode x ribuan saham terlalu lambat lewat DataFrame.to_excel.
+    """
+    out = BytesIO()
+    wb = xlsxwriter.Workbook(out, {
+        'constant_memory': True,
+        'in_memory': False,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+    })
+    header_format = wb.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+
+    write_frame(wb.add_worksheet('Ringkasan'), df_summary, header_format)
+    for label, df_hasil in results.items():
+        write_frame(wb.add_worksheet(f'HCCL {label}'[:31]), df_hasil, header_format)
+    write_frame(wb.add_worksheet('Timing'), df_timing, header_format)
+
+    wb.close()
+    out.seek(0)
+    return out
@@ -0,0 +1,159 @@
+"""
+cl_diff.py
+------------------
+Perbandingan hasil Concentration Limit & Haircut bulan ini vs bulan lalu.
+
+Hasil bulan lalu (file clhc_<bulan>.xlsx dari halaman CL) di-join ke sumber bulan
+ini lewat KODE EFEK. Hanya saham yang input-nya berubah (atau baru, atau emiten
+khusus) yang dihitung ulang lewat calculate_concentration_limit; sisanya memakai
+kolom hasil bulan lalu apa adanya. Setelah itu diff kedua bulan dibuat vektor.
+"""
+
+import numpy as np
+import pandas as pd
+
+from cl_engine import (
+    COL_FF, COL_HAIRCUT_USULAN, COL_LISTED, COL_MARJIN, COL_PERHITUNGAN, COL_PERTIMBANGAN_CL,
+    COL_PERTIMBANGAN_HC, COL_RATIO_FF, COL_RATIO_LISTED, COL_RMCC, DEFAULT_OVERRIDE_MAPPING,
+    attach_pertimbangan_text, binding_constraint, calculate_concentration_limit,
+    haircut_usulan_divisi, prepare_cl_source,
+)
+
+# Kolom sumber yang memengaruhi hasil perhitungan
+CL_NUMERIC_INPUTS = [
+    'LISTED SHARES', 'FREE FLOAT (DALAM LEMBAR)', 'CLOSING PRICE',
+    COL_RATIO_LISTED, COL_RATIO_FF, COL_PERHITUNGAN, 'HAIRCUT KPEI', 'HAIRCUT PEI',
+]
+CL_TEXT_INPUTS = ['SAHAM MARJIN BARU?', 'UMA']
+
+# Kolom yang ditambahkan/diubah calculate_concentration_limit (diambil dari bulan lalu bila input sama)
+CL_OUTPUT_COLUMNS = [
+    COL_MARJIN, COL_LISTED, COL_FF, COL_RMCC, 'HAIRCUT KPEI', COL_HAIRCUT_USULAN,
+    COL_PERTIMBANGAN_HC, COL_PERTIMBANGAN_CL,
+]
+
+
+def _haircut_is_percent(haircut):
+    """Skala haircut yang dipakai reset_concentration_limit (True = 0-100, False = 0-1)."""
+    valid = pd.to_numeric(haircut, errors='coerce').dropna()
+    return bool(not valid.empty and valid.max() > 1 + 1e-6)
+
+
+def _same_values(curr, prev, numeric):
+    if numeric:
+        a = pd.to_numeric(curr, errors='coerce').to_numpy(dtype=float)
+        b = pd.to_numeric(prev, errors='coerce').to_numpy(dtype=float)
+        return (a == b) | (np.isnan(a) & np.isnan(b))
+    a = curr.where(curr.notna(), '').astype(str).str.strip().str.upper().to_numpy()
+    b = prev.where(prev.notna(), '').astype(str).str.strip().str.upper().to_numpy()
+    return a == b
+
+
+# ─────────────────────────────────────────────
+# RECOMPUTE INCREMENTAL
+# ─────────────────────────────────────────────
+def changed_input_mask(df_curr, df_prev_result, override_mapping):
+    """True untuk saham yang harus dihitung ulang (baru, input berubah, duplikat, emiten khusus)."""
+    prev = df_prev_result.drop_duplicates('KODE EFEK', keep='first').set_index('KODE EFEK')
+    aligned = prev.reindex(df_curr['KODE EFEK'].to_numpy())
+
+    changed = ~df_curr['KODE EFEK'].isin(prev.index).to_numpy()
+    changed |= df_curr['KODE EFEK'].duplicated(keep=False).to_numpy()
+    changed |= df_curr['KODE EFEK'].isin(list(override_mapping)).to_numpy()
+    for col in CL_NUMERIC_INPUTS + CL_TEXT_INPUTS:
+        if col not in aligned.columns:
+            return np.ones(len(df_curr), dtype=bool)
+        changed |= ~_same_values(df_curr[col], aligned[col], numeric=col in CL_NUMERIC_INPUTS)
+    return changed
+
+
+def incremental_cl_update(df_cl_source, df_prev_result, override_mapping=None):
+    """
+    Hasil CL bulan ini (kolom teks PERTIMBANGAN sudah terpasang) dengan menghitung ulang
+    hanya saham yang input-nya berubah dibanding hasil bulan lalu.
+
+    Return (df_result, recomputed) -- recomputed = array bool per baris sumber.
+    """
+    if override_mapping is None:
+        override_mapping = DEFAULT_OVERRIDE_MAPPING
+
+    curr = prepare_cl_source(df_cl_source).reset_index(drop=True)
+    prev = df_prev_result.copy()
+    prev['KODE EFEK'] = prev['KODE EFEK'].astype(str).str.strip()
+
+    if any(col not in prev.columns for col in CL_OUTPUT_COLUMNS):
+        recompute = np.ones(len(curr), dtype=bool)
+    else:
+        recompute = changed_input_mask(curr, prev, override_mapping)
+        # skala haircut (0-1 vs 0-100) ditentukan dari seluruh kolom; kalau subset beda skala, hitung semua
+        if _haircut_is_percent(haircut_usulan_divisi(curr)) != _haircut_is_percent(haircut_usulan_divisi(curr[recompute])):
+            recompute[:] = True
+
+    source = df_cl_source.reset_index(drop=True)
+    df_new = attach_pertimbangan_text(calculate_concentration_limit(source[recompute], override_mapping))
+    if recompute.all():
+        return df_new, recompute
+
+    df_keep = curr[~recompute].copy()
+    df_keep[COL_PERHITUNGAN] = pd.to_numeric(df_keep[COL_PERHITUNGAN], errors='coerce')
+    prev_rows = prev.drop_duplicates('KODE EFEK', keep='first').set_index('KODE EFEK').loc[df_keep['KODE EFEK']]
+    for col in CL_OUTPUT_COLUMNS:
+        df_keep[col] = prev_rows[col].to_numpy()
+
+    df_result = pd.concat([df_new, df_keep[df_new.columns]]).sort_index()
+    return df_result, recompute
+
+
+# ─────────────────────────────────────────────
+# DIFF BULAN KE BULAN
+# ─────────────────────────────────────────────
+def cl_month_diff(df_prev_result, df_curr_result, override_mapping=None):
+    """
+    Diff vektor dua hasil CL (join di KODE EFEK).
+
+    Return (df_diff, df_changes):
+      df_diff    : semua saham -- CL & haircut bulan lalu/ini, Δ, kendala pengikat, flag perubahan
+      df_changes : ringkasan jumlah per jenis perubahan
+    """
+    def _side(df):
+        df = df.drop_duplicates('KODE EFEK', keep='first')
+        return pd.DataFrame({
+            'KODE EFEK': df['KODE EFEK'].astype(str).str.strip(),
+            'CL': pd.to_numeric(df[COL_RMCC], errors='coerce'),
+            'HAIRCUT': pd.to_numeric(df[COL_HAIRCUT_USULAN], errors='coerce'),
+            'KENDALA': binding_constraint(df, override_mapping).astype(str),
+        })
+
+    df = _side(df_curr_result).merge(
+        _side(df_prev_result), on='KODE EFEK', how='outer', suffixes=(' (Ini)', ' (Lalu)'), indicator=True
+    )
+    cl_curr, cl_prev = df['CL (Ini)'].to_numpy(dtype=float), df['CL (Lalu)'].to_numpy(dtype=float)
+    hc_curr, hc_prev = df['HAIRCUT (Ini)'].to_numpy(dtype=float), df['HAIRCUT (Lalu)'].to_numpy(dtype=float)
+    both = (df['_merge'] == 'both').to_numpy()
+
+    df_diff = pd.DataFrame({
+        'KODE EFEK': df['KODE EFEK'],
+        'CL USULAN RMCC (Lalu)': cl_prev,
+        'CL USULAN RMCC (Ini)': cl_curr,
+        'Δ CL': np.nan_to_num(cl_curr) - np.nan_to_num(cl_prev),
+        'HAIRCUT (Lalu)': hc_prev,
+        'HAIRCUT (Ini)': hc_curr,
+        'Δ HAIRCUT': np.nan_to_num(hc_curr) - np.nan_to_num(hc_prev),
+        'KENDALA (Lalu)': df['KENDALA (Lalu)'],
+        'KENDALA (Ini)': df['KENDALA (Ini)'],
+        'Baru': (df['_merge'] == 'left_only').to_numpy(),
+        'Hilang': (df['_merge'] == 'right_only').to_numpy(),
+        'Haircut Naik': both & (hc_curr > hc_prev),
+        'Haircut Turun': both & (hc_curr < hc_prev),
+        'Kendala Berubah': both & (df['KENDALA (Ini)'] != df['KENDALA (Lalu)']).to_numpy(),
+    })
+    flags = ['Baru', 'Hilang', 'Haircut Naik', 'Haircut Turun', 'Kendala Berubah']
+    df_diff = df_diff.sort_values('Δ CL', key=np.abs, ascending=False).reset_index(drop=True)
+    df_changes = pd.DataFrame({'Perubahan': flags, 'Jumlah Saham': [int(df_diff[f].sum()) for f in flags]})
+    return df_diff, df_changes
+
+
+def change_set(df_diff):
+    """Hanya baris yang punya minimal satu flag perubahan (atau Δ CL != 0)."""
+    flags = df_diff[['Baru', 'Hilang', 'Haircut Naik', 'Haircut Turun', 'Kendala Berubah']].any(axis=1)
+    return df_diff[flags | (df_diff['Δ CL'] != 0)].reset_index(drop=True)
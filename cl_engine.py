@@ -0,0 +1,527 @@
+"""
+cl_engine.py
+------------------
+Engine perhitungan Concentration Limit (CL) & Haircut yang dipakai bersama oleh
+halaman "Concentration Limit" dan "Perhitungan HCCL".
+
+Semua langkah berupa operasi kolom (np.where / Series.map / np.minimum), tidak ada
+df.apply(axis=1) per baris. Daftar emiten khusus (cap CL) dioper sebagai parameter
+`override_mapping` sehingga tiap halaman bisa memakai konfigurasinya sendiri.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# ============================
+# KONFIGURASI GLOBAL CL
+# ============================
+COL_RMCC = 'CONCENTRATION LIMIT USULAN RMCC'
+COL_LISTED = 'CONCENTRATION LIMIT TERKENA % LISTED SHARES'
+COL_FF = 'CONCENTRATION LIMIT TERKENA % FREE FLOAT'
+COL_PERHITUNGAN = 'CONCENTRATION LIMIT SESUAI PERHITUNGAN'
+COL_MARJIN = 'CONCENTRATION LIMIT KARENA SAHAM MARJIN BARU'
+COL_RATIO_LISTED = 'PERBANDINGAN DENGAN LISTED SHARES (Sesuai Perhitungan)'
+COL_RATIO_FF = 'PERBANDINGAN DENGAN FREE FLOAT (Sesuai Perhitungan)'
+COL_HAIRCUT_USULAN = 'HAIRCUT PEI USULAN DIVISI'
+THRESHOLD_5M = 5_000_000_000
+
+LISTED_RATIO_MIN = 0.05
+LISTED_FACTOR = 0.0499
+FF_RATIO_MIN = 0.20
+FF_FACTOR = 0.1999
+MARJIN_BARU_FACTOR = 0.50
+
+# Emiten khusus default (cap CL). REVISI: KPIG dihapus
+DEFAULT_OVERRIDE_MAPPING = {
+    'LPKR': 10_000_000_000, 'MLPL': 10_000_000_000,
+    'NOBU': 10_000_000_000, 'PTPP': 50_000_000_000, 'SILO': 10_000_000_000, 'LPCK': 10_000_000_000
+}
+
+# Nilai dan toleransi untuk pengecekan 100%
+TARGET_100 = 100.0
+TOLERANCE = 1e-6
+
+# ============================
+# TABEL ALASAN PERTIMBANGAN DIVISI
+# ============================
+COL_PERTIMBANGAN_CL = 'PERTIMBANGAN DIVISI (CONC LIMIT)'
+COL_PERTIMBANGAN_HC = 'PERTIMBANGAN DIVISI (HAIRCUT)'
+COL_KODE_PERTIMBANGAN_CL = 'KODE PERTIMBANGAN (CONC LIMIT)'
+COL_KODE_PERTIMBANGAN_HC = 'KODE PERTIMBANGAN (HAIRCUT)'
+
+# Hasil perhitungan hanya menyimpan kode int8; teks ditempel saat ekspor
+# (attach_pertimbangan_text). Aturan: (kondisi, kode, teks), urut prioritas
+# TERTINGGI dulu -- aturan pertama yang cocok menang. Kondisi = nama masker
+# di dict `masks` pada calculate_concentration_limit. Menambah alasan cukup
+# menambah baris di tabel ini (plus maskernya bila kondisinya baru).
+CL_REASON_DEFAULT = (0, 'Sesuai metode perhitungan')
+CL_REASON_RULES = [
+    ('listed_ff',   7, 'Penyesuaian karena melebihi 5% listed & 20% free float'),
+    ('ff_saja',     6, 'Penyesuaian karena melebihi 20% free float'),
+    ('listed_saja', 5, 'Penyesuaian karena melebihi 5% listed shares'),
+    ('marjin_baru', 4, 'Penyesuaian karena saham baru masuk marjin'),
+    ('emiten',      3, 'Penyesuaian karena profil emiten'),
+    ('hc100',       2, 'Penyesuaian karena Haircut PEI 100%'),
+    ('lt5m',        1, 'Penyesuaian karena Batas Konsentrasi < Rp5 Miliar'),
+]
+
+# Kode HC_REASON_UMA: teks memuat tanggal UMA, diformat saat ekspor
+HC_REASON_UMA = 1
+HC_REASON_UMA_TEXT = 'Sesuai Haircut KPEI, mempertimbangkan pengumuman UMA dari BEI tanggal {uma:%d %b %Y}'
+HC_REASON_DEFAULT = (0, 'Sesuai Metode Perhitungan')
+HC_REASON_RULES = [
+    ('lt5m', 2, 'Penyesuaian karena Batas Konsentrasi 0'),
+    ('uma',  HC_REASON_UMA, HC_REASON_UMA_TEXT),
+]
+
+
+# ===============================================================
+# FUNGSI UTILITAS UNTUK CONCENTRATION LIMIT (CL)
+# ===============================================================
+def _numeric(series):
+    return pd.to_numeric(series, errors='coerce')
+
+
+def calc_concentration_limit_listed(df):
+    """0.0499 x LISTED SHARES x CLOSING PRICE untuk saham dengan rasio listed >= 5%, selain itu NaN."""
+    hit = _numeric(df[COL_RATIO_LISTED]) >= LISTED_RATIO_MIN
+    value = LISTED_FACTOR * _numeric(df['LISTED SHARES']) * _numeric(df['CLOSING PRICE'])
+    return value.where(hit)
+
+
+def calc_concentration_limit_ff(df):
+    """0.1999 x FREE FLOAT x CLOSING PRICE untuk saham dengan rasio free float >= 20%, selain itu NaN."""
+    hit = _numeric(df[COL_RATIO_FF]) >= FF_RATIO_MIN
+    value = FF_FACTOR * _numeric(df['FREE FLOAT (DALAM LEMBAR)']) * _numeric(df['CLOSING PRICE'])
+    return value.where(hit)
+
+
+def override_rmcc_limit(kode_efek, nilai_rmcc, override_mapping):
+    """
+    Cap CL emiten khusus: min(CL, cap) untuk kode di override_mapping.
+    CL = 0 tetap 0 (cap hanya menurunkan, tidak pernah menaikkan).
+    """
+    cap = kode_efek.map(override_mapping).astype(float).fillna(np.inf)
+    return nilai_rmcc.where(nilai_rmcc == 0.0, np.minimum(nilai_rmcc, cap))
+
+
+def reset_concentration_limit(
+    df_main: pd.DataFrame,
+    haircut_col: str = COL_HAIRCUT_USULAN,
+    conc_limit_col: str = COL_RMCC,
+    conc_calc_col: str = COL_PERHITUNGAN,
+    tolerance: float = TOLERANCE,
+    threshold_limit: float = THRESHOLD_5M,
+    inplace: bool = True
+) -> pd.DataFrame:
+    if not inplace:
+        df_main = df_main.copy()
+
+    if haircut_col not in df_main.columns:
+        df_main[haircut_col] = 0.0
+
+    df_main[haircut_col] = pd.to_numeric(df_main[haircut_col], errors='coerce')
+    df_main[conc_calc_col] = pd.to_numeric(df_main[conc_calc_col], errors='coerce')
+
+    mask_final = reset_concentration_limit_mask(
+        df_main[haircut_col], df_main[conc_calc_col], tolerance, threshold_limit
+    )
+    df_main.loc[mask_final, conc_limit_col] = 0.0
+    return df_main
+
+
+def reset_concentration_limit_mask(haircut, conc_calc, tolerance=TOLERANCE, threshold_limit=THRESHOLD_5M):
+    """Baris yang CL-nya dinolkan: haircut usulan 100% (skala 1 atau 100) atau CL perhitungan < 5M."""
+    valid_haircut = haircut.dropna()
+    target_100_reset = 100.0 if not valid_haircut.empty and valid_haircut.max() > 1 + tolerance else 1.0
+
+    mask_haircut_100 = (haircut.sub(target_100_reset).abs() < tolerance)
+    mask_below_threshold = (conc_calc < threshold_limit)
+    return mask_haircut_100 | mask_below_threshold
+
+
+def haircut_usulan_divisi(df):
+    """HAIRCUT KPEI untuk saham dengan pengumuman UMA, selain itu HAIRCUT PEI."""
+    return pd.Series(np.where(
+        (df['UMA'].fillna('-') != '-') & pd.notna(df['UMA']),
+        pd.to_numeric(df['HAIRCUT KPEI'], errors='coerce').fillna(0),
+        df['HAIRCUT PEI']
+    ), index=df.index)
+
+
+def _factorize_uma(uma):
+    """
+    Kolom UMA -> (posisi nilai unik per baris, tanggal per nilai unik). Hanya nilai unik
+    yang di-parse, dengan aturan lama per sel: datetime dipakai apa adanya, selain itu
+    pd.to_datetime(str(nilai)). Jadi angka 20250304 -> 4 Mar 2025 (bukan epoch ns),
+    serial Excel 45720 / kosong / '-' / tidak bisa dibaca -> NaT.
+    """
+    codes, uniques = pd.factorize(pd.Series(uma, dtype=object))
+    return codes, pd.DatetimeIndex([_parse_uma(u) for u in uniques])
+
+
+def _parse_uma(value):
+    try:
+        date = pd.Timestamp(value) if isinstance(value, datetime) else pd.to_datetime(str(value))
+    except (ValueError, OverflowError):
+        return pd.NaT
+    # jam lokal dipertahankan (yang ditampilkan hanya tanggalnya), tz dibuang agar satu index
+    return date.tz_localize(None) if date is not pd.NaT and date.tzinfo is not None else date
+
+
+def uma_dates(uma):
+    """Kolom UMA -> tanggal pengumuman (NaT kalau kosong / '-' / tidak bisa dibaca)."""
+    codes, dates = _factorize_uma(uma)
+    return pd.Series(dates.take(codes, allow_fill=True, fill_value=pd.NaT), index=getattr(uma, 'index', None))
+
+
+def keterangan_uma(uma):
+    """Kolom UMA -> teks PERTIMBANGAN DIVISI (HAIRCUT); teks diformat sekali per tanggal unik."""
+    codes, dates = _factorize_uma(uma)
+    texts = np.array(
+        [HC_REASON_UMA_TEXT.format(uma=d) if pd.notna(d) else HC_REASON_DEFAULT[1] for d in dates]
+        + [HC_REASON_DEFAULT[1]],
+        dtype=object,
+    )
+    # posisi -1 (NaN) jatuh ke teks default di akhir array
+    return pd.Series(texts[codes], index=getattr(uma, 'index', None))
+
+
+# ===============================================================
+# ALASAN PERTIMBANGAN (KODE <-> TEKS)
+# ===============================================================
+def evaluate_reason_rules(rules, masks, default_code=0):
+    """Satu pass np.select atas tabel aturan -> kode alasan int8 per baris."""
+    conditions = [np.asarray(masks[name], dtype=bool) for name, _, _ in rules]
+    codes = [code for _, code, _ in rules]
+    return np.select(conditions, codes, default=default_code).astype(np.int8)
+
+
+def _reason_texts(rules, default):
+    texts = dict([default] + [(code, text) for _, code, text in rules])
+    return [texts[code] for code in range(max(texts) + 1)]
+
+
+def attach_pertimbangan_text(df, drop_codes=True):
+    """
+    Tempel teks PERTIMBANGAN DIVISI (HAIRCUT / CONC LIMIT) dari kode alasan,
+    di posisi kolom kodenya. Dipanggil tepat sebelum tampil/ekspor.
+    """
+    df = df.copy()
+    cl_codes = df[COL_KODE_PERTIMBANGAN_CL].to_numpy()
+    hc_codes = df[COL_KODE_PERTIMBANGAN_HC].to_numpy()
+
+    cl_text = pd.Categorical.from_codes(cl_codes, categories=_reason_texts(CL_REASON_RULES, CL_REASON_DEFAULT))
+
+    hc_text = pd.Series(
+        pd.Categorical.from_codes(hc_codes, categories=_reason_texts(HC_REASON_RULES, HC_REASON_DEFAULT)),
+        index=df.index,
+    ).astype(object)
+    is_uma = hc_codes == HC_REASON_UMA
+    if is_uma.any():
+        hc_text[is_uma] = keterangan_uma(df.loc[is_uma, 'UMA'])
+
+    for code_col, text_col, values in (
+        (COL_KODE_PERTIMBANGAN_HC, COL_PERTIMBANGAN_HC, hc_text),
+        (COL_KODE_PERTIMBANGAN_CL, COL_PERTIMBANGAN_CL, cl_text),
+    ):
+        df.insert(df.columns.get_loc(code_col), text_col, values)
+        if drop_codes:
+            df = df.drop(columns=[code_col])
+    return df
+
+
+# ===============================================================
+# FUNGSI UTAMA UNTUK CONCENTRATION LIMIT (CL)
+# ===============================================================
+def prepare_cl_source(df_cl_source):
+    """Salinan sumber CL dengan KODE EFEK rapi dan kolom CL karena saham marjin baru."""
+    df = df_cl_source.copy()
+
+    if 'KODE EFEK' not in df.columns:
+        df = df.rename(columns={df.columns[0]: 'KODE EFEK'})
+
+    df['KODE EFEK'] = df['KODE EFEK'].astype(str).str.strip()
+
+    df['SAHAM MARJIN BARU?'] = df['SAHAM MARJIN BARU?'].astype(str).str.upper().str.strip()
+    df[COL_MARJIN] = np.where(
+        df['SAHAM MARJIN BARU?'] == 'YA',
+        df[COL_PERHITUNGAN] * MARJIN_BARU_FACTOR,
+        df[COL_PERHITUNGAN]
+    )
+    return df
+
+
+def calculate_concentration_limit(df_cl_source: pd.DataFrame, override_mapping=None) -> pd.DataFrame:
+    """
+    Menjalankan seluruh logika perhitungan Concentration Limit.
+
+    override_mapping : {KODE EFEK: cap CL (Rp)}; None = DEFAULT_OVERRIDE_MAPPING.
+                       Kode di mapping ini juga yang dianggap "emiten khusus".
+    """
+    if override_mapping is None:
+        override_mapping = DEFAULT_OVERRIDE_MAPPING
+
+    # 1. Normalisasi KODE EFEK & perhitungan limit marjin
+    df = prepare_cl_source(df_cl_source)
+
+    # 2. Hitung limit listed & FF
+    df[COL_LISTED] = calc_concentration_limit_listed(df)
+    df[COL_FF] = calc_concentration_limit_ff(df)
+
+    # 3. & 4. TENTUKAN CONCENTRATION LIMIT USULAN RMCC (Ambil nilai minimum)
+    limit_cols_for_min = [COL_MARJIN, COL_LISTED, COL_FF, COL_PERHITUNGAN]
+    df['MIN_CL_OPTION'] = df[limit_cols_for_min].fillna(np.inf).min(axis=1)
+
+    # Tentukan pemicu nol
+    mask_pemicu_nol = (
+        (df[COL_MARJIN].fillna(np.inf) < THRESHOLD_5M) |
+        (df[COL_PERHITUNGAN].fillna(np.inf) < THRESHOLD_5M) |
+        (df[COL_LISTED].fillna(np.inf) < THRESHOLD_5M) |
+        (df[COL_FF].fillna(np.inf) < THRESHOLD_5M)
+    )
+
+    df[COL_RMCC] = np.where(mask_pemicu_nol, 0.0, df['MIN_CL_OPTION'])
+
+    # 5. Override emiten khusus (Menerapkan CAP 10M/50M)
+    mask_not_zero = (df[COL_RMCC] != 0.0)
+    df[COL_RMCC] = df[COL_RMCC].where(
+        ~mask_not_zero, override_rmcc_limit(df['KODE EFEK'], df[COL_RMCC], override_mapping).round(0)
+    )
+
+    # 6. Tambah kolom haircut usulan
+    df['HAIRCUT KPEI'] = pd.to_numeric(df['HAIRCUT KPEI'], errors='coerce').fillna(0)
+    df[COL_HAIRCUT_USULAN] = haircut_usulan_divisi(df)
+
+    # 7. Nolkan CL USULAN RMCC jika haircut awal 100% atau CL perhitungan < 5M
+    df = reset_concentration_limit(df)
+
+    # 7B. SET HAIRCUT JADI 100% KARENA CL=0
+    mask_rmcc_nol = (df[COL_RMCC] == 0)
+    df['TEMP_HAIRCUT_VAL_ASLI'] = pd.to_numeric(df[COL_HAIRCUT_USULAN], errors='coerce')
+    df.loc[mask_rmcc_nol, COL_HAIRCUT_USULAN] = 1.0
+
+    # 8. & 9. Masker alasan PERTIMBANGAN DIVISI
+
+    # --- Masker CL = 0 ---
+    mask_emiten = df['KODE EFEK'].isin(list(override_mapping))
+    mask_nol_final = (df[COL_RMCC] == 0) & (~mask_emiten)
+
+    mask_lt5m_strict = (
+        (df[COL_MARJIN].fillna(np.inf) < THRESHOLD_5M) |
+        (df[COL_PERHITUNGAN].fillna(np.inf) < THRESHOLD_5M) |
+        (df[COL_LISTED].fillna(np.inf) < THRESHOLD_5M) |
+        (df[COL_FF].fillna(np.inf) < THRESHOLD_5M) |
+        (df[COL_RMCC].fillna(np.inf) < THRESHOLD_5M)
+    ) & mask_nol_final
+
+    mask_hc100_origin = ((df['TEMP_HAIRCUT_VAL_ASLI'].sub(1.0).abs() < TOLERANCE) |
+                         (df['TEMP_HAIRCUT_VAL_ASLI'].sub(TARGET_100).abs() < TOLERANCE)) & \
+                        mask_nol_final & \
+                        (~mask_lt5m_strict)
+
+    # --- Masker CL Non-Nol (CL != 0) ---
+    mask_non_nol = (df[COL_RMCC] != 0)
+
+    # Emiten khusus: CL_RMCC sama persis dengan batas override (override terpicu)
+    cl_override_val = df['KODE EFEK'].map(override_mapping).astype(float).fillna(np.inf)
+    mask_emiten_override = mask_non_nol & mask_emiten & \
+                           (df[COL_RMCC].round(0) == cl_override_val.round(0))
+
+    mask_other_non_nol = mask_non_nol & (~mask_emiten_override)
+
+    # Sumber nilai minimum (berdasarkan kesamaan dengan CL_RMCC); Listed menang atas FF,
+    # keduanya menang atas Marjin Baru bila nilainya sama
+    mask_listed_saja = mask_other_non_nol & \
+                       (df[COL_RMCC].round(0) == df[COL_LISTED].round(0))
+    mask_ff_saja = mask_other_non_nol & \
+                   (df[COL_RMCC].round(0) == df[COL_FF].round(0)) & \
+                   (~mask_listed_saja)
+    mask_marjin_baru = mask_other_non_nol & \
+                       (df[COL_RMCC].round(0) == df[COL_MARJIN].round(0)) & \
+                       (df['SAHAM MARJIN BARU?'] == 'YA')
+
+    masks = {
+        'lt5m': mask_lt5m_strict,
+        'hc100': mask_hc100_origin,
+        'emiten': mask_emiten_override | (mask_emiten & mask_nol_final),
+        'marjin_baru': mask_marjin_baru,
+        'listed_saja': mask_listed_saja,
+        'ff_saja': mask_ff_saja,
+        # Listed/FF ganda: sumber minimum Listed/FF dan kedua kriteria terpenuhi
+        'listed_ff': (mask_listed_saja | mask_ff_saja) & df[COL_LISTED].notna() & df[COL_FF].notna(),
+        'uma': uma_dates(df['UMA']).notna(),
+    }
+
+    # 10. Kode alasan (teks ditempel saat ekspor lewat attach_pertimbangan_text)
+    df[COL_KODE_PERTIMBANGAN_HC] = evaluate_reason_rules(HC_REASON_RULES, masks, HC_REASON_DEFAULT[0])
+    df[COL_KODE_PERTIMBANGAN_CL] = evaluate_reason_rules(CL_REASON_RULES, masks, CL_REASON_DEFAULT[0])
+
+    # Cleanup kolom bantuan
+    df = df.drop(columns=['MIN_CL_OPTION', 'TEMP_HAIRCUT_VAL_ASLI'], errors='ignore')
+
+    return df
+
+
+# ===============================================================
+# STRESS HARGA PENUTUPAN (GRID SAHAM x SKENARIO)
+# ===============================================================
+DEFAULT_PRICE_SHOCKS = (-0.10, -0.20, -0.30)
+
+# Kendala pengikat CL USULAN RMCC per saham/skenario.
+# TANPA KENDALA = keempat opsi limit kosong (CL USULAN RMCC inf, tidak ada yang mengikat)
+BINDING_LABELS = ['NOL', 'EMITEN', 'LISTED', 'FREE FLOAT', 'PERHITUNGAN', 'MARJIN BARU', 'TANPA KENDALA']
+_BINDING_NOL, _BINDING_EMITEN, _BINDING_FIRST_OPTION = 0, 1, 2
+_BINDING_NONE = BINDING_LABELS.index('TANPA KENDALA')
+
+
+def _inf_if_nan(values):
+    return np.where(np.isnan(values), np.inf, values)
+
+
+def limits_at_price(price, price_base, ratio_listed, ratio_ff, listed_shares, ff_shares):
+    """
+    Rasio kriteria & limit % listed / % free float pada harga `price` (model shock harga
+    yang dipakai stress grid dan monitor harian).
+
+    PERBANDINGAN DENGAN LISTED SHARES / FREE FLOAT adalah CL sesuai perhitungan (Rp)
+    dalam lembar dibagi jumlah saham, jadi rasio bergerak berbanding terbalik dengan
+    harga: rasio = rasio_basis x harga_basis / harga. CL sesuai perhitungan (Rp) dan
+    haircut tetap seperti di file sumber.
+
+    Argumen basis berbentuk (N,) atau (N, 1), `price` boleh (N,) atau (N, S).
+    Return (ratio_listed, ratio_ff, listed, ff) berbentuk sama dengan `price`;
+    limit NaN = tidak kena kriteria.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drift = np.where(price > 0, price_base / price, np.nan)
+    ratio_listed = ratio_listed * drift
+    ratio_ff = ratio_ff * drift
+    listed = np.where(ratio_listed >= LISTED_RATIO_MIN, LISTED_FACTOR * listed_shares * price, np.nan)
+    ff = np.where(ratio_ff >= FF_RATIO_MIN, FF_FACTOR * ff_shares * price, np.nan)
+    return ratio_listed, ratio_ff, listed, ff
+
+
+def rmcc_from_limits(listed, ff, perhitungan, marjin, cap, reset):
+    """
+    Langkah 3-7 calculate_concentration_limit dalam bentuk array (dipakai stress & monitor harian).
+
+    listed, ff        : (N, S) limit % listed / % free float per skenario (NaN = tidak kena kriteria)
+    perhitungan, marjin, cap, reset : (N,) -- cap = batas emiten khusus (inf kalau bukan), reset = mask nol
+    Return (cl, under_5m, binding), masing-masing (N, S). Baris tanpa opsi limit sama sekali
+    (CL inf) diberi kendala TANPA KENDALA, bukan hasil argmin atas inf.
+    """
+    n_scen = listed.shape[1]
+    # (N, S, 4) -- urutan opsi = urutan BINDING_LABELS setelah NOL/EMITEN
+    options = np.stack([
+        _inf_if_nan(listed),
+        _inf_if_nan(ff),
+        np.broadcast_to(_inf_if_nan(perhitungan)[:, None], (len(perhitungan), n_scen)),
+        np.broadcast_to(_inf_if_nan(marjin)[:, None], (len(marjin), n_scen)),
+    ], axis=-1)
+
+    under_5m = (options < THRESHOLD_5M).any(axis=-1)
+    min_option = options.min(axis=-1)
+    binding = options.argmin(axis=-1).astype(np.int8) + _BINDING_FIRST_OPTION
+    binding[np.isinf(min_option)] = _BINDING_NONE
+
+    # seri dengan cap (setelah dibulatkan) = EMITEN, aturan yang sama dengan binding_constraint
+    # dan alasan 'profil emiten' di calculate_concentration_limit
+    capped = ~under_5m & np.isfinite(cap)[:, None] & (np.round(min_option) >= cap[:, None])
+    cl = np.where(under_5m, 0.0, np.round(np.minimum(min_option, cap[:, None])))
+    cl[reset] = 0.0
+
+    binding[capped] = _BINDING_EMITEN
+    binding[cl == 0] = _BINDING_NOL
+    return cl, under_5m, binding
+
+
+def cl_stress_grid(df_cl_source, shocks=DEFAULT_PRICE_SHOCKS, override_mapping=None):
+    """
+    Evaluasi aturan CL USULAN RMCC untuk semua saham x skenario shock CLOSING PRICE
+    dalam satu komputasi broadcast (N saham x S skenario), tanpa loop per skenario.
+
+    Harga menggeser limit % listed / % free float beserta rasio kriterianya (5% listed /
+    20% FF) menurut model limits_at_price -- sama dengan monitor harian (cl_monitor).
+
+    Return (df_summary, df_cl, df_binding):
+      df_summary : per skenario -- Total CL, jumlah saham CL < Rp5M, baru < Rp5M
+                   dibanding harga hari ini, dan jumlah saham yang kendala pengikatnya berubah
+      df_cl      : KODE EFEK x skenario, nilai CL USULAN RMCC
+      df_binding : KODE EFEK x skenario, kendala pengikat (BINDING_LABELS)
+    """
+    if override_mapping is None:
+        override_mapping = DEFAULT_OVERRIDE_MAPPING
+
+    df = prepare_cl_source(df_cl_source)
+    shocks = np.asarray(shocks, dtype=float)
+    price_mult = 1.0 + np.concatenate([[0.0], shocks])          # kolom 0 = harga hari ini
+
+    num = lambda col: _numeric(df[col]).to_numpy(dtype=float)[:, None]
+    price = num('CLOSING PRICE')
+    _, _, listed, ff = limits_at_price(
+        price * price_mult, price, num(COL_RATIO_LISTED), num(COL_RATIO_FF),
+        num('LISTED SHARES'), num('FREE FLOAT (DALAM LEMBAR)'),
+    )
+    perhitungan = _numeric(df[COL_PERHITUNGAN]).to_numpy(dtype=float)
+    marjin = _numeric(df[COL_MARJIN]).to_numpy(dtype=float)
+
+    cap = df['KODE EFEK'].map(override_mapping).astype(float).fillna(np.inf).to_numpy()
+    haircut = pd.to_numeric(haircut_usulan_divisi(df), errors='coerce')
+    reset = reset_concentration_limit_mask(haircut, pd.Series(perhitungan, index=df.index)).to_numpy()
+
+    cl, under_5m, binding = rmcc_from_limits(listed, ff, perhitungan, marjin, cap, reset)
+
+    labels = ['Harga Saat Ini'] + [f'{s:+.0%}' for s in shocks]
+    n_under = under_5m.sum(axis=0)
+    df_summary = pd.DataFrame({
+        'Skenario': labels,
+        'Shock Harga': np.concatenate([[0.0], shocks]),
+        'Total CL USULAN RMCC': cl.sum(axis=0),
+        'Saham CL < Rp5M': n_under,
+        'Baru CL < Rp5M': (under_5m & ~under_5m[:, [0]]).sum(axis=0),
+        'Kendala Pengikat Berubah': (binding != binding[:, [0]]).sum(axis=0),
+    })
+
+    kode = df['KODE EFEK'].to_numpy()
+    df_cl = pd.DataFrame(cl, columns=labels)
+    df_cl.insert(0, 'KODE EFEK', kode)
+    df_binding = pd.DataFrame(
+        pd.Categorical.from_codes(binding.ravel(), BINDING_LABELS).to_numpy().reshape(binding.shape),
+        columns=labels,
+    )
+    df_binding.insert(0, 'KODE EFEK', kode)
+    return df_summary, df_cl, df_binding
+
+
+def binding_constraint(df_result, override_mapping=None):
+    """
+    Kendala pengikat CL USULAN RMCC per baris dari kolom hasil perhitungan
+    (berlaku juga untuk hasil bulan lalu yang dibaca ulang dari Excel).
+    Baris yang keempat opsi limitnya kosong -> TANPA KENDALA.
+    """
+    if override_mapping is None:
+        override_mapping = DEFAULT_OVERRIDE_MAPPING
+
+    rmcc = _numeric(df_result[COL_RMCC])
+    rounded = rmcc.round(0)
+    cap = df_result['KODE EFEK'].astype(str).str.strip().map(override_mapping).astype(float)
+    marjin_baru = df_result['SAHAM MARJIN BARU?'].astype(str).str.upper().str.strip() == 'YA'
+    no_option = df_result[[COL_MARJIN, COL_LISTED, COL_FF, COL_PERHITUNGAN]].apply(_numeric).isna().all(axis=1)
+
+    code = np.select(
+        [
+            rmcc == 0,
+            rounded == cap.round(0),
+            no_option,
+            rounded == _numeric(df_result[COL_LISTED]).round(0),
+            rounded == _numeric(df_result[COL_FF]).round(0),
+            marjin_baru & (rounded == _numeric(df_result[COL_MARJIN]).round(0)),
+        ],
+        [_BINDING_NOL, _BINDING_EMITEN, _BINDING_NONE, BINDING_LABELS.index('LISTED'),
+         BINDING_LABELS.index('FREE FLOAT'), BINDING_LABELS.index('MARJIN BARU')],
+        default=BINDING_LABELS.index('PERHITUNGAN'),
+    )
+    return pd.Series(pd.Categorical.from_codes(code, BINDING_LABELS), index=df_result.index)
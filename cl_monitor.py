@@ -0,0 +1,134 @@
+"""
+cl_monitor.py
+------------------
+Monitor harian Concentration Limit dari file closing price.
+
+Basis bulanan (file sumber HCCL) disiapkan SEKALI jadi array per saham; tiap file
+harga harian cukup di-align ke array itu lewat KODE EFEK lalu dihitung ulang
+secara vektor dengan rmcc_from_limits (logika langkah 3-7 yang sama dengan
+calculate_concentration_limit).
+
+Pergeseran rasio & limit terhadap harga memakai cl_engine.limits_at_price (model yang
+sama dengan stress grid): rasio_hari_ini = rasio_bulan x harga_bulan / harga_hari_ini.
+"""
+
+import numpy as np
+import pandas as pd
+
+from cl_engine import (
+    BINDING_LABELS, COL_PERHITUNGAN, COL_MARJIN, COL_RATIO_FF, COL_RATIO_LISTED,
+    DEFAULT_OVERRIDE_MAPPING, FF_RATIO_MIN, LISTED_RATIO_MIN, haircut_usulan_divisi,
+    limits_at_price, prepare_cl_source, reset_concentration_limit_mask, rmcc_from_limits,
+)
+from stock_master import normalise_codes
+
+PRICE_COLUMNS = ['KODE EFEK', 'CLOSING PRICE']
+
+
+def read_closing_prices(file, filename=''):
+    """
+    Baca file closing price harian (xlsx/csv) -> [KODE EFEK, CLOSING PRICE].
+    Kolom dicari by-name; kalau tidak ada, dipakai 2 kolom pertama sesuai urutan itu.
+    """
+    if str(filename).lower().endswith('.csv'):
+        df = pd.read_csv(file)
+    else:
+        df = pd.read_excel(file, engine='openpyxl')
+    df.columns = [str(c).strip() for c in df.columns]
+    if not set(PRICE_COLUMNS).issubset(df.columns):
+        df = df.iloc[:, :2]
+        df.columns = PRICE_COLUMNS
+    df = df[PRICE_COLUMNS].copy()
+    df['KODE EFEK'] = normalise_codes(df['KODE EFEK']).to_numpy()
+    df['CLOSING PRICE'] = pd.to_numeric(df['CLOSING PRICE'], errors='coerce')
+    return df.dropna(subset=['CLOSING PRICE']).drop_duplicates('KODE EFEK', keep='last')
+
+
+class CLDailyMonitor:
+    """Basis CL bulanan di memori + cek harian terhadap closing price baru."""
+
+    def __init__(self, df_cl_source, override_mapping=None):
+        if override_mapping is None:
+            override_mapping = DEFAULT_OVERRIDE_MAPPING
+
+        df = prepare_cl_source(df_cl_source)
+        # basis & file harga dicocokkan lewat normaliser yang sama (strip + huruf besar)
+        codes = normalise_codes(df['KODE EFEK'])
+        df = df[~codes.duplicated().to_numpy()].reset_index(drop=True)
+        num = lambda col: pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+
+        self.kode = df['KODE EFEK'].to_numpy()
+        self._index = pd.Index(normalise_codes(df['KODE EFEK']).to_numpy())
+        self.price = num('CLOSING PRICE')
+        self._listed_shares = num('LISTED SHARES')
+        self._ff_shares = num('FREE FLOAT (DALAM LEMBAR)')
+        self._ratio_listed = num(COL_RATIO_LISTED)
+        self._ratio_ff = num(COL_RATIO_FF)
+        self._perhitungan = num(COL_PERHITUNGAN)
+        self._marjin = num(COL_MARJIN)
+        self._cap = df['KODE EFEK'].map(override_mapping).astype(float).fillna(np.inf).to_numpy()
+        haircut = pd.to_numeric(haircut_usulan_divisi(df), errors='coerce')
+        self._reset = reset_concentration_limit_mask(
+            haircut, pd.Series(self._perhitungan, index=df.index)
+        ).to_numpy()
+
+        self.base = self._evaluate(self.price)
+
+    def _evaluate(self, price):
+        ratio_listed, ratio_ff, listed, ff = limits_at_price(
+            price, self.price, self._ratio_listed, self._ratio_ff, self._listed_shares, self._ff_shares
+        )
+        hit_listed = ratio_listed >= LISTED_RATIO_MIN
+        hit_ff = ratio_ff >= FF_RATIO_MIN
+
+        cl, under_5m, binding = rmcc_from_limits(
+            listed[:, None], ff[:, None], self._perhitungan, self._marjin, self._cap, self._reset
+        )
+        return {
+            'price': price, 'ratio_listed': ratio_listed, 'ratio_ff': ratio_ff,
+            'hit_listed': hit_listed, 'hit_ff': hit_ff,
+            'cl': cl[:, 0], 'under_5m': under_5m[:, 0], 'binding': binding[:, 0],
+        }
+
+    def check(self, df_prices):
+        """
+        Terapkan closing price harian. Return (df_breach, info):
+          df_breach : saham yang melewati batas 5% listed, 20% free float atau Rp5 Miliar
+                      dibanding basis bulanan
+          info      : jumlah harga cocok / kode tidak dikenal
+        """
+        pos = self._index.get_indexer(normalise_codes(df_prices['KODE EFEK']).to_numpy())
+        known = pos >= 0
+        price = self.price.copy()
+        price[pos[known]] = df_prices['CLOSING PRICE'].to_numpy(dtype=float)[known]
+
+        day = self._evaluate(price)
+        base = self.base
+        cross_listed = day['hit_listed'] != base['hit_listed']
+        cross_ff = day['hit_ff'] != base['hit_ff']
+        cross_5m = day['under_5m'] != base['under_5m']
+        rows = np.flatnonzero(cross_listed | cross_ff | cross_5m)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price_change = price[rows] / self.price[rows] - 1
+        df_breach = pd.DataFrame({
+            'KODE EFEK': self.kode[rows],
+            'CLOSING PRICE (Basis)': self.price[rows],
+            'CLOSING PRICE (Hari Ini)': price[rows],
+            'Δ Harga %': price_change,
+            'Rasio Listed (Hari Ini)': day['ratio_listed'][rows],
+            'Rasio Free Float (Hari Ini)': day['ratio_ff'][rows],
+            'CL USULAN RMCC (Basis)': base['cl'][rows],
+            'CL USULAN RMCC (Hari Ini)': day['cl'][rows],
+            'Kendala (Basis)': np.asarray(BINDING_LABELS)[base['binding'][rows]],
+            'Kendala (Hari Ini)': np.asarray(BINDING_LABELS)[day['binding'][rows]],
+            'Lewat 5% Listed': cross_listed[rows],
+            'Lewat 20% Free Float': cross_ff[rows],
+            'Lewat Rp5 Miliar': cross_5m[rows],
+        })
+        info = {
+            'harga_cocok': int(known.sum()),
+            'kode_tidak_dikenal': int((~known).sum()),
+            'saham_basis': len(self.kode),
+        }
+        return df_breach.sort_values('Δ Harga %').reset_index(drop=True), info
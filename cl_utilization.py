@@ -0,0 +1,134 @@
+"""
+cl_utilization.py
+------------------
+Utilisasi Concentration Limit: nilai kolateral aktual per saham (Stock Position
+Detail, file yang sama dengan halaman LL & Laporan Bulanan tab 3) dibagi
+CONCENTRATION LIMIT USULAN RMCC.
+
+Index KODE EFEK -> posisi dibangun SEKALI dari hasil CL. Tiap file posisi baru cukup
+factorize kode saham, get_indexer terhadap index itu, lalu np.bincount nilai
+kolateral per saham -- tanpa merge/groupby, jadi aman dijalankan ulang setiap ada
+file posisi baru sepanjang hari.
+
+Nilai kolateral diambil dari kolom yang namanya memuat 'Collateral' (seperti Laporan
+Bulanan tab 3); kalau tidak ada, quantity (kolom K) x CLOSING PRICE hasil CL.
+"""
+
+import numpy as np
+import pandas as pd
+
+from cl_engine import COL_RMCC
+
+SP_STOCK_COL_IDX = 1     # kolom B = kode saham
+SP_QTY_COL_IDX = 10      # kolom K = quantity
+
+WARN_UTILIZATION = 0.80
+
+STATUS_LEWAT = 'Lewat CL'
+STATUS_WASPADA = 'Waspada'
+STATUS_AMAN = 'Aman'
+STATUS_TANPA_CL = 'CL Kosong'
+VALUE_FROM_PRICE = 'Quantity x CLOSING PRICE'
+
+
+def _codes(values):
+    return pd.Series(values, dtype=object).astype(str).str.strip().str.upper()
+
+
+def _factorized_codes(values):
+    """factorize dulu, baru normalisasi teks di nilai unik saja (bukan tiap baris)."""
+    row_codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    return row_codes, _codes(uniques)
+
+
+def read_position_collateral(df_sp):
+    """
+    Stock Position Detail -> (kode saham per baris [factorized], kode unik, nilai/quantity
+    per baris, sumber nilai). Baris 'Total' (kolom pertama) dan baris tanpa kode saham
+    dibuang. Sumber nilai = nama kolom Collateral, atau VALUE_FROM_PRICE kalau kolom itu
+    tidak ada (nilai yang dikembalikan masih quantity).
+    """
+    columns = [str(c).strip() for c in df_sp.columns]
+    col_value = next((i for i, c in enumerate(columns) if 'Collateral' in c), None)
+    source = columns[col_value] if col_value is not None else VALUE_FROM_PRICE
+    values = df_sp.iloc[:, col_value if col_value is not None else SP_QTY_COL_IDX]
+
+    first_codes, first_uniques = _factorized_codes(df_sp.iloc[:, 0])
+    is_total = first_uniques.str.contains('TOTAL', regex=False).to_numpy()
+    row_codes, uniques = _factorized_codes(df_sp.iloc[:, SP_STOCK_COL_IDX])
+    keep = (row_codes >= 0) & ~(is_total[first_codes] & (first_codes >= 0))
+
+    return (
+        row_codes[keep], uniques,
+        pd.to_numeric(values, errors='coerce').fillna(0).to_numpy(dtype=float)[keep],
+        source,
+    )
+
+
+class CLUtilization:
+    """Index CL per saham di memori + hitung utilisasi untuk tiap file posisi baru."""
+
+    def __init__(self, df_cl_hasil):
+        df = df_cl_hasil.drop_duplicates('KODE EFEK', keep='first')
+        self.kode = _codes(df['KODE EFEK']).to_numpy()
+        self._index = pd.Index(self.kode)
+        self.cl = pd.to_numeric(df[COL_RMCC], errors='coerce').to_numpy(dtype=float)
+        self.price = (
+            pd.to_numeric(df['CLOSING PRICE'], errors='coerce').to_numpy(dtype=float)
+            if 'CLOSING PRICE' in df.columns else np.full(len(df), np.nan)
+        )
+
+    def exposure(self, df_sp):
+        """Nilai kolateral per saham CL (urutan self.kode) + info kode yang tidak dikenal."""
+        row_codes, uniques, values, source = read_position_collateral(df_sp)
+        # get_indexer cukup untuk kode unik, bukan tiap baris posisi
+        pos = self._index.get_indexer(uniques)[row_codes]
+        known = pos >= 0
+
+        amount = np.bincount(pos[known], weights=values[known], minlength=len(self.kode))
+        if source == VALUE_FROM_PRICE:
+            amount = amount * self.price
+
+        unknown = ~known
+        info = {
+            'sumber_nilai': source,
+            'baris_posisi': len(row_codes),
+            'kode_tidak_dikenal': int(len(np.unique(row_codes[unknown]))),
+            'nilai_tidak_dikenal': float(values[unknown].sum()),
+        }
+        return amount, info
+
+    def check(self, df_sp, warn=WARN_UTILIZATION):
+        """
+        Return (df_util, info):
+          df_util : saham dengan kolateral > 0, urut paling dekat ke batas (utilisasi menurun).
+                    CL 0 dengan kolateral > 0 dihitung utilisasi tak hingga (Lewat CL);
+                    CL kosong -> utilisasi NaN, status CL Kosong, di urutan paling bawah.
+          info    : sumber nilai, jumlah baris posisi, kode tidak dikenal, jumlah per status
+        """
+        amount, info = self.exposure(df_sp)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            util = np.where(self.cl > 0, amount / self.cl, np.where(self.cl == 0, np.inf, np.nan))
+
+        rows = np.flatnonzero(amount > 0)
+        rows = rows[np.lexsort((self.cl[rows] - amount[rows], -util[rows]))]
+        status = np.select(
+            [np.isnan(util[rows]), util[rows] >= 1, util[rows] >= warn],
+            [STATUS_TANPA_CL, STATUS_LEWAT, STATUS_WASPADA], STATUS_AMAN,
+        )
+
+        df_util = pd.DataFrame({
+            'Peringkat': np.arange(1, len(rows) + 1),
+            'KODE EFEK': self.kode[rows],
+            COL_RMCC: self.cl[rows],
+            'Nilai Kolateral': amount[rows],
+            'Utilisasi': util[rows],
+            'Sisa CL': self.cl[rows] - amount[rows],
+            'Status': status,
+        })
+        info.update({
+            'saham_terekspos': len(rows),
+            'lewat': int((status == STATUS_LEWAT).sum()),
+            'waspada': int((status == STATUS_WASPADA).sum()),
+        })
+        return df_util, info
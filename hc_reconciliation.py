@@ -0,0 +1,219 @@
+"""
+hc_reconciliation.py
+------------------
+Rekonsiliasi haircut: publikasi haircut KPEI vs HAIRCUT PEI USULAN DIVISI hasil
+calculate_concentration_limit (pengganti cek manual kolom "PEI (DIFF)"/"KPEI" di
+workbook komite).
+
+- Publikasi KPEI di-parse sekali lalu disimpan per periode (YYYY-MM) di
+  kpei_haircut.csv; sepanjang bulan itu tidak perlu unggah/parse ulang. Di memori
+  di-cache per path + mtime, sudah ber-index KODE EFEK.
+- Join lewat Index.union + get_indexer (bukan merge), lalu semua selisih
+  diklasifikasikan dalam satu np.select.
+- Skala haircut (0-1 atau 0-100) dinormalisasi ke pecahan per kolom, aturan yang
+  sama dengan reset_concentration_limit_mask. Di kolom HAIRCUT PEI USULAN DIVISI
+  nilai 1.0 selalu berarti 100% (dipaksa untuk CL = 0), apa pun skala kolomnya.
+"""
+
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from cl_engine import COL_HAIRCUT_USULAN, COL_PERTIMBANGAN_HC, TOLERANCE
+
+KPEI_STORE_FILE = 'kpei_haircut.csv'
+COL_PERIODE = 'Periode'
+COL_HC_KPEI_PUB = 'HAIRCUT KPEI (PUBLIKASI)'
+COL_HC_KPEI_SUMBER = 'HAIRCUT KPEI (SUMBER)'
+COL_SELISIH = 'SELISIH (PEI - KPEI)'
+COL_KATEGORI = 'KATEGORI'
+COL_SUMBER_BEDA = 'SUMBER KPEI ≠ PUBLIKASI'
+
+HEADER_SCAN_ROWS = 15
+
+KATEGORI_SAMA = 'Sama'
+KATEGORI_PEI_LEBIH_TINGGI = 'PEI Lebih Tinggi'
+KATEGORI_PEI_LEBIH_RENDAH = 'PEI Lebih Rendah'
+KATEGORI_KPEI_KOSONG = 'Haircut KPEI Kosong'
+KATEGORI_PEI_KOSONG = 'Haircut PEI Kosong'
+KATEGORI_HANYA_PEI = 'Hanya di PEI'
+KATEGORI_HANYA_KPEI = 'Hanya di KPEI'
+# urutan tampilan / ringkasan
+KATEGORI_REKON = [
+    KATEGORI_PEI_LEBIH_RENDAH, KATEGORI_PEI_LEBIH_TINGGI, KATEGORI_HANYA_KPEI,
+    KATEGORI_HANYA_PEI, KATEGORI_PEI_KOSONG, KATEGORI_KPEI_KOSONG, KATEGORI_SAMA,
+]
+
+
+def _codes(values):
+    return pd.Series(values, dtype=object).astype(str).str.strip().str.upper()
+
+
+def haircut_fraction(haircut, forced_full=False):
+    """
+    Haircut numerik skala 0-1 (kolom berskala 0-100 dibagi 100).
+
+    forced_full : True untuk HAIRCUT PEI USULAN DIVISI -- calculate_concentration_limit
+                  mengisi 1.0 (skala 0-1) untuk saham CL = 0 walau kolomnya 0-100, jadi
+                  di kolom berskala 0-100 nilai 1.0 dibaca 100%, bukan 1%.
+    """
+    haircut = pd.to_numeric(haircut, errors='coerce')
+    valid = haircut.dropna()
+    if not valid.empty and valid.max() > 1 + TOLERANCE:
+        fraction = haircut / 100
+        if forced_full:
+            fraction = fraction.mask((haircut - 1.0).abs() <= TOLERANCE, 1.0)
+        return fraction
+    return haircut
+
+
+# ─────────────────────────────────────────────
+# PUBLIKASI KPEI
+# ─────────────────────────────────────────────
+def _find_column(header, *keywords):
+    for i, h in enumerate(header):
+        if all(k in h for k in keywords):
+            return i
+    return None
+
+
+def read_kpei_publication(file, filename=''):
+    """
+    Publikasi haircut KPEI (xlsx/csv) -> [KODE EFEK, HAIRCUT KPEI (PUBLIKASI)] skala 0-1.
+    Baris header dicari di HEADER_SCAN_ROWS baris pertama (baris yang memuat 'KODE' dan
+    'HAIRCUT'); kolom haircut yang memuat 'KPEI' diutamakan.
+    """
+    if str(filename).lower().endswith('.csv'):
+        raw = pd.read_csv(file, header=None, dtype=object)
+    else:
+        raw = pd.read_excel(file, header=None, engine='openpyxl')
+
+    for row in range(min(HEADER_SCAN_ROWS, len(raw))):
+        header = [' '.join(str(h).split()).upper() if pd.notna(h) else '' for h in raw.iloc[row]]
+        c_kode = _find_column(header, 'KODE')
+        if c_kode is None:
+            c_kode = _find_column(header, 'CODE')
+        c_hc = _find_column(header, 'HAIRCUT', 'KPEI')
+        if c_hc is None:
+            c_hc = _find_column(header, 'HAIRCUT')
+        if c_kode is not None and c_hc is not None:
+            break
+    else:
+        raise ValueError("Header publikasi KPEI tidak ditemukan (butuh kolom KODE dan HAIRCUT)")
+
+    body = raw.iloc[row + 1:]
+    haircut = body.iloc[:, c_hc]
+    if haircut.dtype == object:
+        haircut = haircut.astype(str).str.replace('%', '', regex=False).str.strip()
+    df = pd.DataFrame({
+        'KODE EFEK': _codes(body.iloc[:, c_kode]).to_numpy(),
+        COL_HC_KPEI_PUB: haircut_fraction(haircut).to_numpy(dtype=float),
+    })
+    df = df[body.iloc[:, c_kode].notna().to_numpy() & (df['KODE EFEK'] != '')]
+    return df.drop_duplicates('KODE EFEK', keep='last').reset_index(drop=True)
+
+
+@lru_cache(maxsize=2)
+def _read_kpei_store(path, mtime):
+    # mtime ikut jadi key cache -> file dibaca ulang hanya kalau ada publikasi baru disimpan
+    if not mtime:
+        return {}
+    df = pd.read_csv(path, dtype={COL_PERIODE: str, 'KODE EFEK': str}, float_precision='round_trip')
+    return {
+        period: part.drop(columns=[COL_PERIODE]).set_index('KODE EFEK')
+        for period, part in df.groupby(COL_PERIODE, sort=True)
+    }
+
+
+def load_kpei_store(path=KPEI_STORE_FILE):
+    """{periode 'YYYY-MM': frame ber-index KODE EFEK} dari publikasi yang sudah disimpan."""
+    mtime = os.path.getmtime(path) if os.path.exists(path) else 0
+    return _read_kpei_store(os.path.abspath(path), mtime)
+
+
+def save_kpei_publication(df_kpei, period, path=KPEI_STORE_FILE):
+    """Simpan publikasi KPEI untuk satu periode (menggantikan periode yang sama). Return jumlah baris."""
+    stored = [
+        part.reset_index().assign(**{COL_PERIODE: p})
+        for p, part in load_kpei_store(path).items() if p != period
+    ]
+    df = pd.concat(stored + [df_kpei.assign(**{COL_PERIODE: period})], ignore_index=True)
+    tmp_path = f'{path}.tmp'
+    df[[COL_PERIODE, 'KODE EFEK', COL_HC_KPEI_PUB]].to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return len(df_kpei)
+
+
+# ─────────────────────────────────────────────
+# REKONSILIASI
+# ─────────────────────────────────────────────
+def _take(values, pos):
+    out = np.full(len(pos), np.nan)
+    found = pos >= 0
+    out[found] = values[pos[found]]
+    return out
+
+
+def reconcile_haircut(df_hasil, df_kpei, tolerance=TOLERANCE):
+    """
+    df_hasil : hasil CL (KODE EFEK, HAIRCUT PEI USULAN DIVISI [, HAIRCUT KPEI, UMA, PERTIMBANGAN])
+    df_kpei  : publikasi KPEI ber-index KODE EFEK (load_kpei_store) atau frame read_kpei_publication
+
+    Return (df_recon, df_summary): satu baris per kode gabungan kedua sisi, urut kategori
+    lalu selisih absolut terbesar; ringkasan jumlah saham per kategori.
+    """
+    if 'KODE EFEK' in df_kpei.columns:
+        df_kpei = df_kpei.set_index('KODE EFEK')
+    pei = df_hasil.assign(**{'KODE EFEK': _codes(df_hasil['KODE EFEK']).to_numpy()})
+    pei = pei.drop_duplicates('KODE EFEK', keep='first').set_index('KODE EFEK')
+
+    codes = pei.index.union(df_kpei.index)
+    pos_pei = pei.index.get_indexer(codes)
+    pos_kpei = df_kpei.index.get_indexer(codes)
+
+    hc_pei = _take(haircut_fraction(pei[COL_HAIRCUT_USULAN], forced_full=True).to_numpy(dtype=float), pos_pei)
+    hc_kpei = _take(df_kpei[COL_HC_KPEI_PUB].to_numpy(dtype=float), pos_kpei)
+    diff = hc_pei - hc_kpei
+
+    kategori = np.select(
+        [
+            pos_pei < 0,
+            pos_kpei < 0,
+            np.isnan(hc_pei),
+            np.isnan(hc_kpei),
+            np.abs(diff) <= tolerance,
+            diff > 0,
+        ],
+        [
+            KATEGORI_HANYA_KPEI, KATEGORI_HANYA_PEI, KATEGORI_PEI_KOSONG, KATEGORI_KPEI_KOSONG,
+            KATEGORI_SAMA, KATEGORI_PEI_LEBIH_TINGGI,
+        ],
+        KATEGORI_PEI_LEBIH_RENDAH,
+    )
+
+    df_recon = pd.DataFrame({
+        'KODE EFEK': codes,
+        COL_HAIRCUT_USULAN: hc_pei,
+        COL_HC_KPEI_PUB: hc_kpei,
+        COL_SELISIH: diff,
+        COL_KATEGORI: pd.Categorical(kategori, categories=KATEGORI_REKON),
+    })
+    if 'HAIRCUT KPEI' in pei.columns:
+        # HAIRCUT KPEI di file sumber HCCL harus sama dengan publikasi (dipakai untuk saham UMA)
+        hc_sumber = _take(haircut_fraction(pei['HAIRCUT KPEI']).to_numpy(dtype=float), pos_pei)
+        df_recon[COL_HC_KPEI_SUMBER] = hc_sumber
+        df_recon[COL_SUMBER_BEDA] = (
+            ~np.isnan(hc_sumber) & ~np.isnan(hc_kpei) & (np.abs(hc_sumber - hc_kpei) > tolerance)
+        )
+    for col in ('UMA', COL_PERTIMBANGAN_HC):
+        if col in pei.columns:
+            df_recon[col] = pei[col].astype(object).reindex(codes).to_numpy()
+
+    df_recon = df_recon.iloc[np.lexsort((-np.nan_to_num(np.abs(diff)), df_recon[COL_KATEGORI].cat.codes))]
+    df_summary = (
+        df_recon[COL_KATEGORI].value_counts(sort=False)
+        .rename_axis(COL_KATEGORI).reset_index(name='Jumlah Saham')
+    )
+    return df_recon.reset_index(drop=True), df_summary
@@ -0,0 +1,124 @@
+"""
+holdings_index.py
+------------------
+Index kepemilikan (stock x account) dari Stock Position Detail untuk drill-down LL.
+
+Dibangun sekali per upload:
+- kode saham & akun di-factorize jadi kode integer (categorical),
+- kepemilikan disimpan sebagai array CSR: per saham, baris posisi urut qty menurun,
+- pasangan top-2 disimpan lagi dalam CSR per akun.
+
+Peringkat dihitung per BARIS posisi (akun dengan beberapa baris di saham yang sama
+tidak dijumlah), definisi yang sama dengan ll_engine.top_two_holders -- rank 1/2 di
+sini = First/Second Largerst di halaman LL.
+
+Jadi "top-k holder saham X" dan "saham apa saja yang akun Y jadi top-2" cukup
+berupa slice array, tanpa membuka ulang file 100k baris. Setelah delta intraday,
+index dibangun ulang dari state IntradayLLState (from_intraday).
+"""
+
+import numpy as np
+import pandas as pd
+
+from ll_intraday import normalise_accounts
+from stock_master import normalise_codes
+
+ACCOUNT_COL_IDX = 0
+STOCK_COL_IDX = 1
+QTY_COL_IDX = 10
+
+
+class HoldingsIndex:
+    def __init__(self, stock_codes, account_codes, stocks, accounts, qty):
+        """Pakai HoldingsIndex.from_stock_position(df_sp)."""
+        self.stocks = stocks            # array label saham, index = kode saham
+        self.accounts = accounts        # array label akun, index = kode akun
+        self._stock_pos = {s: i for i, s in enumerate(stocks)}
+        self._account_pos = {a: i for i, a in enumerate(accounts)}
+
+        # CSR per saham (baris urut qty menurun; lexsort stabil -> tie ikut urutan baris asli)
+        order = np.lexsort((-qty, stock_codes))
+        self._s_acc = account_codes[order]
+        self._s_qty = qty[order]
+        s_sorted = stock_codes[order]
+        self._s_ptr = np.searchsorted(s_sorted, np.arange(len(stocks) + 1))
+        self._on_hand = np.bincount(stock_codes, weights=qty, minlength=len(stocks))
+
+        # rank di dalam saham -> pasangan top-2, lalu CSR per akun
+        rank = np.arange(len(s_sorted)) - self._s_ptr[s_sorted]
+        top2 = rank < 2
+        t_acc, t_stock, t_rank, t_qty = self._s_acc[top2], s_sorted[top2], rank[top2], self._s_qty[top2]
+        order_a = np.lexsort((t_stock, t_acc))
+        self._a_stock = t_stock[order_a]
+        self._a_rank = t_rank[order_a]
+        self._a_qty = t_qty[order_a]
+        self._a_ptr = np.searchsorted(t_acc[order_a], np.arange(len(accounts) + 1))
+
+    @classmethod
+    def from_stock_position(cls, df_sp):
+        df_sp = df_sp.copy()
+        df_sp.columns = df_sp.columns.str.strip()
+        df = pd.DataFrame({
+            'stock': normalise_codes(df_sp.iloc[:, STOCK_COL_IDX]).to_numpy(),
+            'acc': normalise_accounts(df_sp.iloc[:, ACCOUNT_COL_IDX]).to_numpy(),
+            'qty': pd.to_numeric(df_sp.iloc[:, QTY_COL_IDX], errors='coerce').fillna(0).to_numpy(),
+        }).dropna(subset=['stock'])
+        return cls._from_rows(df)
+
+    @classmethod
+    def from_intraday(cls, state):
+        """Index dari posisi terkini IntradayLLState (setelah delta)."""
+        df = pd.DataFrame(
+            [(s, a, q) for s, held in state.holdings.items() for a, qs in held.items() for q in qs],
+            columns=['stock', 'acc', 'qty'],
+        )
+        return cls._from_rows(df)
+
+    @classmethod
+    def _from_rows(cls, df):
+        stock_codes, stocks = pd.factorize(df['stock'], sort=True)
+        account_codes, accounts = pd.factorize(df['acc'], sort=True)
+        return cls(
+            stock_codes.astype(np.int32), account_codes.astype(np.int32),
+            np.asarray(stocks), np.asarray(accounts), df['qty'].to_numpy(dtype=float),
+        )
+
+    # ─────────────────────────────────────────
+    # QUERY
+    # ─────────────────────────────────────────
+    def top_holders(self, stock, k=10):
+        """Top-k baris posisi saham `stock` (Rank, Account, Quantity, % On Hand); akun bisa muncul > 1 kali."""
+        s = self._stock_pos.get(stock)
+        if s is None:
+            return pd.DataFrame(columns=['Rank', 'Account', 'Quantity', '% On Hand'])
+        lo, hi = self._s_ptr[s], min(self._s_ptr[s] + k, self._s_ptr[s + 1])
+        qty = self._s_qty[lo:hi]
+        on_hand = self._on_hand[s]
+        return pd.DataFrame({
+            'Rank': np.arange(1, hi - lo + 1),
+            'Account': self.accounts[self._s_acc[lo:hi]],
+            'Quantity': qty,
+            '% On Hand': qty / on_hand if on_hand else np.zeros(len(qty)),
+        })
+
+    def stocks_where_top2(self, account):
+        """Semua saham di mana `account` adalah pemegang terbesar #1 atau #2."""
+        a = self._account_pos.get(account)
+        if a is None:
+            return pd.DataFrame(columns=['Stock Code', 'Rank', 'Quantity', '% On Hand'])
+        lo, hi = self._a_ptr[a], self._a_ptr[a + 1]
+        stocks = self._a_stock[lo:hi]
+        qty = self._a_qty[lo:hi]
+        on_hand = self._on_hand[stocks]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct = np.where(on_hand != 0, qty / on_hand, 0.0)
+        return pd.DataFrame({
+            'Stock Code': self.stocks[stocks],
+            'Rank': self._a_rank[lo:hi] + 1,
+            'Quantity': qty,
+            '% On Hand': pct,
+        })
+
+    @property
+    def n_holdings(self):
+        return len(self._s_qty)
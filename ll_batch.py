@@ -0,0 +1,183 @@
+"""
+ll_batch.py
+------------------
+Mode backfill Lendable Limit multi-hari.
+
+Input berupa kumpulan file (upload banyak file atau satu .zip) yang berisi triplet
+per tanggal: Instrument, Stock Position Detail, BorrPosition. Tanggal dibaca dari
+nama file (YYYYMMDD / YYYY-MM-DD / YYYY_MM_DD). Tiap tanggal dihitung di proses
+terpisah (ProcessPoolExecutor) memakai ll_engine, lalu digabung jadi satu workbook
+(sheet per tanggal) + laporan waktu proses per tanggal.
+"""
+
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import pandas as pd
+
+from ll_engine import (
+    FINAL_COLUMNS_LL, build_ll_aggregates, compute_lendable_limit,
+    instrument_name_lookup, load_instrument, split_ll_result,
+)
+
+BORROW_AMOUNT_COL = 'Borrow Amount (shares)'
+KIND_INSTRUMENT = 'Instrument'
+KIND_STOCK_POSITION = 'Stock Position Detail'
+KIND_BORROW = 'BorrPosition'
+REQUIRED_KINDS = [KIND_INSTRUMENT, KIND_STOCK_POSITION, KIND_BORROW]
+
+_DATE_PATTERNS = [
+    (re.compile(r'(20\d{2})[-_](\d{2})[-_](\d{2})'), '%Y%m%d'),
+    (re.compile(r'(20\d{2})(\d{2})(\d{2})'), '%Y%m%d'),
+]
+
+
+# ─────────────────────────────────────────────
+# PENGELOMPOKAN FILE
+# ─────────────────────────────────────────────
+def detect_kind(filename):
+    """Jenis file dari namanya (case-insensitive, spasi/underscore diabaikan)."""
+    key = re.sub(r'[\s_\-]', '', os.path.basename(filename).upper())
+    if 'INSTRUMENT' in key:
+        return KIND_INSTRUMENT
+    if 'STOCKPOSITION' in key or 'POSITIONDETAIL' in key:
+        return KIND_STOCK_POSITION
+    if 'BORR' in key:
+        return KIND_BORROW
+    return None
+
+
+def detect_date(filename):
+    """Tanggal (Timestamp) dari nama file, None kalau tidak ada pola tanggal."""
+    name = os.path.basename(filename)
+    for pattern, fmt in _DATE_PATTERNS:
+        m = pattern.search(name)
+        if m:
+            parsed = pd.to_datetime(''.join(m.groups()), format=fmt, errors='coerce')
+            if pd.notna(parsed):
+                return parsed.normalize()
+    return None
+
+
+def expand_uploads(named_files):
+    """
+    named_files: list (nama, bytes). File .zip dibongkar jadi entri-entri xlsx di dalamnya.
+    Return list (nama, bytes) tanpa zip.
+    """
+    expanded = []
+    for name, data in named_files:
+        if name.lower().endswith('.zip'):
+            with zipfile.ZipFile(BytesIO(data)) as zf:
+                for info in zf.infolist():
+                    base = os.path.basename(info.filename)
+                    if info.is_dir() or base.startswith('~$') or not base.lower().endswith('.xlsx'):
+                        continue
+                    expanded.append((info.filename, zf.read(info)))
+        else:
+            expanded.append((name, data))
+    return expanded
+
+
+def group_ll_inputs(named_files):
+    """
+    Kelompokkan file per tanggal.
+
+    Return (triplets, skipped):
+      triplets : {Timestamp: {kind: bytes}} hanya untuk tanggal yang lengkap
+      skipped  : list (nama/tanggal, alasan)
+    """
+    by_date, skipped = {}, []
+    for name, data in expand_uploads(named_files):
+        kind, day = detect_kind(name), detect_date(name)
+        if kind is None or day is None:
+            skipped.append((name, 'jenis/tanggal file tidak dikenali'))
+            continue
+        by_date.setdefault(day, {})[kind] = data
+
+    triplets = {}
+    for day, files in sorted(by_date.items()):
+        missing = [k for k in REQUIRED_KINDS if k not in files]
+        if missing:
+            skipped.append((day.strftime('%Y-%m-%d'), f"file kurang: {', '.join(missing)}"))
+        else:
+            triplets[day] = files
+    return triplets, skipped
+
+
+# ─────────────────────────────────────────────
+# WORKER
+# ─────────────────────────────────────────────
+def run_ll_for_date(day, files):
+    """Hitung LL satu tanggal (dipanggil di worker process). Return (day, df_result_static, timing)."""
+    t0 = time.perf_counter()
+    df_sp = pd.read_excel(BytesIO(files[KIND_STOCK_POSITION]), header=0, engine='openpyxl')
+    df_instr, df_instr_raw = load_instrument(BytesIO(files[KIND_INSTRUMENT]))
+    df_borr_pos = pd.read_excel(BytesIO(files[KIND_BORROW]), header=0, engine='openpyxl')
+    t1 = time.perf_counter()
+
+    df_borrow_position = (
+        df_borr_pos.groupby('Stock Code')[BORROW_AMOUNT_COL].sum()
+        .reset_index().rename(columns={BORROW_AMOUNT_COL: 'Borrow Position'})
+    )
+    df_agg = build_ll_aggregates(df_sp, df_instr, instrument_name_lookup(df_instr_raw), df_borrow_position)
+    _, df_result_static = split_ll_result(compute_lendable_limit(df_agg))
+    t2 = time.perf_counter()
+
+    timing = {
+        'Tanggal': day,
+        'Baris Stock Position': len(df_sp),
+        'Saham LL': len(df_result_static),
+        'Baca File (s)': round(t1 - t0, 3),
+        'Hitung LL (s)': round(t2 - t1, 3),
+        'Total (s)': round(t2 - t0, 3),
+        'PID Worker': os.getpid(),
+    }
+    return day, df_result_static, timing
+
+
+def run_ll_backfill(triplets, max_workers=None):
+    """
+    Jalankan run_ll_for_date untuk semua tanggal secara paralel.
+
+    Return (results, df_timing): results = {Timestamp: df_result_static} urut tanggal,
+    df_timing = satu baris per tanggal (+ kolom Error kalau tanggal itu gagal).
+    """
+    max_workers = max_workers or min(len(triplets), os.cpu_count() or 1) or 1
+    results, timings = {}, []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {day: pool.submit(run_ll_for_date, day, files) for day, files in triplets.items()}
+        for day, fut in futures.items():
+            try:
+                _, df_static, timing = fut.result()
+                results[day] = df_static
+                timings.append(timing)
+            except Exception as e:
+                timings.append({'Tanggal': day, 'Error': str(e)})
+
+    df_timing = pd.DataFrame(timings)
+    if not df_timing.empty:
+        df_timing = df_timing.sort_values('Tanggal').reset_index(drop=True)
+    return dict(sorted(results.items())), df_timing
+
+
+# ─────────────────────────────────────────────
+# OUTPUT
+# ─────────────────────────────────────────────
+def write_backfill_workbook(results, df_timing):
+    """Satu workbook: sheet 'LL YYYY-MM-DD' per tanggal + sheet 'Timing'."""
+    out = BytesIO()
+    with pd.ExcelWriter(out, engine='xlsxwriter') as writer:
+        for day, df_static in results.items():
+            df_static.reindex(columns=FINAL_COLUMNS_LL).to_excel(
+                writer, sheet_name=f"LL {day.strftime('%Y-%m-%d')}", index=False
+            )
+        df_out = df_timing.copy()
+        if 'Tanggal' in df_out:
+            df_out['Tanggal'] = pd.to_datetime(df_out['Tanggal']).dt.strftime('%Y-%m-%d')
+        df_out.to_excel(writer, sheet_name='Timing', index=False)
+    out.seek(0)
+    return out
@@ -0,0 +1,254 @@
+"""
+ll_engine.py
+------------------
+Mesin perhitungan Lendable Limit (LL) yang dipakai pages/01_Lendable_Limit.py.
+
+Semua fungsi di sini murni pandas/numpy (tanpa streamlit) supaya bisa dipanggil
+ulang dari mode lain (simulasi, batch, intraday) tanpa membawa state UI.
+"""
+
+import numpy as np
+import pandas as pd
+
+from stock_master import normalise_codes
+
+FIRST_LARGERST_COL = "First Largerst"
+SECOND_LARGERST_COL = "Second Largerst"
+
+# Parameter default LL (bisa diubah di mode simulasi)
+STOCK_CODE_BLACKLIST = ['BEBS', 'IPPE', 'WMPP', 'WMUU']
+ON_HAND_PCT = 0.30
+REPO_PCT = 0.10
+
+FINAL_COLUMNS_LL = [
+    'Stock Code', 'Stock Name', 'Quantity On Hand',
+    FIRST_LARGERST_COL, SECOND_LARGERST_COL, 'Total two Largerst',
+    'Quantity Available', 'Thirty Percent On Hand', 'REPO',
+    'Lendable Limit', 'Borrow Position', 'Available Lendable Limit'
+]
+AGGREGATE_COLUMNS_LL = [
+    'Stock Code', 'Stock Name', 'Quantity On Hand', FIRST_LARGERST_COL,
+    SECOND_LARGERST_COL, 'REPO_Base', 'Borrow Position'
+]
+
+
+# ─────────────────────────────────────────────
+# TOP-K PER GROUP
+# ─────────────────────────────────────────────
+def top_k_per_group(keys, values, k=2, fill_value=0.0):
+    """
+    Ambil k nilai terbesar per grup tanpa groupby.apply / sort per grup.
+
+    Tiap putaran mengambil maksimum per grup (np.maximum.at) lalu "mencabut" satu
+    baris pemenangnya, jadi biayanya O(n * k) -- untuk k=2 jauh lebih murah
+    daripada sort penuh jutaan baris akun.
+
+    keys/values: array-like sepanjang n (mis. kolom kode saham & quantity).
+    Return (uniques, top) dengan top berbentuk (n_grup, k), urut menurun,
+    slot kosong diisi fill_value. Key/nilai NaN diabaikan (sama seperti groupby + dropna).
+    """
+    codes, uniques = pd.factorize(pd.Series(keys).to_numpy(), sort=True)
+    vals = np.asarray(values, dtype=float)
+
+    valid = (codes >= 0) & ~np.isnan(vals)
+    codes = codes[valid]
+    remaining = vals[valid].copy()
+
+    top = np.full((len(uniques), k), fill_value, dtype=float)
+    for rank in range(k):
+        group_max = np.full(len(uniques), -np.inf)
+        np.maximum.at(group_max, codes, remaining)
+
+        # satu baris pemenang per grup (baris pertama yang menyamai maksimum)
+        hit = np.flatnonzero((remaining == group_max[codes]) & (remaining > -np.inf))
+        if len(hit) == 0:
+            break
+        _, first_pos = np.unique(codes[hit], return_index=True)
+        winners = hit[first_pos]
+
+        top[codes[winners], rank] = remaining[winners]
+        remaining[winners] = -np.inf
+    return uniques, top
+
+
+def top_two_holders(df_sp, stock_col, qty_col):
+    """
+    First/Second Largerst per saham dari Stock Position Detail.
+
+    Return DataFrame [stock_col, First Largerst, Second Largerst], satu baris per saham.
+    """
+    uniques, top = top_k_per_group(df_sp[stock_col], df_sp[qty_col], k=2)
+    return pd.DataFrame({
+        stock_col: uniques,
+        FIRST_LARGERST_COL: top[:, 0],
+        SECOND_LARGERST_COL: top[:, 1],
+    })
+
+
+# ─────────────────────────────────────────────
+# LOADER INSTRUMENT
+# ─────────────────────────────────────────────
+SHEET_INST_OLD = 'Instrument'
+INSTR_HEADER_ROW = 1          # baris header asli (0-based) di sheet Instrument
+INSTR_STOCK_CODE_IDX = 2      # kolom C
+INSTR_STOCK_NAME_IDX = 9      # kolom J
+
+
+def load_instrument(file, sheet_name=SHEET_INST_OLD):
+    """
+    Parse sheet Instrument SEKALI (header=None), lalu turunkan dua view:
+
+    - df_instr     : setara read_excel(header=1) -> kolom bernama (Local Code, Used Loan Qty, ...)
+    - df_instr_raw : setara read_excel(header=None) -> dipakai lookup Stock Name & ditulis balik ke Konsolidasi
+
+    Sebelumnya workbook di-parse dua kali untuk dua view ini.
+    """
+    df_instr_raw = pd.read_excel(file, sheet_name=sheet_name, header=None, engine='openpyxl')
+
+    header = df_instr_raw.iloc[INSTR_HEADER_ROW]
+    columns = [
+        str(h).strip() if pd.notna(h) else f"Unnamed: {i}"
+        for i, h in enumerate(header)
+    ]
+    df_instr = df_instr_raw.iloc[INSTR_HEADER_ROW + 1:].copy()
+    df_instr.columns = columns
+    df_instr = df_instr.reset_index(drop=True).infer_objects()
+
+    return df_instr, df_instr_raw
+
+
+def instrument_name_lookup(df_instr_raw):
+    """Stock Code (kolom C) -> Stock Name (kolom J) dari view raw Instrument (tanpa baris header)."""
+    return (
+        df_instr_raw.iloc[INSTR_HEADER_ROW + 1:]
+        .rename(columns={INSTR_STOCK_CODE_IDX: 'Stock Code', INSTR_STOCK_NAME_IDX: 'Stock Name'})
+        [['Stock Code', 'Stock Name']]
+        .drop_duplicates('Stock Code')
+    )
+
+
+# ─────────────────────────────────────────────
+# PERHITUNGAN LL
+# ─────────────────────────────────────────────
+def build_ll_aggregates(df_sp, df_instr, df_inst_lookup, df_borrow_position):
+    """
+    Agregat per saham yang jadi input rumus LL (tidak bergantung parameter):
+    Quantity On Hand, First/Second Largerst, REPO_Base, Borrow Position.
+
+    df_sp              : Stock Position Detail (kolom B = kode saham, kolom K = quantity)
+    df_instr           : view bernama dari load_instrument
+    df_inst_lookup     : hasil instrument_name_lookup
+    df_borrow_position : [Stock Code, Borrow Position]
+    """
+    df_sp = df_sp.copy()
+    df_sp.columns = df_sp.columns.str.strip()
+    stock_col = df_sp.columns[1]
+    qty_col = df_sp.columns[10]
+    df_sp[qty_col] = pd.to_numeric(df_sp[qty_col], errors='coerce').fillna(0)
+
+    largest_calc = top_two_holders(df_sp, stock_col, qty_col).rename(columns={stock_col: 'Stock Code'})
+
+    df_instr = df_instr.copy()
+    df_instr.columns = df_instr.columns.str.strip()
+    col_row, col_loan, col_repo = "Local Code", "Used Loan Qty", "Used Reverse Repo Qty"
+    df_instr[col_loan] = pd.to_numeric(df_instr[col_loan], errors='coerce').fillna(0)
+    df_instr[col_repo] = pd.to_numeric(df_instr[col_repo], errors='coerce').fillna(0)
+
+    df_pivot_full = df_instr.groupby(col_row)[[col_loan, col_repo]].sum().reset_index()
+
+    df_result = df_pivot_full[['Local Code']].rename(columns={'Local Code': 'Stock Code'}).drop_duplicates()
+    df_result = df_result.merge(df_inst_lookup, on='Stock Code', how='left')
+
+    qoh_calc = df_sp.groupby(stock_col)[qty_col].sum().reset_index().rename(columns={stock_col: 'Stock Code', qty_col: 'Quantity On Hand'})
+    df_result = df_result.merge(qoh_calc, on='Stock Code', how='left').fillna(0)
+
+    # Borrow Position dicocokkan lewat kode ternormalisasi (lihat unmatched_borrow_position)
+    borrow = borrow_position_by_code(df_borrow_position)
+    df_result['Borrow Position'] = normalise_codes(df_result['Stock Code']).map(borrow).fillna(0).to_numpy()
+    df_result = df_result.merge(largest_calc, on='Stock Code', how='left').fillna(0)
+
+    repo_base = df_pivot_full.rename(columns={'Local Code': 'Stock Code', 'Used Reverse Repo Qty': 'REPO_Base'})[['Stock Code', 'REPO_Base']]
+    df_result = df_result.merge(repo_base, on='Stock Code', how='left').fillna(0)
+
+    return df_result[AGGREGATE_COLUMNS_LL]
+
+
+def borrow_position_by_code(df_borrow_position):
+    """[Stock Code, Borrow Position] -> Series kode ternormalisasi -> total Borrow Position."""
+    qty = pd.to_numeric(df_borrow_position['Borrow Position'], errors='coerce').fillna(0)
+    return qty.groupby(normalise_codes(df_borrow_position['Stock Code']).to_numpy()).sum()
+
+
+def unmatched_borrow_position(df_agg, df_borrow_position):
+    """
+    Borrow Position yang kodenya tidak ada di agregat LL (tidak ikut mengurangi Available LL).
+    Return Series kode ternormalisasi -> Borrow Position.
+    """
+    borrow = borrow_position_by_code(df_borrow_position)
+    return borrow[~borrow.index.isin(normalise_codes(df_agg['Stock Code']))]
+
+
+def compute_lendable_limit(df_agg, on_hand_pct=ON_HAND_PCT, repo_pct=REPO_PCT):
+    """Rumus LL di atas agregat per saham -- murni aritmetika kolom."""
+    df_result = df_agg.copy()
+    df_result['Total two Largerst'] = df_result[FIRST_LARGERST_COL] + df_result[SECOND_LARGERST_COL]
+    df_result['Quantity Available'] = df_result['Quantity On Hand'] - df_result['Total two Largerst']
+    df_result['Thirty Percent On Hand'] = on_hand_pct * df_result['Quantity On Hand']
+    df_result['REPO'] = repo_pct * df_result['REPO_Base']
+    df_result['Lendable Limit'] = np.minimum(df_result['Thirty Percent On Hand'], df_result['Quantity Available']) + df_result['REPO']
+    df_result['Available Lendable Limit'] = df_result['Lendable Limit'] - df_result['Borrow Position']
+    return df_result
+
+
+def split_ll_result(df_result, blacklist=STOCK_CODE_BLACKLIST):
+    """
+    Return (df_result_filtered, df_result_static):
+    - filtered : semua saham kecuali blacklist (dipakai Konsolidasi)
+    - static   : yang LL > 0 atau Available LL > 0, kolom FINAL_COLUMNS_LL (dipakai template)
+    """
+    df_result_filtered = df_result[~df_result['Stock Code'].isin(blacklist)].copy()
+    df_result_static = df_result_filtered[
+        (df_result_filtered['Lendable Limit'] > 0) | (df_result_filtered['Available Lendable Limit'] > 0)
+    ].reindex(columns=FINAL_COLUMNS_LL)
+    return df_result_filtered, df_result_static
+
+
+# ─────────────────────────────────────────────
+# SIMULASI PARAMETER (WHAT-IF)
+# ─────────────────────────────────────────────
+def ll_arrays(df_agg, on_hand_pct=ON_HAND_PCT, repo_pct=REPO_PCT):
+    """(Lendable Limit, Available Lendable Limit) sebagai array numpy, urutan = baris df_agg."""
+    qoh = df_agg['Quantity On Hand'].to_numpy(dtype=float)
+    top2 = df_agg[FIRST_LARGERST_COL].to_numpy(dtype=float) + df_agg[SECOND_LARGERST_COL].to_numpy(dtype=float)
+    ll = np.minimum(on_hand_pct * qoh, qoh - top2) + repo_pct * df_agg['REPO_Base'].to_numpy(dtype=float)
+    return ll, ll - df_agg['Borrow Position'].to_numpy(dtype=float)
+
+
+def diff_ll_scenario(df_agg, scenario, baseline=None):
+    """
+    Bandingkan skenario parameter vs baseline di atas agregat yang sama.
+
+    scenario/baseline: dict {on_hand_pct, repo_pct, blacklist}; baseline default = parameter produksi.
+    Return DataFrame hanya untuk saham yang LL/Available LL/status blacklist-nya berubah.
+    """
+    baseline = baseline or {'on_hand_pct': ON_HAND_PCT, 'repo_pct': REPO_PCT, 'blacklist': STOCK_CODE_BLACKLIST}
+    ll_base, avail_base = ll_arrays(df_agg, baseline['on_hand_pct'], baseline['repo_pct'])
+    ll_sim, avail_sim = ll_arrays(df_agg, scenario['on_hand_pct'], scenario['repo_pct'])
+
+    codes = df_agg['Stock Code']
+    bl_base = codes.isin(baseline['blacklist']).to_numpy()
+    bl_sim = codes.isin(scenario['blacklist']).to_numpy()
+
+    changed = (~np.isclose(ll_base, ll_sim)) | (~np.isclose(avail_base, avail_sim)) | (bl_base != bl_sim)
+    return pd.DataFrame({
+        'Stock Code': codes.to_numpy()[changed],
+        'Stock Name': df_agg['Stock Name'].to_numpy()[changed],
+        'Lendable Limit (Baseline)': ll_base[changed],
+        'Lendable Limit (Simulasi)': ll_sim[changed],
+        'Δ Lendable Limit': (ll_sim - ll_base)[changed],
+        'Available LL (Baseline)': avail_base[changed],
+        'Available LL (Simulasi)': avail_sim[changed],
+        'Δ Available LL': (avail_sim - avail_base)[changed],
+        'Blacklist (Baseline)': bl_base[changed],
+        'Blacklist (Simulasi)': bl_sim[changed],
+    })
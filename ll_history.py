@@ -0,0 +1,141 @@
+"""
+ll_history.py
+------------------
+Penyimpanan riwayat hasil Lendable Limit (df_result_static) per tanggal di SQLite lokal.
+
+Pakai sqlite3 bawaan Python (tidak menambah dependency). Tabel `ll_history`
+ber-primary key (run_date, "Stock Code") + index di "Stock Code", jadi:
+- simpan ulang tanggal yang sama = replace (bukan duplikat),
+- ambil satu tanggal / tren satu saham cukup lewat index.
+"""
+
+import os
+import sqlite3
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from ll_engine import FINAL_COLUMNS_LL
+
+# di folder modul, bukan working directory proses
+HISTORY_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'll_history.sqlite')
+TABLE = 'll_history'
+DATE_FMT = '%Y-%m-%d'
+
+_NUMERIC_COLUMNS = [c for c in FINAL_COLUMNS_LL if c not in ('Stock Code', 'Stock Name')]
+
+
+def _connect(db_path):
+    conn = sqlite3.connect(db_path)
+    cols_sql = ', '.join(f'"{c}" REAL' for c in _NUMERIC_COLUMNS)
+    conn.execute(
+        f'CREATE TABLE IF NOT EXISTS {TABLE} ('
+        f'run_date TEXT NOT NULL, "Stock Code" TEXT NOT NULL, "Stock Name" TEXT, {cols_sql}, '
+        f'PRIMARY KEY (run_date, "Stock Code"))'
+    )
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{TABLE}_stock ON {TABLE} ("Stock Code", run_date)')
+    return conn
+
+
+def _day(run_date):
+    return pd.Timestamp(run_date).strftime(DATE_FMT)
+
+
+# ─────────────────────────────────────────────
+# SIMPAN & BACA
+# ─────────────────────────────────────────────
+def save_ll_run(df_result_static, run_date, db_path=HISTORY_DB):
+    """Simpan hasil LL satu tanggal (replace kalau tanggal itu sudah ada). Return jumlah baris."""
+    df = df_result_static.reindex(columns=FINAL_COLUMNS_LL).copy()
+    df['Stock Code'] = df['Stock Code'].astype(str)
+    # nama kosong tetap NULL (astype(str) akan menyimpan 'nan')
+    df['Stock Name'] = df['Stock Name'].where(df['Stock Name'].isna(), df['Stock Name'].astype(str))
+    df.insert(0, 'run_date', _day(run_date))
+
+    with closing(_connect(db_path)) as conn, conn:
+        conn.execute(f'DELETE FROM {TABLE} WHERE run_date = ?', (_day(run_date),))
+        df.to_sql(TABLE, conn, if_exists='append', index=False)
+    return len(df)
+
+
+def list_run_dates(db_path=HISTORY_DB):
+    with closing(_connect(db_path)) as conn:
+        rows = conn.execute(f'SELECT DISTINCT run_date FROM {TABLE} ORDER BY run_date').fetchall()
+    return [pd.Timestamp(r[0]) for r in rows]
+
+
+def previous_run_date(run_date, db_path=HISTORY_DB):
+    """Tanggal tersimpan terakhir SEBELUM run_date (None kalau belum ada)."""
+    with closing(_connect(db_path)) as conn:
+        row = conn.execute(
+            f'SELECT MAX(run_date) FROM {TABLE} WHERE run_date < ?', (_day(run_date),)
+        ).fetchone()
+    return pd.Timestamp(row[0]) if row and row[0] else None
+
+
+def load_ll_day(run_date, db_path=HISTORY_DB):
+    with closing(_connect(db_path)) as conn:
+        df = pd.read_sql_query(
+            f'SELECT * FROM {TABLE} WHERE run_date = ? ORDER BY "Stock Code"', conn, params=(_day(run_date),)
+        )
+    return df.drop(columns=['run_date'])
+
+
+def load_stock_history(stock_code, db_path=HISTORY_DB):
+    """Tren satu saham di semua tanggal tersimpan."""
+    with closing(_connect(db_path)) as conn:
+        df = pd.read_sql_query(
+            f'SELECT * FROM {TABLE} WHERE "Stock Code" = ? ORDER BY run_date', conn, params=(str(stock_code),)
+        )
+    df['run_date'] = pd.to_datetime(df['run_date'])
+    return df
+
+
+def list_stock_codes(db_path=HISTORY_DB):
+    with closing(_connect(db_path)) as conn:
+        rows = conn.execute(f'SELECT DISTINCT "Stock Code" FROM {TABLE} ORDER BY "Stock Code"').fetchall()
+    return [r[0] for r in rows]
+
+
+# ─────────────────────────────────────────────
+# DIFF HARI KE HARI
+# ─────────────────────────────────────────────
+def day_over_day_diff(df_prev, df_curr, threshold_pct=0.20, col='Available Lendable Limit'):
+    """
+    Diff vektor antar dua hari (join di Stock Code).
+
+    Flag:
+      Turned Negative : sebelumnya >= 0, sekarang < 0
+      Big Move        : |Δ| / |sebelumnya| > threshold_pct (atau muncul/hilang)
+      New / Removed   : saham baru ada / tidak ada lagi di salah satu hari
+    """
+    prev = df_prev[['Stock Code', 'Stock Name', col]].rename(columns={col: 'Prev', 'Stock Name': 'Stock Name Prev'})
+    curr = df_curr[['Stock Code', 'Stock Name', col]].rename(columns={col: 'Curr'})
+    df = curr.merge(prev, on='Stock Code', how='outer', indicator=True)
+    df['Stock Name'] = df['Stock Name'].fillna(df['Stock Name Prev'])
+
+    prev_v = df['Prev'].to_numpy(dtype=float)
+    curr_v = df['Curr'].to_numpy(dtype=float)
+    delta = np.nan_to_num(curr_v) - np.nan_to_num(prev_v)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.where(np.nan_to_num(prev_v) != 0, delta / np.abs(np.nan_to_num(prev_v)), np.nan)
+
+    is_new = (df['_merge'] == 'left_only').to_numpy()
+    is_removed = (df['_merge'] == 'right_only').to_numpy()
+    turned_negative = (np.nan_to_num(prev_v) >= 0) & (curr_v < 0)
+    big_move = (np.abs(pct) > threshold_pct) | ((np.nan_to_num(prev_v) == 0) & (delta != 0))
+
+    out = pd.DataFrame({
+        'Stock Code': df['Stock Code'],
+        'Stock Name': df['Stock Name'],
+        f'{col} (Prev)': prev_v,
+        f'{col} (Curr)': curr_v,
+        'Δ': delta,
+        'Δ %': pct,
+        'Turned Negative': turned_negative,
+        'Big Move': big_move,
+        'New': is_new,
+        'Removed': is_removed,
+    })
+    return out.sort_values('Δ', key=np.abs, ascending=False).reset_index(drop=True)
@@ -0,0 +1,208 @@
+"""
+ll_intraday.py
+------------------
+Recompute Lendable Limit intraday dari file delta posisi (hanya akun yang berubah).
+
+State per saham disimpan di memori:
+- holdings  : stock -> {account: [qty per baris posisi]}
+- on_hand   : stock -> total Quantity On Hand
+- heap      : stock -> max-heap (lazy) (-qty, account, baris ke-j) untuk First/Second Largerst
+- df_agg    : agregat LL (REPO_Base, Borrow Position, dst) terindeks Stock Code
+
+First/Second Largerst = dua BARIS posisi terbesar per saham, definisi yang sama dengan
+ll_engine.top_two_holders (akun tidak dijumlah dulu), jadi hasil intraday tetap
+rekonsiliasi dengan LL harian.
+
+Delta berisi posisi BARU (absolut) per (stock, account): semua baris akun itu di saham
+itu diganti satu baris berisi qty baru -- sama dengan menjalankan ulang ll_engine atas
+Stock Position Detail yang barisnya sudah diganti begitu. Tiap baris delta = O(log n)
+push ke heap; setelah itu hanya saham yang tersentuh yang dihitung ulang, dan total
+Available LL (baris yang lolos split_ll_result) digeser dengan selisih saham itu saja.
+Entri heap yang sudah basi dibuang saat dibaca (lazy deletion).
+
+Kode saham (normalise_codes) dan akun (normalise_accounts) dinormalisasi sama di
+Stock Position Detail, file delta, dan Borrow Position.
+"""
+
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from ll_engine import (
+    FIRST_LARGERST_COL, SECOND_LARGERST_COL, STOCK_CODE_BLACKLIST, borrow_position_by_code,
+    compute_lendable_limit, ll_arrays,
+)
+from stock_master import normalise_codes
+
+ACCOUNT_COL_IDX = 0   # kolom A Stock Position Detail = akun/klien
+STOCK_COL_IDX = 1     # kolom B = kode saham
+QTY_COL_IDX = 10      # kolom K = quantity
+
+DELTA_COLUMNS = ['Stock Code', 'Account', 'Quantity']
+
+
+def normalise_accounts(values):
+    """
+    Akun: str tanpa spasi. Angka bulat ditulis tanpa '.0' (kolom akun yang terbaca float
+    -- mis. ada sel kosong -- tetap cocok dengan kolom yang terbaca int/teks).
+    """
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    labels = np.array([
+        str(int(u)) if isinstance(u, (int, float, np.number)) and not isinstance(u, bool) and float(u).is_integer()
+        else str(u).strip()
+        for u in uniques
+    ] + ['nan'], dtype=object)
+    return pd.Series(labels[codes], index=getattr(values, 'index', None))
+
+
+def read_position_delta(file, filename=''):
+    """
+    Baca file delta posisi (xlsx/csv) -> [Stock Code, Account, Quantity].
+    Kolom dicari by-name; kalau tidak ada, dipakai 3 kolom pertama sesuai urutan itu.
+    """
+    if str(filename).lower().endswith('.csv'):
+        df = pd.read_csv(file)
+    else:
+        df = pd.read_excel(file, engine='openpyxl')
+    df.columns = [str(c).strip() for c in df.columns]
+    if not set(DELTA_COLUMNS).issubset(df.columns):
+        df = df.iloc[:, :3]
+        df.columns = DELTA_COLUMNS
+    df = df[DELTA_COLUMNS].copy()
+    df['Stock Code'] = normalise_codes(df['Stock Code']).to_numpy()
+    df['Account'] = normalise_accounts(df['Account']).to_numpy()
+    df['Quantity'] = pd.to_numeric(df['Quantity'], errors='coerce').fillna(0)
+    return df
+
+
+class IntradayLLState:
+    """
+    State LL yang bisa di-update incremental dari delta posisi akun.
+
+    df_agg disimpan sekali (RangeIndex, diubah in-place hanya di baris saham yang berubah);
+    aggregates() mengembalikan frame itu sendiri, jadi jangan diubah di luar state.
+    """
+
+    def __init__(self, df_agg, df_sp, on_hand_pct=None, repo_pct=None, blacklist=STOCK_CODE_BLACKLIST):
+        self.df_agg = df_agg.reset_index(drop=True).copy()
+        numeric = ['Quantity On Hand', FIRST_LARGERST_COL, SECOND_LARGERST_COL, 'REPO_Base', 'Borrow Position']
+        self.df_agg[numeric] = self.df_agg[numeric].astype(float)
+        self.params = {k: v for k, v in (('on_hand_pct', on_hand_pct), ('repo_pct', repo_pct)) if v is not None}
+        # kode ternormalisasi -> posisi baris df_agg (baris pertama kalau ada duplikat)
+        codes = normalise_codes(self.df_agg['Stock Code'])
+        self._row = pd.Series(np.arange(len(codes)), index=codes.to_numpy())
+        self._row = self._row[~self._row.index.duplicated()]
+        self._eligible = ~self.df_agg['Stock Code'].isin(blacklist).to_numpy()
+        self._available = self._static_available(np.arange(len(self.df_agg)))
+        self.total_available = float(self._available.sum())
+
+        df_sp = df_sp.copy()
+        df_sp.columns = df_sp.columns.str.strip()
+        acc = normalise_accounts(df_sp.iloc[:, ACCOUNT_COL_IDX])
+        stock = normalise_codes(df_sp.iloc[:, STOCK_COL_IDX])
+        qty = pd.to_numeric(df_sp.iloc[:, QTY_COL_IDX], errors='coerce').fillna(0)
+
+        # baris posisi tetap terpisah (tidak dijumlah per akun), dikelompokkan per (saham, akun)
+        rows = pd.DataFrame({'stock': stock, 'acc': acc, 'qty': qty}).dropna(subset=['stock'])
+        per_account = rows.groupby(['stock', 'acc'], sort=False)['qty'].agg(list)
+
+        self.holdings = {}
+        self.on_hand = {}
+        self.heap = {}
+        for stock_code, grp in per_account.groupby(level='stock', sort=False):
+            accounts = grp.droplevel('stock').to_dict()
+            self.holdings[stock_code] = accounts
+            self.on_hand[stock_code] = float(sum(sum(q) for q in accounts.values()))
+            self.heap[stock_code] = self._heap_entries(accounts)
+
+    # --- top-two dari heap lazy ---
+    @staticmethod
+    def _heap_entries(held):
+        h = [(-q, a, j) for a, qs in held.items() for j, q in enumerate(qs)]
+        heapq.heapify(h)
+        return h
+
+    def _valid_top(self, stock_code, k=2):
+        h = self.heap.get(stock_code, [])
+        held = self.holdings.get(stock_code, {})
+        popped, seen, top = [], set(), []
+        while h and len(top) < k:
+            neg_q, acc, j = heapq.heappop(h)
+            qs = held.get(acc, ())
+            if j < len(qs) and qs[j] == -neg_q and (acc, j) not in seen:
+                seen.add((acc, j))
+                popped.append((neg_q, acc, j))
+                top.append(-neg_q)
+            # entri basi / duplikat baris yang sama langsung dibuang
+        for item in popped:
+            heapq.heappush(h, item)
+        # heap terlalu gemuk karena entri basi -> bangun ulang
+        if len(h) > 2 * len(held) + 16 and len(h) > 2 * sum(map(len, held.values())) + 16:
+            h[:] = self._heap_entries(held)
+        return top + [0.0] * (k - len(top))
+
+    # --- total Available LL berjalan ---
+    def _static_available(self, rows):
+        """Available LL baris `rows` yang ikut df_result_static (bukan blacklist, LL > 0 atau Available > 0), selain itu 0."""
+        ll, available = ll_arrays(self.df_agg.iloc[rows], **self.params)
+        keep = self._eligible[rows] & ((ll > 0) | (available > 0))
+        return np.where(keep, available, 0.0)
+
+    def _recompute(self, rows):
+        """Geser total berjalan dengan selisih baris `rows`; return LL lengkap baris itu."""
+        new = self._static_available(rows)
+        self.total_available += float(new.sum() - self._available[rows].sum())
+        self._available[rows] = new
+        return compute_lendable_limit(self.df_agg.iloc[rows], **self.params).reset_index(drop=True)
+
+    # --- update ---
+    def apply_delta(self, df_delta):
+        """
+        Terapkan delta posisi absolut. Return DataFrame LL (kolom lengkap) untuk saham yang berubah saja.
+        """
+        df_delta = df_delta[DELTA_COLUMNS].assign(**{
+            'Stock Code': normalise_codes(df_delta['Stock Code']).to_numpy(),
+            'Account': normalise_accounts(df_delta['Account']).to_numpy(),
+        })
+        touched = set()
+        for stock_code, acc, qty in df_delta.itertuples(index=False, name=None):
+            qty = float(qty)
+            held = self.holdings.setdefault(stock_code, {})
+            old = held.get(acc)
+            if old == [qty]:
+                continue
+            # semua baris akun ini di saham ini diganti satu baris posisi baru
+            held[acc] = [qty]
+            self.on_hand[stock_code] = self.on_hand.get(stock_code, 0.0) + qty - (sum(old) if old else 0.0)
+            heapq.heappush(self.heap.setdefault(stock_code, []), (-qty, acc, 0))
+            touched.add(stock_code)
+
+        affected = [s for s in touched if s in self._row.index]
+        rows = self._row[affected].to_numpy(dtype=np.intp)
+        if len(rows):
+            tops = np.array([self._valid_top(s) for s in affected], dtype=float)
+            self.df_agg.loc[rows, 'Quantity On Hand'] = [self.on_hand[s] for s in affected]
+            self.df_agg.loc[rows, FIRST_LARGERST_COL] = tops[:, 0]
+            self.df_agg.loc[rows, SECOND_LARGERST_COL] = tops[:, 1]
+        return self._recompute(rows)
+
+    def set_borrow_position(self, df_borrow_position):
+        """
+        Ganti Borrow Position (mis. BorrowLedger.borrow_position()); saham yang tidak ada = 0.
+        Hanya baris yang nilainya berubah yang dihitung ulang. Return LL saham yang berubah.
+        """
+        bp = borrow_position_by_code(df_borrow_position)
+        new = bp.reindex(self._row.index).fillna(0).to_numpy(dtype=float)
+        rows = self._row.to_numpy()
+        changed = self.df_agg['Borrow Position'].to_numpy(dtype=float)[rows] != new
+        rows = rows[changed]
+        self.df_agg.loc[rows, 'Borrow Position'] = new[changed]
+        return self._recompute(rows)
+
+    def aggregates(self):
+        """Agregat LL terkini (frame milik state, bukan salinan)."""
+        return self.df_agg
+
+    def result(self):
+        return compute_lendable_limit(self.df_agg, **self.params)
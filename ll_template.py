@@ -0,0 +1,196 @@
+"""
+ll_template.py
+------------------
+Penulis output Lendable Limit: template ("Template Full" & "Template External")
+dan workbook Konsolidasi.
+
+Dulu tiap sel diberi Font/Border/Alignment baru dan dibulatkan satu-satu via
+try/int(round(float())). Sekarang:
+- kolom angka dibulatkan sekaligus (vektor) sebelum ditulis,
+- style didaftarkan SEKALI sebagai NamedStyle di workbook, sel cukup menunjuk namanya,
+- Template External: baris lama dihapus lalu ditulis lewat ws.append (tanpa lookup
+  ws.cell per sel); Template Full ditimpa di tempat seperti dulu, footer tetap utuh.
+
+Konsolidasi ditulis streaming via xlsxwriter constant_memory (baris demi baris),
+jadi memori tidak ikut membengkak mengikuti ukuran sheet Instrument.
+"""
+
+from datetime import datetime
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+from openpyxl import load_workbook
+from openpyxl.cell import Cell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, Side
+
+START_ROW = 7
+DATE_CELL = "B4"
+
+SHEET_RESULT_NAME_SOURCE = 'Lendable Limit Result'
+STREAM_CHUNK_ROWS = 10_000
+
+STYLE_CODE = "ll_body_code"
+STYLE_NAME = "ll_body_name"
+STYLE_NUMBER = "ll_body_number"
+
+
+# ─────────────────────────────────────────────
+# STYLE
+# ─────────────────────────────────────────────
+def _ll_named_styles():
+    font = Font(name='Roboto Condensed', size=9)
+    border = Border(
+        left=Side(style='thin'), right=Side(style='thin'),
+        top=Side(style='thin'), bottom=Side(style='thin')
+    )
+    center = Alignment(horizontal='center', vertical='center')
+    left = Alignment(horizontal='left', vertical='center')
+    return [
+        NamedStyle(name=STYLE_CODE, font=font, border=border, alignment=center),
+        NamedStyle(name=STYLE_NAME, font=font, border=border, alignment=left),
+        NamedStyle(name=STYLE_NUMBER, font=font, border=border, alignment=center, number_format='#,##0'),
+    ]
+
+
+def register_ll_styles(wb):
+    """Daftarkan NamedStyle body LL ke workbook (sekali saja, aman dipanggil ulang)."""
+    existing = set(wb.named_styles)
+    for style in _ll_named_styles():
+        if style.name not in existing:
+            wb.add_named_style(style)
+
+
+# ─────────────────────────────────────────────
+# PEMBULATAN VEKTOR
+# ─────────────────────────────────────────────
+def rounded_int_values(series, fallback=None):
+    """
+    Versi vektor dari int(round(float(v), 0)) per sel (round-half-even, sama dgn round()).
+
+    Nilai yang tidak bisa dijadikan angka diganti `fallback`; kalau fallback None,
+    nilai aslinya dipertahankan (perilaku blok except lama di Template Full).
+    """
+    numeric = pd.to_numeric(series, errors='coerce').to_numpy(dtype=float)
+    valid = np.isfinite(numeric)
+    rounded = np.rint(np.where(valid, numeric, 0)).astype(np.int64).tolist()
+    if valid.all():
+        return rounded
+    original = series.tolist()
+    return [
+        r if ok else (orig if fallback is None else fallback)
+        for r, ok, orig in zip(rounded, valid, original)
+    ]
+
+
+# ─────────────────────────────────────────────
+# PENGISI TEMPLATE
+# ─────────────────────────────────────────────
+def _styled_row(ws, values, styles):
+    cells = []
+    for value, style in zip(values, styles):
+        cell = Cell(ws, value=value)
+        cell.style = style
+        cells.append(cell)
+    return cells
+
+
+def fill_ll_template(template_buffer, df, text_cols=2, as_text=False, numeric_fallback=None,
+                     start_row=START_ROW, clear_rows=False):
+    """
+    Isi template LL mulai `start_row` dengan isi df (urutan kolom = urutan di template).
+
+    text_cols        : jumlah kolom teks di kiri (Stock Code, Stock Name); sisanya angka bulat '#,##0'
+    as_text          : paksa kolom teks jadi str (Template External)
+    numeric_fallback : pengganti nilai non-angka di kolom angka (None = pakai nilai asli)
+    clear_rows       : hapus semua baris mulai start_row dulu lalu append (Template External).
+                       False = timpa sel di tempat, baris di bawah data (footer/catatan) tetap
+                       utuh (Template Full).
+    """
+    wb = load_workbook(template_buffer)
+    ws = wb.active
+    ws[DATE_CELL] = datetime.now().strftime('%d-%b-%y')
+    register_ll_styles(wb)
+
+    if clear_rows:
+        if ws.max_row >= start_row:
+            ws.delete_rows(start_row, ws.max_row - start_row + 1)
+        # pastikan baris append berikutnya tepat di start_row walau baris header kosong
+        ws.cell(row=start_row - 1, column=1)
+
+    columns = []
+    for i, col in enumerate(df.columns):
+        if i < text_cols:
+            values = df[col].astype(str).tolist() if as_text else df[col].tolist()
+        else:
+            values = rounded_int_values(df[col], fallback=numeric_fallback)
+        columns.append(values)
+
+    styles = [STYLE_CODE, STYLE_NAME][:text_cols] + [STYLE_NUMBER] * (len(df.columns) - text_cols)
+    if clear_rows:
+        for values in zip(*columns):
+            ws.append(_styled_row(ws, values, styles))
+    else:
+        for r_idx, values in enumerate(zip(*columns), start=start_row):
+            for c_idx, (value, style) in enumerate(zip(values, styles), start=1):
+                cell = ws.cell(row=r_idx, column=c_idx)
+                cell.value = value
+                cell.style = style
+
+    out = BytesIO()
+    wb.save(out)
+    out.seek(0)
+    return out
+
+
+# ─────────────────────────────────────────────
+# KONSOLIDASI (STREAMING)
+# ─────────────────────────────────────────────
+def _iter_rows(df, chunk_rows=STREAM_CHUNK_ROWS):
+    """
+    Baris df sebagai list Python, diproses per potongan supaya tidak menyalin seluruh frame.
+    NaN/NaT -> None; +/-inf -> teks 'inf'/'-inf' (xlsxwriter menolak inf, to_excel lama juga
+    menulisnya sebagai teks, dan pd.to_numeric membacanya balik jadi inf).
+    """
+    for start in range(0, len(df), chunk_rows):
+        block = df.iloc[start:start + chunk_rows].astype(object)
+        block = block.where(block.notna(), None)
+        for col, values in block.items():
+            is_inf = values.isin([np.inf, -np.inf])
+            if is_inf.any():
+                block.loc[is_inf, col] = np.where(values[is_inf].astype(float) > 0, 'inf', '-inf')
+        yield from block.to_numpy().tolist()
+
+
+def write_frame(ws, df, header_format=None, header=True):
+    row = 0
+    if header:
+        ws.write_row(row, 0, [str(c) for c in df.columns], header_format)
+        row += 1
+    for values in _iter_rows(df):
+        ws.write_row(row, 0, values)
+        row += 1
+
+
+def write_konsolidasi(df_result, df_instr_raw, sheet_result=SHEET_RESULT_NAME_SOURCE, sheet_instr='Instrument'):
+    """
+    Workbook Konsolidasi: hasil LL (dengan header) + sheet Instrument mentah (tanpa header).
+
+    Ditulis baris demi baris dengan xlsxwriter constant_memory; tiap baris langsung
+    di-flush ke file sementara, tidak ada object graph workbook di memori.
+    """
+    out = BytesIO()
+    wb = xlsxwriter.Workbook(out, {
+        'constant_memory': True,
+        'in_memory': False,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+    })
+    header_format = wb.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+
+    write_frame(wb.add_worksheet(sheet_result), df_result, header_format)
+    write_frame(wb.add_worksheet(sheet_instr), df_instr_raw, header=False)
+
+    wb.close()
+    out.seek(0)
+    return out
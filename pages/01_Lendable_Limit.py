@@ -1,8 +1,6 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from openpyxl import load_workbook
-from openpyxl.styles import Font, Alignment, Border, Side, NamedStyle
 from io import BytesIO
 from datetime import datetime
 import os
@@ -15,6 +13,28 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.units import inch
 
+from ll_engine import (
+    FINAL_COLUMNS_LL, ON_HAND_PCT, REPO_PCT, SHEET_INST_OLD, STOCK_CODE_BLACKLIST,
+    build_ll_aggregates, compute_lendable_limit, diff_ll_scenario,
+    instrument_name_lookup, load_instrument, split_ll_result, unmatched_borrow_position,
+)
+from ll_template import SHEET_RESULT_NAME_SOURCE, fill_ll_template, write_konsolidasi
+from borrow_ledger import (
+    BorrowLedger, COL_KODE_DI_LL, CONTRACTS_FILE, RETURNS_FILE,
+    allocate_pending_requests, allocation_summary, read_contracts, read_returns,
+)
+from borrow_projection import (
+    DEFAULT_HORIZON_DAYS, borrow_baseline_diff, curve_pivot, project_borrow_position, scheduled_returns,
+)
+from ll_intraday import IntradayLLState, read_position_delta
+from holdings_index import HoldingsIndex
+from ll_batch import group_ll_inputs, run_ll_backfill, write_backfill_workbook
+from ll_history import (
+    day_over_day_diff, list_run_dates, list_stock_codes, load_ll_day,
+    load_stock_history, previous_run_date, save_ll_run,
+)
+from stock_master import sync_instrument_names
+
 # Cek apakah sudah login dari halaman utama
 if "login_status" not in st.session_state or not st.session_state["login_status"]:
     st.error("🚨 Akses Ditolak! Silakan login di halaman utama terlebih dahulu.")
@@ -150,20 +170,26 @@ st.markdown("""
 # ============================
 # KONFIGURASI GLOBAL LL
 # ============================
-STOCK_CODE_BLACKLIST = ['BEBS', 'IPPE', 'WMPP', 'WMUU']
-SHEET_INST_OLD = 'Instrument'
 SHEET_INST_NEW = 'Hasil Pivot'
-FIRST_LARGERST_COL = "First Largerst"
-SECOND_LARGERST_COL = "Second Largerst"
-SHEET_RESULT_NAME_SOURCE = 'Lendable Limit Result'
 BORROW_AMOUNT_COL = 'Borrow Amount (shares)'
 
-FINAL_COLUMNS_LL = [
-    'Stock Code', 'Stock Name', 'Quantity On Hand',
-    FIRST_LARGERST_COL, SECOND_LARGERST_COL, 'Total two Largerst',
-    'Quantity Available', 'Thirty Percent On Hand', 'REPO',
-    'Lendable Limit', 'Borrow Position', 'Available Lendable Limit'
-]
+BORROW_SOURCE_UPLOAD = 'Upload BorrPosition.xlsx'
+BORROW_SOURCE_LEDGER = 'Ledger (borrow_contracts.csv + return_events.csv)'
+
+# ============================
+# LEDGER PINJAMAN
+# ============================
+@st.cache_resource
+def _load_borrow_ledger():
+    # satu ledger per proses server; dibangun penuh sekali saja
+    return BorrowLedger.from_csv(CONTRACTS_FILE, RETURNS_FILE)
+
+
+def get_borrow_ledger():
+    # baris baru di CSV diterapkan per event (hanya baris setelah offset terakhir)
+    ledger = _load_borrow_ledger()
+    ledger.sync(CONTRACTS_FILE, RETURNS_FILE)
+    return ledger
 
 # ============================
 # FUNGSI STYLING KONDISIONAL
@@ -178,151 +204,326 @@ def highlight_negative_ll(row):
 # ============================
 # FUNGSI PEMROSESAN LL
 # ============================
-def process_lendable_limit(uploaded_files, template_file_data):
+def process_lendable_limit(uploaded_files, template_file_data, df_borrow_position=None):
     st.info("🚀 Mulai Pemrosesan Lendable Limit...")
     try:
         df_sp = pd.read_excel(uploaded_files['Stock Position Detail.xlsx'], header=0, engine='openpyxl')
-        df_instr_raw = pd.read_excel(uploaded_files['Instrument.xlsx'], sheet_name=SHEET_INST_OLD, header=1, engine='openpyxl')
-        df_instr_old_raw = pd.read_excel(uploaded_files['Instrument.xlsx'], sheet_name=SHEET_INST_OLD, header=None, engine='openpyxl')
-        df_borr_pos = pd.read_excel(uploaded_files['BorrPosition.xlsx'], header=0, engine='openpyxl')
+        df_instr_raw, df_instr_old_raw = load_instrument(uploaded_files['Instrument.xlsx'])
+        if df_borrow_position is None:
+            df_borr_pos = pd.read_excel(uploaded_files['BorrPosition.xlsx'], header=0, engine='openpyxl')
     except Exception as e:
         st.error(f"❌ Gagal membaca salah satu file input LL. Error: {e}")
-        return None, None, None
-
-    output_xlsx_buffer = BytesIO()
+        return None, None, None, None
 
     with st.spinner('Memproses data...'):
         try:
-            df_sp.columns = df_sp.columns.str.strip()
-            stock_col = df_sp.columns[1]
-            qty_col = df_sp.columns[10]
-            df_sp[qty_col] = pd.to_numeric(df_sp[qty_col], errors='coerce').fillna(0)
-
-            top_values = (
-                df_sp.groupby(stock_col)[qty_col]
-                .apply(lambda x: sorted(x.dropna(), reverse=True)[:2])
-                .reset_index()
-            )
-            top_values[FIRST_LARGERST_COL] = top_values[qty_col].apply(lambda x: x[0] if len(x) > 0 else 0)
-            top_values[SECOND_LARGERST_COL] = top_values[qty_col].apply(lambda x: x[1] if len(x) > 1 else 0)
-            df_sp = df_sp.merge(top_values.drop(columns=[qty_col]), how="left", on=stock_col).fillna({FIRST_LARGERST_COL: 0, SECOND_LARGERST_COL: 0})
-
-            df_instr = df_instr_raw.copy()
-            df_instr.columns = df_instr.columns.str.strip()
-            col_row, col_loan, col_repo = "Local Code", "Used Loan Qty", "Used Reverse Repo Qty"
-            df_instr[col_loan] = pd.to_numeric(df_instr[col_loan], errors='coerce').fillna(0)
-            df_instr[col_repo] = pd.to_numeric(df_instr[col_repo], errors='coerce').fillna(0)
-
-            df_pivot_full = df_instr.groupby(col_row)[[col_loan, col_repo]].sum().reset_index()
-
-            df_result = df_pivot_full[['Local Code']].rename(columns={'Local Code': 'Stock Code'}).drop_duplicates()
-            df_inst_lookup = df_instr_old_raw.iloc[1:].rename(columns={2: 'Stock Code', 9: 'Stock Name'})[['Stock Code', 'Stock Name']].drop_duplicates('Stock Code')
-            df_result = df_result.merge(df_inst_lookup, on='Stock Code', how='left')
-
-            qoh_calc = df_sp.groupby(df_sp.columns[1])[df_sp.columns[10]].sum().reset_index().rename(columns={df_sp.columns[1]: 'Stock Code', df_sp.columns[10]: 'Quantity On Hand'})
-            df_result = df_result.merge(qoh_calc, on='Stock Code', how='left').fillna(0)
-
-            borr_qty_calc = df_borr_pos.groupby('Stock Code')[BORROW_AMOUNT_COL].sum().reset_index().rename(columns={BORROW_AMOUNT_COL: 'Borrow Position'})
-            df_result = df_result.merge(borr_qty_calc, on='Stock Code', how='left').fillna(0)
-
-            largest_calc = df_sp.rename(columns={df_sp.columns[1]: 'Stock Code'}).groupby('Stock Code')[[FIRST_LARGERST_COL, SECOND_LARGERST_COL]].first().reset_index()
-            df_result = df_result.merge(largest_calc, on='Stock Code', how='left').fillna(0)
-
-            repo_base = df_pivot_full.rename(columns={'Local Code': 'Stock Code', 'Used Reverse Repo Qty': 'REPO_Base'})[['Stock Code', 'REPO_Base']]
-            df_result = df_result.merge(repo_base, on='Stock Code', how='left').fillna(0)
-
-            df_result['Total two Largerst'] = df_result[FIRST_LARGERST_COL] + df_result[SECOND_LARGERST_COL]
-            df_result['Quantity Available'] = df_result['Quantity On Hand'] - df_result['Total two Largerst']
-            df_result['Thirty Percent On Hand'] = 0.30 * df_result['Quantity On Hand']
-            df_result['REPO'] = 0.10 * df_result['REPO_Base']
-            df_result['Lendable Limit'] = np.minimum(df_result['Thirty Percent On Hand'], df_result['Quantity Available']) + df_result['REPO']
-            df_result['Available Lendable Limit'] = df_result['Lendable Limit'] - df_result['Borrow Position']
-
-            df_result_filtered = df_result[~df_result['Stock Code'].isin(STOCK_CODE_BLACKLIST)].copy()
-            df_result_static = df_result_filtered[(df_result_filtered['Lendable Limit'] > 0) | (df_result_filtered['Available Lendable Limit'] > 0)].reindex(columns=FINAL_COLUMNS_LL)
-
-            with pd.ExcelWriter(output_xlsx_buffer, engine='openpyxl') as writer:
-                df_result_filtered.reindex(columns=FINAL_COLUMNS_LL).to_excel(writer, sheet_name=SHEET_RESULT_NAME_SOURCE, index=False)
-                df_instr_old_raw.to_excel(writer, sheet_name=SHEET_INST_OLD, index=False, header=False)
-            output_xlsx_buffer.seek(0)
-
-            wb_template = load_workbook(template_file_data)
-            ws = wb_template.active
-            ws["B4"] = datetime.now().strftime('%d-%b-%y')
-
-            f_body = Font(name='Roboto Condensed', size=9)
-            align_center = Alignment(horizontal='center', vertical='center')
-            align_left = Alignment(horizontal='left', vertical='center')
-            border_thin = Border(
-                left=Side(style='thin'), right=Side(style='thin'),
-                top=Side(style='thin'), bottom=Side(style='thin')
+            if df_borrow_position is None:
+                df_borrow_position = df_borr_pos.groupby('Stock Code')[BORROW_AMOUNT_COL].sum().reset_index().rename(columns={BORROW_AMOUNT_COL: 'Borrow Position'})
+
+            # nama saham dari Instrument memperbarui stock master; nama yang kosong diisi dari master
+            df_inst_lookup, _ = sync_instrument_names(instrument_name_lookup(df_instr_old_raw))
+            df_agg = build_ll_aggregates(df_sp, df_instr_raw, df_inst_lookup, df_borrow_position)
+            unmatched = unmatched_borrow_position(df_agg, df_borrow_position)
+            if not unmatched.empty:
+                st.warning(
+                    f"⚠️ {len(unmatched)} kode Borrow Position tidak ditemukan di Instrument "
+                    f"(total {unmatched.sum():,.0f} lembar tidak mengurangi Available LL): "
+                    + ", ".join(map(str, unmatched.index))
+                )
+            df_result = compute_lendable_limit(df_agg)
+            df_result_filtered, df_result_static = split_ll_result(df_result)
+            st.session_state['ll_intraday'] = IntradayLLState(df_agg, df_sp)
+            st.session_state['ll_holdings'] = HoldingsIndex.from_stock_position(df_sp)
+            # agregat yang dipakai seksi lain = frame milik state intraday (ikut ter-update delta)
+            df_agg = st.session_state['ll_intraday'].aggregates()
+
+            output_xlsx_buffer = write_konsolidasi(
+                df_result_filtered.reindex(columns=FINAL_COLUMNS_LL), df_instr_old_raw,
+                sheet_result=SHEET_RESULT_NAME_SOURCE, sheet_instr=SHEET_INST_OLD,
             )
 
-            for r_idx, row in enumerate(df_result_static.itertuples(index=False), start=7):
-                for c_idx, value in enumerate(row, start=1):
-                    cell = ws.cell(row=r_idx, column=c_idx)
-                    if c_idx >= 3:
-                        try:
-                            cell.value = int(round(float(value), 0))
-                        except:
-                            cell.value = value
-                    else:
-                        cell.value = value
-                    cell.border = border_thin
-                    cell.font = f_body
-                    if c_idx == 1:
-                        cell.alignment = align_center
-                    elif c_idx == 2:
-                        cell.alignment = align_left
-                    else:
-                        cell.alignment = align_center
-                        cell.number_format = '#,##0'
-
-            output_template_full = BytesIO()
-            wb_template.save(output_template_full)
-            output_template_full.seek(0)
-
-            return output_xlsx_buffer, output_template_full, df_result_static
+            output_template_full = fill_ll_template(template_file_data, df_result_static)
+
+            return output_xlsx_buffer, output_template_full, df_result_static, df_agg
 
         except Exception as e:
             st.error(f"❌ Error Detail: {e}")
-            return None, None, None
+            return None, None, None, None
 
 # ============================================================
 # FUNGSI TEMPLATE EKSTERNAL
 # ============================================================
 def fill_simple_ll_template(df_result, template_buffer):
-    wb = load_workbook(template_buffer)
-    ws = wb.active
-    ws["B4"] = datetime.now().strftime('%d-%b-%y')
-
-    start_row = 7
-    if ws.max_row >= start_row:
-        ws.delete_rows(start_row, ws.max_row - start_row + 1)
-
-    f_body = Font(name='Roboto Condensed', size=9)
-    align_center = Alignment(horizontal='center', vertical='center')
-    align_left = Alignment(horizontal='left', vertical='center')
-    border_thin = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-
-    for r_idx, row in enumerate(df_result.itertuples(index=False), start=start_row):
-        c1 = ws.cell(row=r_idx, column=1, value=str(row[0]))
-        c1.font, c1.border, c1.alignment = f_body, border_thin, align_center
-        c2 = ws.cell(row=r_idx, column=2, value=str(row[1]))
-        c2.font, c2.border, c2.alignment = f_body, border_thin, align_left
-        val_c = 0
-        try:
-            val_c = int(round(float(row[2]), 0))
-        except:
-            pass
-        c3 = ws.cell(row=r_idx, column=3, value=val_c)
-        c3.font, c3.border, c3.alignment = f_body, border_thin, align_center
-        c3.number_format = '#,##0'
+    return fill_ll_template(template_buffer, df_result, as_text=True, numeric_fallback=0, clear_rows=True)
+
+
+# ============================================================
+# SIMULASI PARAMETER LL (WHAT-IF)
+# ============================================================
+def render_ll_simulation(df_agg):
+    """Slider parameter LL di atas agregat per saham yang sudah di-cache (tanpa upload ulang)."""
+    st.markdown('<div class="card"><div class="card-title">Simulasi Parameter LL</div>', unsafe_allow_html=True)
+    s_cols = st.columns(2)
+    on_hand_pct = s_cols[0].slider('Cap On Hand (%)', 0, 100, int(round(ON_HAND_PCT * 100)), key='sim_on_hand') / 100
+    repo_pct = s_cols[1].slider('Faktor REPO (%)', 0, 100, int(round(REPO_PCT * 100)), key='sim_repo') / 100
+    blacklist = st.multiselect(
+        'Blacklist Stock Code',
+        sorted(df_agg['Stock Code'].astype(str).unique()),
+        default=[c for c in STOCK_CODE_BLACKLIST if c in set(df_agg['Stock Code'])],
+        key='sim_blacklist',
+    )
+
+    scenario = {'on_hand_pct': on_hand_pct, 'repo_pct': repo_pct, 'blacklist': blacklist}
+    df_sim = compute_lendable_limit(df_agg, on_hand_pct, repo_pct)
+    _, df_sim_static = split_ll_result(df_sim, blacklist)
+    _, df_base_static = split_ll_result(compute_lendable_limit(df_agg))
+    df_diff = diff_ll_scenario(df_agg, scenario)
+
+    m_cols = st.columns(3)
+    m_cols[0].metric(
+        'Total Available LL',
+        f"{df_sim_static['Available Lendable Limit'].sum():,.0f}",
+        f"{df_sim_static['Available Lendable Limit'].sum() - df_base_static['Available Lendable Limit'].sum():,.0f}",
+    )
+    m_cols[1].metric('Saham Lendable', len(df_sim_static), len(df_sim_static) - len(df_base_static))
+    m_cols[2].metric('Saham Berubah', len(df_diff))
+
+    if df_diff.empty:
+        st.info("Parameter sama dengan baseline, tidak ada perubahan.")
+    else:
+        st.dataframe(df_diff, use_container_width=True, hide_index=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+
+# ============================================================
+# DRILL-DOWN KEPEMILIKAN
+# ============================================================
+def render_ll_drilldown(holdings):
+    """Top-k holder per saham & saham di mana satu akun jadi top-2, dari HoldingsIndex."""
+    st.markdown('<div class="card"><div class="card-title">Drill-down Kepemilikan</div>', unsafe_allow_html=True)
+    if holdings is None:
+        # index kepemilikan dibuang setelah delta intraday; bangun ulang hanya kalau diminta
+        st.caption("Index kepemilikan belum memuat delta intraday terakhir.")
+        if st.button("🔄 Bangun Ulang dari Posisi Intraday", key='dd_rebuild'):
+            st.session_state['ll_holdings'] = HoldingsIndex.from_intraday(st.session_state['ll_intraday'])
+            st.rerun()
+        st.markdown('</div>', unsafe_allow_html=True)
+        return
+    d_cols = st.columns(2)
+    with d_cols[0]:
+        stock = st.selectbox('Stock Code', holdings.stocks, key='dd_stock')
+        k = st.number_input('Top-k holder', min_value=1, max_value=100, value=10, key='dd_k')
+        st.dataframe(holdings.top_holders(stock, int(k)), use_container_width=True, hide_index=True)
+    with d_cols[1]:
+        account = st.selectbox('Account', holdings.accounts, key='dd_account')
+        st.dataframe(holdings.stocks_where_top2(account), use_container_width=True, hide_index=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+
+# ============================================================
+# UPDATE INTRADAY (DELTA POSISI)
+# ============================================================
+def _show_intraday_changes(state, label, n_input, df_changed):
+    m_cols = st.columns(3)
+    m_cols[0].metric(label, n_input)
+    m_cols[1].metric('Saham Dihitung Ulang', len(df_changed))
+    m_cols[2].metric('Total Available LL', f"{state.total_available:,.0f}")
+    st.dataframe(
+        df_changed.reindex(columns=FINAL_COLUMNS_LL).style.apply(highlight_negative_ll, axis=1),
+        use_container_width=True,
+    )
+
+
+def render_ll_intraday(state):
+    """Terapkan file delta posisi akun ke state LL di memori, hitung ulang saham yang berubah saja."""
+    st.markdown('<div class="card"><div class="card-title">Update Intraday</div>', unsafe_allow_html=True)
+    st.caption("File delta berisi posisi terbaru akun yang berubah: kolom `Stock Code`, `Account`, `Quantity`.")
+    delta_file = st.file_uploader('File Delta Posisi', type=['xlsx', 'csv'], key='ll_delta')
+
+    if delta_file and st.button("▶ Terapkan Delta", key='run_delta'):
+        df_delta = read_position_delta(delta_file, delta_file.name)
+        df_changed = state.apply_delta(df_delta)
+        # top holder di drill-down sudah basi
+        st.session_state['ll_holdings'] = None
+        _show_intraday_changes(state, 'Baris Delta', len(df_delta), df_changed)
+
+    if st.session_state.get('ll_borrow_source') == BORROW_SOURCE_LEDGER:
+        if st.button("🔄 Sinkronkan Borrow Position dari Ledger", key='run_ledger_sync'):
+            ledger = get_borrow_ledger()
+            df_changed = state.set_borrow_position(ledger.borrow_position())
+            _show_intraday_changes(state, 'Event Ledger', ledger.n_events, df_changed)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+
+# ============================================================
+# ALOKASI PERMINTAAN PINJAMAN PENDING
+# ============================================================
+def render_ll_allocation(df_agg):
+    """Putuskan permintaan PENDING di borrow_contracts.csv terhadap Available LL per saham."""
+    df_contracts = read_contracts(CONTRACTS_FILE)
+    if df_contracts.empty:
+        return
+
+    st.markdown('<div class="card"><div class="card-title">Alokasi Permintaan Pinjaman</div>', unsafe_allow_html=True)
+    # semua saham di agregat (blacklist = 0), supaya kode yang tidak dikenal bisa dibedakan
+    df_result = compute_lendable_limit(df_agg)
+    available = df_result.set_index('Stock Code')['Available Lendable Limit'].where(
+        ~df_result['Stock Code'].isin(STOCK_CODE_BLACKLIST).to_numpy(), 0
+    )
+    df_alloc = allocate_pending_requests(df_contracts, available)
+
+    unmatched = df_alloc.loc[~df_alloc[COL_KODE_DI_LL], 'Stock Code'].unique()
+    if len(unmatched):
+        st.warning(
+            f"⚠️ {len(unmatched)} kode saham pada permintaan PENDING tidak ditemukan di Lendable Limit "
+            f"(Available LL dianggap 0): " + ", ".join(map(str, unmatched))
+        )
+
+    if df_alloc.empty:
+        st.info("Tidak ada permintaan berstatus PENDING.")
+    else:
+        counts = df_alloc['Decision'].value_counts()
+        m_cols = st.columns(4)
+        m_cols[0].metric('Permintaan', len(df_alloc))
+        m_cols[1].metric('Approved', int(counts.get('APPROVED', 0)))
+        m_cols[2].metric('Partial', int(counts.get('PARTIAL', 0)))
+        m_cols[3].metric('Rejected', int(counts.get('REJECTED', 0)))
+        st.dataframe(df_alloc, use_container_width=True, hide_index=True)
+        st.dataframe(allocation_summary(df_alloc), use_container_width=True, hide_index=True)
+
+        out = BytesIO()
+        with pd.ExcelWriter(out, engine='openpyxl') as writer:
+            df_alloc.to_excel(writer, sheet_name='Alokasi', index=False)
+            allocation_summary(df_alloc).to_excel(writer, sheet_name='Ringkasan', index=False)
+        out.seek(0)
+        st.download_button(
+            "⬇ Keputusan Alokasi",
+            out,
+            f"Alokasi Pinjaman_{datetime.now().strftime('%Y%m%d')}.xlsx",
+            use_container_width=True,
+        )
+    st.markdown('</div>', unsafe_allow_html=True)
+
+
+# ============================================================
+# PROYEKSI BORROW POSITION KE DEPAN
+# ============================================================
+def render_ll_projection(df_agg):
+    """Kurva Borrow Position & Available LL N hari bursa ke depan dari Reimbursement Date ledger."""
+    df_schedule = scheduled_returns(read_contracts(CONTRACTS_FILE), read_returns(RETURNS_FILE))
+    if df_schedule.empty:
+        return
+
+    st.markdown('<div class="card"><div class="card-title">Proyeksi Borrow Position</div>', unsafe_allow_html=True)
+    p_cols = st.columns(2)
+    as_of = p_cols[0].date_input('Mulai Proyeksi', value=datetime.now().date(), key='proj_as_of')
+    n_days = p_cols[1].number_input('Horizon (hari bursa)', min_value=1, max_value=60,
+                                    value=DEFAULT_HORIZON_DAYS, key='proj_days')
+    df_curve, df_overdue = project_borrow_position(df_agg, df_schedule, as_of, int(n_days))
+
+    df_bp_diff = borrow_baseline_diff(df_agg, df_schedule)
+    if not df_bp_diff.empty:
+        st.warning(f"⚠️ Borrow Position run LL beda dengan ledger untuk {len(df_bp_diff)} saham "
+                   "(mis. run LL memakai BorrPosition.xlsx). Proyeksi dihitung dari Borrow Position ledger.")
+        with st.expander('Selisih Borrow Position Run LL vs Ledger'):
+            st.dataframe(df_bp_diff, use_container_width=True, hide_index=True)
+
+    m_cols = st.columns(3)
+    m_cols[0].metric('Saham Dengan Jadwal Kembali', df_curve['Stock Code'].nunique())
+    m_cols[1].metric('Total Lembar Kembali', f"{df_curve['Released'].sum():,.0f}")
+    m_cols[2].metric('Kontrak Overdue / Tanpa Tanggal', len(df_overdue))
+
+    if df_curve.empty:
+        st.info("Tidak ada pengembalian terjadwal di dalam horizon.")
+    else:
+        stock = st.selectbox('Stock Code', sorted(df_curve['Stock Code'].unique()), key='proj_stock')
+        st.line_chart(
+            df_curve[df_curve['Stock Code'] == stock].set_index('Date')[['Borrow Position', 'Available Lendable Limit']]
+        )
+        df_wide = curve_pivot(df_curve)
+        st.dataframe(df_wide, use_container_width=True, hide_index=True)
+
+        out = BytesIO()
+        with pd.ExcelWriter(out, engine='openpyxl') as writer:
+            df_wide.to_excel(writer, sheet_name='Available LL', index=False)
+            curve_pivot(df_curve, 'Borrow Position').to_excel(writer, sheet_name='Borrow Position', index=False)
+            df_overdue.to_excel(writer, sheet_name='Overdue', index=False)
+        out.seek(0)
+        st.download_button(
+            "⬇ Proyeksi",
+            out,
+            f"Proyeksi Borrow Position_{datetime.now().strftime('%Y%m%d')}.xlsx",
+            use_container_width=True,
+        )
+    st.markdown('</div>', unsafe_allow_html=True)
 
-    out = BytesIO()
-    wb.save(out)
-    out.seek(0)
-    return out
+
+# ============================================================
+# RIWAYAT LL & DIFF HARIAN
+# ============================================================
+def render_ll_history():
+    """Diff hari-ke-hari dan tren per saham dari riwayat LL tersimpan."""
+    run_dates = list_run_dates()
+    if not run_dates:
+        return
+
+    st.markdown('<div class="card"><div class="card-title">Riwayat & Diff Harian</div>', unsafe_allow_html=True)
+    h_cols = st.columns(2)
+    selected = h_cols[0].selectbox(
+        'Tanggal', run_dates[::-1], format_func=lambda d: d.strftime('%d %b %Y'), key='hist_date'
+    )
+    threshold = h_cols[1].slider('Ambang perubahan Available LL (%)', 1, 100, 20, key='hist_threshold') / 100
+
+    prev_date = previous_run_date(selected)
+    if prev_date is None:
+        st.info("Belum ada tanggal sebelumnya di riwayat untuk dibandingkan.")
+    else:
+        df_diff = day_over_day_diff(load_ll_day(prev_date), load_ll_day(selected), threshold)
+        flagged = df_diff[df_diff['Turned Negative'] | df_diff['Big Move'] | df_diff['New'] | df_diff['Removed']]
+
+        m_cols = st.columns(3)
+        m_cols[0].metric('Dibandingkan dengan', prev_date.strftime('%d %b %Y'))
+        m_cols[1].metric('Jadi Negatif', int(df_diff['Turned Negative'].sum()))
+        m_cols[2].metric(f'Bergerak > {threshold:.0%}', int(df_diff['Big Move'].sum()))
+        st.dataframe(flagged, use_container_width=True, hide_index=True)
+
+    trend_stock = st.selectbox('Tren Available LL per saham', list_stock_codes(), key='hist_stock')
+    if trend_stock:
+        df_trend = load_stock_history(trend_stock).set_index('run_date')
+        st.line_chart(df_trend[['Lendable Limit', 'Available Lendable Limit']])
+    st.markdown('</div>', unsafe_allow_html=True)
+
+
+# ============================================================
+# BACKFILL MULTI-HARI
+# ============================================================
+def render_ll_backfill():
+    """Hitung LL untuk banyak tanggal sekaligus (proses paralel per tanggal)."""
+    st.markdown('<div class="card"><div class="card-title">Backfill Multi-Hari</div>', unsafe_allow_html=True)
+    st.caption("Upload triplet Instrument / Stock Position Detail / BorrPosition per tanggal "
+               "(tanggal di nama file, mis. `Instrument 20260915.xlsx`), atau satu file .zip berisi semuanya.")
+    batch_files = st.file_uploader('File Backfill', type=['xlsx', 'zip'], accept_multiple_files=True, key='ll_backfill')
+
+    if batch_files and st.button("▶ Jalankan Backfill", key='run_backfill'):
+        triplets, skipped = group_ll_inputs([(f.name, f.getvalue()) for f in batch_files])
+        for name, reason in skipped:
+            st.warning(f"Skip {name}: {reason}")
+        if not triplets:
+            st.error("Tidak ada tanggal dengan triplet file lengkap.")
+        else:
+            with st.spinner(f"Menghitung LL untuk {len(triplets)} tanggal..."):
+                results, df_timing = run_ll_backfill(triplets)
+            st.success(f"✅ Backfill selesai: {len(results)} dari {len(triplets)} tanggal.")
+            st.dataframe(df_timing, use_container_width=True, hide_index=True)
+
+            first_day, last_day = min(triplets), max(triplets)
+            st.download_button(
+                "⬇ Backfill LL",
+                write_backfill_workbook(results, df_timing),
+                f"Lendable Limit Backfill {first_day.strftime('%Y%m%d')}-{last_day.strftime('%Y%m%d')}.xlsx",
+                use_container_width=True,
+            )
+    st.markdown('</div>', unsafe_allow_html=True)
 
 
 # ─────────────────────────────────────────
@@ -345,7 +546,16 @@ def main():
     cols = st.columns(3)
     u1 = cols[0].file_uploader('1. Instrument', type=['xlsx'])
     u2 = cols[1].file_uploader('2. Stock Position', type=['xlsx'])
-    u3 = cols[2].file_uploader('3. BorrPosition', type=['xlsx'])
+    borrow_source = st.radio('Sumber Borrow Position', [BORROW_SOURCE_UPLOAD, BORROW_SOURCE_LEDGER], horizontal=True)
+    if borrow_source == BORROW_SOURCE_UPLOAD:
+        u3 = cols[2].file_uploader('3. BorrPosition', type=['xlsx'])
+        df_borrow_position = None
+    else:
+        ledger = get_borrow_ledger()
+        df_borrow_position = ledger.borrow_position()
+        u3 = True
+        cols[2].metric('Borrow Position (ledger)', f"{df_borrow_position['Borrow Position'].sum():,.0f}",
+                       f"{len(df_borrow_position)} saham · {ledger.n_events} event")
     st.markdown('</div>', unsafe_allow_html=True)
 
     # Card: Upload Template
@@ -353,6 +563,7 @@ def main():
     col_t = st.columns(2)
     t_full   = col_t[0].file_uploader('4. Template Full', type=['xlsx'])
     t_simple = col_t[1].file_uploader('5. Template External', type=['xlsx'])
+    run_date = st.date_input('Tanggal Data LL (untuk riwayat)', value=datetime.now().date())
     st.markdown('</div>', unsafe_allow_html=True)
 
     if all([u1, u2, u3, t_full, t_simple]):
@@ -362,10 +573,14 @@ def main():
                 'Stock Position Detail.xlsx': u2,
                 'BorrPosition.xlsx': u3
             }
-            res = process_lendable_limit(files, BytesIO(t_full.getvalue()))
+            res = process_lendable_limit(files, BytesIO(t_full.getvalue()), df_borrow_position)
 
             if res[0]:
-                xlsx_buf, full_buf, df_stat = res
+                xlsx_buf, full_buf, df_stat, df_agg = res
+                st.session_state['ll_aggregates'] = df_agg
+                st.session_state['ll_borrow_source'] = borrow_source
+                n_saved = save_ll_run(df_stat, run_date)
+                st.caption(f"💾 {n_saved} baris LL tersimpan ke riwayat tanggal {run_date.strftime('%d %b %Y')}.")
 
                 # Preview Result
                 st.markdown('<div class="card"><div class="card-title">Preview Result</div>', unsafe_allow_html=True)
@@ -408,4 +623,17 @@ def main():
         </div>
         """, unsafe_allow_html=True)
 
+    # intraday dulu: delta yang baru diterapkan langsung membuang index drill-down yang basi
+    if 'll_intraday' in st.session_state:
+        render_ll_intraday(st.session_state['ll_intraday'])
+    if 'll_holdings' in st.session_state:
+        render_ll_drilldown(st.session_state['ll_holdings'])
+    if 'll_aggregates' in st.session_state:
+        render_ll_allocation(st.session_state['ll_aggregates'])
+        render_ll_projection(st.session_state['ll_aggregates'])
+        render_ll_simulation(st.session_state['ll_aggregates'])
+
+    render_ll_history()
+    render_ll_backfill()
+
 main()
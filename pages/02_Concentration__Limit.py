@@ -13,273 +13,64 @@ if "login_status" not in st.session_state or not st.session_state["login_status"
     st.warning("Silakan login terlebih dahulu di halaman utama.")
     st.stop()
 import pandas as pd
-import numpy as np
 from openpyxl import load_workbook
 from openpyxl.styles import Font, Alignment, Border, Side, NamedStyle, PatternFill
 from openpyxl.utils import get_column_letter
 from io import BytesIO
 from datetime import datetime
 
-# ============================
-# KONFIGURASI GLOBAL CL
-# ============================
-COL_RMCC = 'CONCENTRATION LIMIT USULAN RMCC'
-COL_LISTED = 'CONCENTRATION LIMIT TERKENA % LISTED SHARES'
-COL_FF = 'CONCENTRATION LIMIT TERKENA % FREE FLOAT'
-COL_PERHITUNGAN = 'CONCENTRATION LIMIT SESUAI PERHITUNGAN'
-THRESHOLD_5M = 5_000_000_000
-# REVISI: KPIG dihapus
-KODE_EFEK_KHUSUS = ['LPKR', 'MLPL', 'NOBU', 'PTPP', 'SILO', 'LPCK']
-# REVISI: KPIG dihapus
-OVERRIDE_MAPPING = {
-    'LPKR': 10_000_000_000, 'MLPL': 10_000_000_000,
-    'NOBU': 10_000_000_000, 'PTPP': 50_000_000_000, 'SILO': 10_000_000_000, 'LPCK': 10_000_000_000
-}
-
-# Nilai dan toleransi untuk pengecekan 100%
-TARGET_100 = 100.0
-TOLERANCE = 1e-6 
-
-# ===============================================================
-# FUNGSI UTILITAS UNTUK CONCENTRATION LIMIT (CL)
-# ===============================================================
-
-def calc_concentration_limit_listed(row):
-    try:
-        if row['PERBANDINGAN DENGAN LISTED SHARES (Sesuai Perhitungan)'] >= 0.05:
-            return 0.0499 * row['LISTED SHARES'] * row['CLOSING PRICE']
-        return None
-    except Exception:
-        return None
-
-def calc_concentration_limit_ff(row):
-    try:
-        if row['PERBANDINGAN DENGAN FREE FLOAT (Sesuai Perhitungan)'] >= 0.20:
-            return 0.1999 * row['FREE FLOAT (DALAM LEMBAR)'] * row['CLOSING PRICE']
-        return None
-    except Exception:
-        return None
-
-# Fungsi override_rmcc_limit (diperbaiki agar CL=0 tetap 0 dan hanya CAP)
-def override_rmcc_limit(row):
-    kode = row['KODE EFEK']
-    nilai_rmcc = row[COL_RMCC]
-    
-    if kode in OVERRIDE_MAPPING:
-        nilai_override = OVERRIDE_MAPPING[kode]
-        
-        if nilai_rmcc == 0.0:
-            return 0.0
-            
-        return min(nilai_rmcc, nilai_override)
-        
-    return nilai_rmcc
-
-def reset_concentration_limit(
-    df_main: pd.DataFrame,
-    haircut_col: str = "HAIRCUT PEI USULAN DIVISI",
-    conc_limit_col: str = "CONCENTRATION LIMIT USULAN RMCC",
-    conc_calc_col: str = "CONCENTRATION LIMIT SESUAI PERHITUNGAN",
-    tolerance: float = 1e-6,
-    threshold_limit: float = 5_000_000_000,
-    inplace: bool = True
-) -> pd.DataFrame:
-    if not inplace:
-        df_main = df_main.copy()
-        
-    if haircut_col not in df_main.columns:
-        df_main[haircut_col] = 0.0
-        
-    df_main[haircut_col] = pd.to_numeric(df_main[haircut_col], errors='coerce')
-    df_main[conc_calc_col] = pd.to_numeric(df_main[conc_calc_col], errors='coerce')
-
-    valid_haircut = df_main[haircut_col].dropna()
-    target_100_reset = 100.0 if not valid_haircut.empty and valid_haircut.max() > 1 + tolerance else 1.0
-
-    mask_haircut_100 = (df_main[haircut_col].sub(target_100_reset).abs() < tolerance)
-    mask_below_threshold = (df_main[conc_calc_col] < threshold_limit)
-    mask_final = mask_haircut_100 | mask_below_threshold
-
-    df_main.loc[mask_final, conc_limit_col] = 0.0
-    return df_main
-
-def keterangan_uma(uma_date):
-    if pd.notna(uma_date):
-        if not isinstance(uma_date, datetime):
-            try:
-                uma_date = pd.to_datetime(str(uma_date))
-            except Exception:
-                return "Sesuai Metode Perhitungan"
-        return f"Sesuai Haircut KPEI, mempertimbangkan pengumuman UMA dari BEI tanggal {uma_date.strftime('%d %b %Y')}"
-    return "Sesuai Metode Perhitungan"
+from cl_engine import (
+    DEFAULT_OVERRIDE_MAPPING, DEFAULT_PRICE_SHOCKS, attach_pertimbangan_text,
+    calculate_concentration_limit, cl_stress_grid,
+)
+from cl_diff import change_set, cl_month_diff, incremental_cl_update
+from stock_master import sync_cl_source
 
-# ===============================================================
-# FUNGSI UTAMA UNTUK CONCENTRATION LIMIT (CL)
-# ===============================================================
 
-def calculate_concentration_limit(df_cl_source: pd.DataFrame) -> pd.DataFrame:
-    """Menjalankan seluruh logika perhitungan Concentration Limit."""
-    
-    df = df_cl_source.copy()
-    
-    if 'KODE EFEK' not in df.columns:
-        df = df.rename(columns={df.columns[0]: 'KODE EFEK'})
-        
-    df['KODE EFEK'] = df['KODE EFEK'].astype(str).str.strip()
-    
-    # 1. Perhitungan limit marjin
-    df['SAHAM MARJIN BARU?'] = df['SAHAM MARJIN BARU?'].astype(str).str.upper().str.strip()
-    df['CONCENTRATION LIMIT KARENA SAHAM MARJIN BARU'] = np.where(
-        df['SAHAM MARJIN BARU?'] == 'YA',
-        df[COL_PERHITUNGAN] * 0.50,
-        df[COL_PERHITUNGAN]
-    )
-
-    # 2. Hitung limit listed & FF
-    df[COL_LISTED] = df.apply(calc_concentration_limit_listed, axis=1)
-    df[COL_FF] = df.apply(calc_concentration_limit_ff, axis=1)
-
-    # 3. & 4. TENTUKAN CONCENTRATION LIMIT USULAN RMCC (Ambil nilai minimum)
-    limit_cols_for_min = [
-        'CONCENTRATION LIMIT KARENA SAHAM MARJIN BARU', 
-        COL_LISTED, COL_FF, COL_PERHITUNGAN
-    ]
-
-    df['MIN_CL_OPTION'] = df[limit_cols_for_min].fillna(np.inf).min(axis=1)
-    
-    # Tentukan pemicu nol
-    mask_pemicu_nol = (
-        (df['CONCENTRATION LIMIT KARENA SAHAM MARJIN BARU'].fillna(np.inf) < THRESHOLD_5M) |
-        (df[COL_PERHITUNGAN].fillna(np.inf) < THRESHOLD_5M) |
-        (df[COL_LISTED].fillna(np.inf) < THRESHOLD_5M) |
-        (df[COL_FF].fillna(np.inf) < THRESHOLD_5M)
-    )
-
-    df[COL_RMCC] = np.where(
-        mask_pemicu_nol,
-        0.0, 
-        df['MIN_CL_OPTION']
-    )
+# ============================
+# STRESS TEST HARGA PENUTUPAN
+# ============================
 
-    # 5. Override emiten khusus (Menerapkan CAP 10M/50M)
-    mask_not_zero = (df[COL_RMCC] != 0.0)
-    df.loc[mask_not_zero, COL_RMCC] = df.loc[mask_not_zero].apply(override_rmcc_limit, axis=1).round(0)
+def render_cl_stress(uploaded_file_cl):
+    st.subheader("Stress Test Harga Penutupan")
+    st.markdown("Hitung ulang CL USULAN RMCC untuk beberapa skenario penurunan CLOSING PRICE sekaligus.")
 
-    # 6. Tambah kolom haircut usulan 
-    df['HAIRCUT KPEI'] = pd.to_numeric(df['HAIRCUT KPEI'], errors='coerce').fillna(0)
-    df['HAIRCUT PEI USULAN DIVISI'] = np.where(
-        (df['UMA'].fillna('-') != '-') & pd.notna(df['UMA']),
-        df['HAIRCUT KPEI'],
-        df['HAIRCUT PEI']
+    shocks_pct = st.multiselect(
+        "Shock harga (%)",
+        options=[-5, -10, -15, -20, -25, -30, -40, -50],
+        default=[int(round(s * 100)) for s in DEFAULT_PRICE_SHOCKS],
+        key='cl_stress_shocks'
     )
 
-    # 7. Nolkan CL USULAN RMCC jika haircut awal 100% atau CL perhitungan < 5M
-    df = reset_concentration_limit(df)
+    if shocks_pct and st.button("Jalankan Stress Test", key='cl_stress_run'):
+        try:
+            uploaded_file_cl.seek(0)
+            df_cl_source, _, _ = sync_cl_source(pd.read_excel(uploaded_file_cl, engine='openpyxl'))
 
-    # 7B. SET HAIRCUT JADI 100% KARENA CL=0
-    HAIRCUT_COL_USULAN = 'HAIRCUT PEI USULAN DIVISI'
-    mask_rmcc_nol = (df[COL_RMCC] == 0)
-    df['TEMP_HAIRCUT_VAL_ASLI'] = pd.to_numeric(df[HAIRCUT_COL_USULAN], errors='coerce') 
-    df.loc[mask_rmcc_nol, HAIRCUT_COL_USULAN] = 1.0 
-
-    # 8. Keterangan Haircut & CONC LIMIT
-    df['PERTIMBANGAN DIVISI (HAIRCUT)'] = df['UMA'].apply(keterangan_uma)
-    df['PERTIMBANGAN DIVISI (CONC LIMIT)'] = 'Sesuai metode perhitungan' # Placeholder
+            with st.spinner('Menghitung grid stress...'):
+                df_summary, df_cl, df_binding = cl_stress_grid(
+                    df_cl_source, [s / 100 for s in sorted(shocks_pct, reverse=True)], DEFAULT_OVERRIDE_MAPPING
+                )
 
-    # 9. **(LOGIKA REVISI FINAL)** Definisikan Masker
+            st.dataframe(df_summary, use_container_width=True, hide_index=True)
+            st.dataframe(df_binding, use_container_width=True, hide_index=True)
 
-    # --- Definisikan Semua Masker CL = 0 ---
-    mask_emiten = df['KODE EFEK'].isin(KODE_EFEK_KHUSUS)
-    mask_nol_final = (df[COL_RMCC] == 0) & (~mask_emiten)
-    
-    mask_lt5m_strict = (
-        (df['CONCENTRATION LIMIT KARENA SAHAM MARJIN BARU'].fillna(np.inf) < THRESHOLD_5M) |
-        (df[COL_PERHITUNGAN].fillna(np.inf) < THRESHOLD_5M) |
-        (df[COL_LISTED].fillna(np.inf) < THRESHOLD_5M) |
-        (df[COL_FF].fillna(np.inf) < THRESHOLD_5M) |
-        (df[COL_RMCC].fillna(np.inf) < THRESHOLD_5M)
-    ) & mask_nol_final 
-                        
-    mask_hc100_origin = ((df['TEMP_HAIRCUT_VAL_ASLI'].sub(1.0).abs() < TOLERANCE) |
-                         (df['TEMP_HAIRCUT_VAL_ASLI'].sub(TARGET_100).abs() < TOLERANCE)) & \
-                        mask_nol_final & \
-                        (~mask_lt5m_strict)
+            output_buffer_stress = BytesIO()
+            with pd.ExcelWriter(output_buffer_stress, engine='openpyxl') as writer:
+                df_summary.to_excel(writer, sheet_name='Ringkasan', index=False)
+                df_cl.to_excel(writer, sheet_name='CL USULAN RMCC', index=False)
+                df_binding.to_excel(writer, sheet_name='Kendala Pengikat', index=False)
+            output_buffer_stress.seek(0)
 
-    # --- Definisikan Masker CL Non-Nol (CL != 0) ---
-    mask_non_nol = (df[COL_RMCC] != 0)
-    
-    # 1. Keterangan Emiten Khusus (Override Cap)
-    df['CL_OVERRIDE_VAL'] = df['KODE EFEK'].map(OVERRIDE_MAPPING).fillna(np.inf)
-    # True jika CL_RMCC sama persis dengan batas override (yang berarti override terpicu)
-    mask_emiten_override = mask_non_nol & mask_emiten & \
-                           (df[COL_RMCC].round(0) == df['CL_OVERRIDE_VAL'].round(0))
-
-    mask_other_non_nol = mask_non_nol & (~mask_emiten_override)
-    
-    # Masker Pendukung Kriteria (Apakah emiten kena Listed/FF secara kriteria?)
-    mask_kriteria_listed = pd.notna(df[COL_LISTED])
-    mask_kriteria_ff = pd.notna(df[COL_FF])
-    
-    # Masker Sumber Nilai Minimum (HARUS BERDASARKAN KESAMAAN DENGAN CL_RMCC)
-    
-    # 2. CL karena Listed Saja (Berasal dari Minimum)
-    mask_listed_saja = mask_other_non_nol & \
-                       (df[COL_RMCC].round(0) == df[COL_LISTED].round(0))
-    
-    # 3. CL karena FF Saja (Berasal dari Minimum)
-    # PENTING: Diberi pengecualian Listed Saja untuk menghindari konflik nilai yang sama
-    mask_ff_saja = mask_other_non_nol & \
-                   (df[COL_RMCC].round(0) == df[COL_FF].round(0)) & \
-                   (~mask_listed_saja)
-    
-    # 4. CL karena Saham Marjin Baru (Berasal dari Minimum)
-    # PENTING: Diberi pengecualian agar tidak bentrok jika nilainya sama persis dengan Listed/FF
-    mask_marjin_baru = mask_other_non_nol & \
-                       (df[COL_RMCC].round(0) == df['CONCENTRATION LIMIT KARENA SAHAM MARJIN BARU'].round(0)) & \
-                       (df['SAHAM MARJIN BARU?'] == 'YA') & \
-                       (~mask_listed_saja) & (~mask_ff_saja)
+            st.download_button(
+                label="⬇️ Unduh Hasil Stress Test",
+                data=output_buffer_stress,
+                file_name=f"stress_cl_{datetime.now().strftime('%B').lower()}.xlsx",
+                mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
 
-    # 5. LOGIKA UPGRADE KETERANGAN LISTED/FF GANDA
-    # Jika CL_RMCC berasal dari Listed ATAU FF, DAN kriteria Listed & FF keduanya terpenuhi
-    # (Ini akan menang atas Listed Saja atau FF Saja)
-    mask_listed_ff_upgrade = (mask_listed_saja | mask_ff_saja) & \
-                             mask_kriteria_listed & \
-                             mask_kriteria_ff
-    
-    
-    # 10. **(PENERAPAN FINAL)** Penerapan Keterangan (Prioritas Rendah ke Tinggi)
-
-    # A. CL = 0: CL < 5M (Prioritas 1)
-    df.loc[mask_lt5m_strict, 'PERTIMBANGAN DIVISI (CONC LIMIT)'] = 'Penyesuaian karena Batas Konsentrasi < Rp5 Miliar'
-    df.loc[mask_lt5m_strict, 'PERTIMBANGAN DIVISI (HAIRCUT)'] = 'Penyesuaian karena Batas Konsentrasi 0'
-    
-    # B. CL = 0: HC 100% (Prioritas 2)
-    df.loc[mask_hc100_origin, 'PERTIMBANGAN DIVISI (CONC LIMIT)'] = 'Penyesuaian karena Haircut PEI 100%'
-    
-    # C. CL = 0: Emiten Khusus (Prioritas 3)
-    df.loc[mask_emiten & mask_nol_final, 'PERTIMBANGAN DIVISI (CONC LIMIT)'] = 'Penyesuaian karena profil emiten'
-    
-    # D. CL != 0: Emiten Khusus (Override Cap) (Prioritas 4)
-    # Harus di bawah P5-P8, namun jika nilai CL_RMCC sama dengan Override, inilah keterangannya.
-    df.loc[mask_emiten_override, 'PERTIMBANGAN DIVISI (CONC LIMIT)'] = 'Penyesuaian karena profil emiten'
-    
-    # E. CL != 0: SAHAM MARJIN BARU (Prioritas 5)
-    df.loc[mask_marjin_baru, 'PERTIMBANGAN DIVISI (CONC LIMIT)'] = 'Penyesuaian karena saham baru masuk marjin'
-    
-    # F. CL != 0: Listed Saja (Prioritas 6)
-    df.loc[mask_listed_saja, 'PERTIMBANGAN DIVISI (CONC LIMIT)'] = 'Penyesuaian karena melebihi 5% listed shares'
-    
-    # G. CL != 0: FF Saja (Prioritas 7)
-    df.loc[mask_ff_saja, 'PERTIMBANGAN DIVISI (CONC LIMIT)'] = 'Penyesuaian karena melebihi 20% free float'
-    
-    # H. CL != 0: Listed/FF Ganda (Prioritas 8 - UPGRADE KETERANGAN)
-    # Ini menimpa (F) atau (G) jika sumber minimumnya adalah Listed atau FF, tetapi secara kriteria, dia Ganda.
-    df.loc[mask_listed_ff_upgrade, 'PERTIMBANGAN DIVISI (CONC LIMIT)'] = 'Penyesuaian karena melebihi 5% listed & 20% free float'
-    
-    # Cleanup kolom bantuan
-    df = df.drop(columns=['MIN_CL_OPTION', 'TEMP_HAIRCUT_VAL_ASLI', 'CL_OVERRIDE_VAL'], errors='ignore')
-
-    return df
+        except Exception as e:
+            st.error(f"❌ Gagal menjalankan stress test. Error: {e}")
 
 # ============================
 # ANTARMUKA CL
@@ -296,19 +87,62 @@ def main():
     required_file_cl = f'File Sumber Concentration Limit (misal: {example_filename})'
     
     uploaded_file_cl = st.file_uploader(f"Unggah {required_file_cl}", type=['xlsx'], key='cl_source')
+    uploaded_prev_cl = st.file_uploader(
+        "Unggah Hasil CL Bulan Lalu (opsional, misal: `clhc_<bulan lalu>.xlsx`) untuk perbandingan bulanan",
+        type=['xlsx'], key='cl_prev_result'
+    )
+    fill_from_master = st.checkbox(
+        "Isi LISTED SHARES / FREE FLOAT / CLOSING PRICE yang kosong dari stock master",
+        value=False, key='cl_fill_master',
+        help="Nilai master bisa lebih lama dari file sumber; sel yang diisi ditampilkan setelah perhitungan."
+    )
     
     if uploaded_file_cl is not None:
         if st.button("Jalankan Perhitungan CL", type="primary"):
             try:
-                df_cl_source = pd.read_excel(uploaded_file_cl, engine='openpyxl')
+                # kolom referensi memperbarui stock master; yang kosong diisi dari master bila dicentang
+                df_cl_source, n_master, df_filled = sync_cl_source(
+                    pd.read_excel(uploaded_file_cl, engine='openpyxl'), fill_from_master=fill_from_master
+                )
+                if n_master:
+                    st.caption(f"Stock master diperbarui: {n_master} saham.")
+                if not df_filled.empty:
+                    st.warning(f"⚠️ {len(df_filled)} saham memakai nilai stock master untuk sel yang kosong di file sumber.")
+                    with st.expander("Sel yang diisi dari stock master"):
+                        st.dataframe(df_filled, use_container_width=True, hide_index=True)
+                df_cl_prev = pd.read_excel(uploaded_prev_cl, engine='openpyxl') if uploaded_prev_cl is not None else None
                 
                 with st.spinner('Menghitung Concentration Limit...'):
-                    df_cl_hasil = calculate_concentration_limit(df_cl_source)
+                    if df_cl_prev is None:
+                        df_cl_hasil = attach_pertimbangan_text(calculate_concentration_limit(df_cl_source, DEFAULT_OVERRIDE_MAPPING))
+                    else:
+                        df_cl_hasil, recomputed = incremental_cl_update(df_cl_source, df_cl_prev, DEFAULT_OVERRIDE_MAPPING)
                 
                 st.success("✅ Perhitungan Concentration Limit selesai. Siap diunduh!")
                 st.subheader("Hasil Concentration Limit (Tabel)")
                 st.dataframe(df_cl_hasil) 
                 
+                if df_cl_prev is not None:
+                    df_diff, df_changes = cl_month_diff(df_cl_prev, df_cl_hasil, DEFAULT_OVERRIDE_MAPPING)
+                    st.subheader("Perubahan vs Bulan Lalu")
+                    st.caption(f"{int(recomputed.sum())} dari {len(recomputed)} saham dihitung ulang (input berubah / baru / emiten khusus).")
+                    st.dataframe(df_changes, use_container_width=True, hide_index=True)
+                    st.dataframe(change_set(df_diff), use_container_width=True, hide_index=True)
+                    
+                    output_buffer_diff = BytesIO()
+                    with pd.ExcelWriter(output_buffer_diff, engine='openpyxl') as writer:
+                        df_changes.to_excel(writer, sheet_name='Ringkasan', index=False)
+                        change_set(df_diff).to_excel(writer, sheet_name='Perubahan', index=False)
+                        df_diff.to_excel(writer, sheet_name='Diff Lengkap', index=False)
+                    output_buffer_diff.seek(0)
+                    
+                    st.download_button(
+                        label="⬇️ Unduh Perbandingan Bulanan",
+                        data=output_buffer_diff,
+                        file_name=f"diff_clhc_{datetime.now().strftime('%B').lower()}.xlsx",
+                        mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+                    )
+                
                 output_buffer_cl = BytesIO()
                 df_cl_hasil.to_excel(output_buffer_cl, index=False)
                 output_buffer_cl.seek(0)
@@ -326,6 +160,8 @@ def main():
             except Exception as e:
                 st.error(f"❌ Gagal dalam perhitungan CL. Pastikan format file benar. Error: {e}")
 
+        render_cl_stress(uploaded_file_cl)
+
 if __name__ == '__main__':
     main()
 
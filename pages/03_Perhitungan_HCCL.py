@@ -92,212 +92,88 @@ from openpyxl import load_workbook
 from io import BytesIO
 from datetime import datetime
 
-# ============================
-# KONFIGURASI GLOBAL CL
-# ============================
-COL_RMCC = 'CONCENTRATION LIMIT USULAN RMCC'
-COL_LISTED = 'CONCENTRATION LIMIT TERKENA % LISTED SHARES'
-COL_FF = 'CONCENTRATION LIMIT TERKENA % FREE FLOAT'
-COL_PERHITUNGAN = 'CONCENTRATION LIMIT SESUAI PERHITUNGAN'
-THRESHOLD_5M = 5_000_000_000
-OVERRIDE_MAPPING = st.session_state['override_mapping']
-KODE_EFEK_KHUSUS = list(OVERRIDE_MAPPING.keys())
-TARGET_100 = 100.0
-TOLERANCE = 1e-6
+from cl_batch import cl_cross_period_summary, group_cl_inputs, run_cl_batch, write_cl_batch_workbook
+from cl_engine import COL_FF, COL_LISTED, COL_RMCC, attach_pertimbangan_text, calculate_concentration_limit
+from cl_monitor import CLDailyMonitor, read_closing_prices
+from cl_utilization import CLUtilization
+from hc_reconciliation import (
+    COL_KATEGORI, KATEGORI_SAMA, load_kpei_store, read_kpei_publication, reconcile_haircut, save_kpei_publication,
+)
+from stock_master import sync_cl_source
 
-# ===============================================================
-# FUNGSI UTILITAS UNTUK CONCENTRATION LIMIT (CL)
-# ===============================================================
-
-def calc_concentration_limit_listed(row):
-    try:
-        if row['PERBANDINGAN DENGAN LISTED SHARES (Sesuai Perhitungan)'] >= 0.05:
-            return 0.0499 * row['LISTED SHARES'] * row['CLOSING PRICE']
-        return None
-    except Exception:
-        return None
-
-def calc_concentration_limit_ff(row):
-    try:
-        if row['PERBANDINGAN DENGAN FREE FLOAT (Sesuai Perhitungan)'] >= 0.20:
-            return 0.1999 * row['FREE FLOAT (DALAM LEMBAR)'] * row['CLOSING PRICE']
-        return None
-    except Exception:
-        return None
-
-def override_rmcc_limit(row):
-    kode = row['KODE EFEK']
-    nilai_rmcc = row[COL_RMCC]
-    if kode in OVERRIDE_MAPPING:
-        if nilai_rmcc == 0.0:
-            return 0.0
-        return min(nilai_rmcc, OVERRIDE_MAPPING[kode])
-    return nilai_rmcc
-
-def reset_concentration_limit(
-    df_main: pd.DataFrame,
-    haircut_col: str = "HAIRCUT PEI USULAN DIVISI",
-    conc_limit_col: str = "CONCENTRATION LIMIT USULAN RMCC",
-    conc_calc_col: str = "CONCENTRATION LIMIT SESUAI PERHITUNGAN",
-    tolerance: float = 1e-6,
-    threshold_limit: float = 5_000_000_000,
-    inplace: bool = True
-) -> pd.DataFrame:
-    if not inplace:
-        df_main = df_main.copy()
-
-    if haircut_col not in df_main.columns:
-        df_main[haircut_col] = 0.0
-
-    df_main[haircut_col] = pd.to_numeric(df_main[haircut_col], errors='coerce')
-    df_main[conc_calc_col] = pd.to_numeric(df_main[conc_calc_col], errors='coerce')
-
-    valid_haircut = df_main[haircut_col].dropna()
-    target_100_reset = 100.0 if not valid_haircut.empty and valid_haircut.max() > 1 + tolerance else 1.0
-
-    mask_haircut_100 = (df_main[haircut_col].sub(target_100_reset).abs() < tolerance)
-    mask_below_threshold = (df_main[conc_calc_col] < threshold_limit)
-    mask_final = mask_haircut_100 | mask_below_threshold
-
-    df_main.loc[mask_final, conc_limit_col] = 0.0
-    return df_main
-
-def keterangan_uma(uma_date):
-    if pd.notna(uma_date):
-        if not isinstance(uma_date, datetime):
-            try:
-                uma_date = pd.to_datetime(str(uma_date))
-            except Exception:
-                return "Sesuai Metode Perhitungan"
-        return f"Sesuai Haircut KPEI, mempertimbangkan pengumuman UMA dari BEI tanggal {uma_date.strftime('%d %b %Y')}"
-    return "Sesuai Metode Perhitungan"
 
 # ===============================================================
-# FUNGSI UTAMA PERHITUNGAN CONCENTRATION LIMIT
+# FUNGSI INJECTOR KE TEMPLATE EXCEL (dari Code 1, disesuaikan)
 # ===============================================================
 
-def calculate_concentration_limit(df_cl_source: pd.DataFrame) -> pd.DataFrame:
-    df = df_cl_source.copy()
-
-    if 'KODE EFEK' not in df.columns:
-        df = df.rename(columns={df.columns[0]: 'KODE EFEK'})
+# Kolom tujuan per sheet: (nomor kolom Excel, kolom df hasil)
+INJECT_COLUMNS = {
+    'CONC': [
+        (16, 'CONCENTRATION LIMIT KARENA SAHAM MARJIN BARU'),
+        (17, COL_LISTED),
+        (18, COL_FF),
+        (19, COL_RMCC),
+        (22, 'PERTIMBANGAN DIVISI (CONC LIMIT)'),
+    ],
+    'HC': [
+        (18, 'HAIRCUT PEI USULAN DIVISI'),
+        (20, 'PERTIMBANGAN DIVISI (HAIRCUT)'),
+    ],
+}
+INJECT_START_ROW = 5
+INJECT_KEY_COL = 3  # col C = KODE EFEK
+INJECT_RTOL = 1e-14
 
-    df['KODE EFEK'] = df['KODE EFEK'].astype(str).str.strip()
 
-    # 1. Limit marjin baru
-    df['SAHAM MARJIN BARU?'] = df['SAHAM MARJIN BARU?'].astype(str).str.upper().str.strip()
-    df['CONCENTRATION LIMIT KARENA SAHAM MARJIN BARU'] = np.where(
-        df['SAHAM MARJIN BARU?'] == 'YA',
-        df[COL_PERHITUNGAN] * 0.50,
-        df[COL_PERHITUNGAN]
+def _same_cells(old, new):
+    """
+    Bandingkan isi sel lama vs nilai baru (array object). Angka dianggap sama bila
+    selisih relatifnya < INJECT_RTOL, karena xlsx hanya menyimpan ~15 digit signifikan.
+    """
+    old_num = pd.to_numeric(pd.Series(old), errors='coerce').to_numpy(dtype=float)
+    new_num = pd.to_numeric(pd.Series(new), errors='coerce').to_numpy(dtype=float)
+    both_num = ~np.isnan(old_num) & ~np.isnan(new_num)
+    both_missing = pd.isna(old) & pd.isna(new)
+    same_num = both_num & np.isclose(old_num, new_num, rtol=INJECT_RTOL, atol=0)
+    same_other = ~both_num & np.array([o == n for o, n in zip(old, new)], dtype=bool)
+    return both_missing | same_num | same_other
+
+
+def _column_values(ws, col):
+    """Isi satu kolom mulai INJECT_START_ROW (hanya kolom itu yang dibaca, bukan seluruh lebar sheet)."""
+    return np.array(
+        [r[0] for r in ws.iter_rows(min_row=INJECT_START_ROW, min_col=col, max_col=col, values_only=True)],
+        dtype=object,
     )
 
-    # 2. Hitung limit listed & FF
-    df[COL_LISTED] = df.apply(calc_concentration_limit_listed, axis=1)
-    df[COL_FF] = df.apply(calc_concentration_limit_ff, axis=1)
-
-    # 3. Ambil nilai minimum
-    limit_cols_for_min = [
-        'CONCENTRATION LIMIT KARENA SAHAM MARJIN BARU',
-        COL_LISTED, COL_FF, COL_PERHITUNGAN
-    ]
-    df['MIN_CL_OPTION'] = df[limit_cols_for_min].fillna(np.inf).min(axis=1)
-
-    # 4. Tentukan pemicu nol
-    mask_pemicu_nol = (
-        (df['CONCENTRATION LIMIT KARENA SAHAM MARJIN BARU'].fillna(np.inf) < THRESHOLD_5M) |
-        (df[COL_PERHITUNGAN].fillna(np.inf) < THRESHOLD_5M) |
-        (df[COL_LISTED].fillna(np.inf) < THRESHOLD_5M) |
-        (df[COL_FF].fillna(np.inf) < THRESHOLD_5M)
-    )
 
-    df[COL_RMCC] = np.where(mask_pemicu_nol, 0.0, df['MIN_CL_OPTION'])
+def _inject_sheet(ws, df_hasil_by_kode, columns):
+    """Tulis hanya sel yang nilainya berubah; return jumlah sel yang ditulis."""
+    if ws.max_row < INJECT_START_ROW:
+        return 0
 
-    # 5. Override emiten khusus (CAP 10M/50M)
-    mask_not_zero = (df[COL_RMCC] != 0.0)
-    df.loc[mask_not_zero, COL_RMCC] = df.loc[mask_not_zero].apply(override_rmcc_limit, axis=1).round(0)
+    # map KODE EFEK -> baris df hasil (sekali per sheet)
+    kode = pd.Series(_column_values(ws, INJECT_KEY_COL), dtype=object)
+    kode = kode.where(kode.isna(), kode.astype(str).str.strip())
+    pos = df_hasil_by_kode.index.get_indexer(kode)
+    matched = np.flatnonzero(pos >= 0)
+    if len(matched) == 0:
+        return 0
 
-    # 6. Haircut usulan divisi
-    df['HAIRCUT KPEI'] = pd.to_numeric(df['HAIRCUT KPEI'], errors='coerce').fillna(0)
-    df['HAIRCUT PEI USULAN DIVISI'] = np.where(
-        (df['UMA'].fillna('-') != '-') & pd.notna(df['UMA']),
-        df['HAIRCUT KPEI'],
-        df['HAIRCUT PEI']
-    )
-
-    # 7. Nolkan CL jika haircut 100% atau CL perhitungan < 5M
-    df = reset_concentration_limit(df)
-
-    # 7B. Set haircut jadi 100% jika CL = 0
-    HAIRCUT_COL_USULAN = 'HAIRCUT PEI USULAN DIVISI'
-    mask_rmcc_nol = (df[COL_RMCC] == 0)
-    df['TEMP_HAIRCUT_VAL_ASLI'] = pd.to_numeric(df[HAIRCUT_COL_USULAN], errors='coerce')
-    df.loc[mask_rmcc_nol, HAIRCUT_COL_USULAN] = 1.0
-
-    # 8. Keterangan awal
-    df['PERTIMBANGAN DIVISI (HAIRCUT)'] = df['UMA'].apply(keterangan_uma)
-    df['PERTIMBANGAN DIVISI (CONC LIMIT)'] = 'Sesuai metode perhitungan'
-
-    # 9. Definisikan masker untuk keterangan
-    mask_emiten = df['KODE EFEK'].isin(KODE_EFEK_KHUSUS)
-    mask_nol_final = (df[COL_RMCC] == 0) & (~mask_emiten)
-
-    mask_lt5m_strict = (
-        (df['CONCENTRATION LIMIT KARENA SAHAM MARJIN BARU'].fillna(np.inf) < THRESHOLD_5M) |
-        (df[COL_PERHITUNGAN].fillna(np.inf) < THRESHOLD_5M) |
-        (df[COL_LISTED].fillna(np.inf) < THRESHOLD_5M) |
-        (df[COL_FF].fillna(np.inf) < THRESHOLD_5M) |
-        (df[COL_RMCC].fillna(np.inf) < THRESHOLD_5M)
-    ) & mask_nol_final
-
-    mask_hc100_origin = (
-        (df['TEMP_HAIRCUT_VAL_ASLI'].sub(1.0).abs() < TOLERANCE) |
-        (df['TEMP_HAIRCUT_VAL_ASLI'].sub(TARGET_100).abs() < TOLERANCE)
-    ) & mask_nol_final & (~mask_lt5m_strict)
-
-    mask_non_nol = (df[COL_RMCC] != 0)
-    df['CL_OVERRIDE_VAL'] = df['KODE EFEK'].map(OVERRIDE_MAPPING).fillna(np.inf)
-    mask_emiten_override = mask_non_nol & mask_emiten & \
-                           (df[COL_RMCC].round(0) == df['CL_OVERRIDE_VAL'].round(0))
-    mask_other_non_nol = mask_non_nol & (~mask_emiten_override)
-
-    mask_kriteria_listed = pd.notna(df[COL_LISTED])
-    mask_kriteria_ff = pd.notna(df[COL_FF])
-
-    mask_listed_saja = mask_other_non_nol & \
-                       (df[COL_RMCC].round(0) == df[COL_LISTED].round(0))
-
-    mask_ff_saja = mask_other_non_nol & \
-                   (df[COL_RMCC].round(0) == df[COL_FF].round(0)) & \
-                   (~mask_listed_saja)
-
-    mask_marjin_baru = mask_other_non_nol & \
-                       (df[COL_RMCC].round(0) == df['CONCENTRATION LIMIT KARENA SAHAM MARJIN BARU'].round(0)) & \
-                       (df['SAHAM MARJIN BARU?'] == 'YA') & \
-                       (~mask_listed_saja) & (~mask_ff_saja)
-
-    mask_listed_ff_upgrade = (mask_listed_saja | mask_ff_saja) & \
-                              mask_kriteria_listed & mask_kriteria_ff
-
-    # 10. Penerapan keterangan (prioritas rendah ke tinggi)
-    df.loc[mask_lt5m_strict, 'PERTIMBANGAN DIVISI (CONC LIMIT)'] = 'Penyesuaian karena Batas Konsentrasi < Rp5 Miliar'
-    df.loc[mask_lt5m_strict, 'PERTIMBANGAN DIVISI (HAIRCUT)'] = 'Penyesuaian karena Batas Konsentrasi 0'
-    df.loc[mask_hc100_origin, 'PERTIMBANGAN DIVISI (CONC LIMIT)'] = 'Penyesuaian karena Haircut PEI 100%'
-    df.loc[mask_emiten & mask_nol_final, 'PERTIMBANGAN DIVISI (CONC LIMIT)'] = 'Penyesuaian karena profil emiten'
-    df.loc[mask_emiten_override, 'PERTIMBANGAN DIVISI (CONC LIMIT)'] = 'Penyesuaian karena profil emiten'
-    df.loc[mask_marjin_baru, 'PERTIMBANGAN DIVISI (CONC LIMIT)'] = 'Penyesuaian karena saham baru masuk marjin'
-    df.loc[mask_listed_saja, 'PERTIMBANGAN DIVISI (CONC LIMIT)'] = 'Penyesuaian karena melebihi 5% listed shares'
-    df.loc[mask_ff_saja, 'PERTIMBANGAN DIVISI (CONC LIMIT)'] = 'Penyesuaian karena melebihi 20% free float'
-    df.loc[mask_listed_ff_upgrade, 'PERTIMBANGAN DIVISI (CONC LIMIT)'] = 'Penyesuaian karena melebihi 5% listed & 20% free float'
-
-    # Cleanup kolom bantuan
-    df = df.drop(columns=['MIN_CL_OPTION', 'TEMP_HAIRCUT_VAL_ASLI', 'CL_OVERRIDE_VAL'], errors='ignore')
-
-    return df
+    n_changed = 0
+    for col, name in columns:
+        if name not in df_hasil_by_kode.columns:
+            continue
+        new = df_hasil_by_kode[name].iloc[pos[matched]]
+        new = new.astype(object).where(new.notna(), None).to_numpy()
+        old = _column_values(ws, col)[matched]
+        changed = np.flatnonzero(~_same_cells(old, new))
+        for i in changed:
+            # set .value langsung: ws.cell(value=None) tidak mengosongkan sel
+            ws.cell(row=INJECT_START_ROW + matched[i], column=col).value = new[i]
+        n_changed += len(changed)
+    return n_changed
 
-# ===============================================================
-# FUNGSI INJECTOR KE TEMPLATE EXCEL (dari Code 1, disesuaikan)
-# ===============================================================
 
 def update_excel_template(file_template, df_hasil):
     """
@@ -316,48 +192,48 @@ def update_excel_template(file_template, df_hasil):
     
     Matching dilakukan berdasarkan KODE EFEK di col 3 (C),
     bukan urutan baris, agar aman jika urutan berbeda.
+    Nilai baru dibandingkan (vektor) dengan isi sel yang ada; hanya sel yang
+    berubah yang ditulis. Nilai kosong (NaN) ditulis sebagai sel kosong.
+
+    Return (output, n_changed) -- n_changed = {nama sheet: jumlah sel yang diubah}.
     """
     output = BytesIO()
     wb = load_workbook(file_template)
-    ws_conc = wb["CONC"]
-    ws_hc = wb["HC"]
 
-    # Buat lookup dict dari df_hasil: kode_efek -> row dict
-    hasil_map = {
-        str(row.get('KODE EFEK', '')).strip(): row
-        for row in df_hasil.to_dict('records')
-    }
+    # KODE EFEK -> baris hasil (kode duplikat: baris terakhir yang dipakai)
+    df_hasil_by_kode = df_hasil.assign(
+        **{'KODE EFEK': df_hasil['KODE EFEK'].astype(str).str.strip()}
+    ).drop_duplicates('KODE EFEK', keep='last').set_index('KODE EFEK')
 
-    # --- INJECT SHEET CONC ---
-    for excel_row in ws_conc.iter_rows(min_row=5):
-        kode = excel_row[2].value  # col C = index 2
-        if kode is None:
-            continue
-        kode = str(kode).strip()
-        if kode not in hasil_map:
-            continue
-        row = hasil_map[kode]
-        ws_conc.cell(row=excel_row[0].row, column=16, value=row.get('CONCENTRATION LIMIT KARENA SAHAM MARJIN BARU'))
-        ws_conc.cell(row=excel_row[0].row, column=17, value=row.get(COL_LISTED))
-        ws_conc.cell(row=excel_row[0].row, column=18, value=row.get(COL_FF))
-        ws_conc.cell(row=excel_row[0].row, column=19, value=row.get(COL_RMCC))
-        ws_conc.cell(row=excel_row[0].row, column=22, value=row.get('PERTIMBANGAN DIVISI (CONC LIMIT)'))
-
-    # --- INJECT SHEET HC ---
-    for excel_row in ws_hc.iter_rows(min_row=5):
-        kode = excel_row[2].value  # col C = index 2
-        if kode is None:
-            continue
-        kode = str(kode).strip()
-        if kode not in hasil_map:
-            continue
-        row = hasil_map[kode]
-        ws_hc.cell(row=excel_row[0].row, column=18, value=row.get('HAIRCUT PEI USULAN DIVISI'))
-        ws_hc.cell(row=excel_row[0].row, column=20, value=row.get('PERTIMBANGAN DIVISI (HAIRCUT)'))
+    n_changed = {
+        sheet: _inject_sheet(wb[sheet], df_hasil_by_kode, columns)
+        for sheet, columns in INJECT_COLUMNS.items()
+    }
 
     wb.save(output)
     output.seek(0)
-    return output
+    return output, n_changed
+
+# ============================
+# MONITOR HARIAN (CACHE BASIS)
+# ============================
+
+@st.cache_resource(max_entries=4)
+def _load_cl_monitor(source_bytes, mapping_items):
+    # isi file + konfigurasi emiten jadi key cache -> basis bulanan hanya dibangun sekali
+    df_cl_source = pd.read_excel(BytesIO(source_bytes), engine='openpyxl')
+    return CLDailyMonitor(df_cl_source, dict(mapping_items))
+
+
+@st.cache_resource(max_entries=4)
+def _load_cl_utilization(hasil_bytes):
+    # index CL dibangun sekali per file hasil; tiap file posisi baru cukup check()
+    return CLUtilization(pd.read_excel(BytesIO(hasil_bytes), engine='openpyxl'))
+
+
+@st.cache_data(max_entries=4)
+def _read_cl_hasil(hasil_bytes):
+    return pd.read_excel(BytesIO(hasil_bytes), engine='openpyxl')
 
 # ============================
 # ANTARMUKA STREAMLIT
@@ -371,26 +247,57 @@ def main():
     </div>
     """, unsafe_allow_html=True)
 
-    tab1, tab2, tab3 = st.tabs(["📊 Hitung CL & Haircut", "💉 Inject ke Template", "⚙️ Konfigurasi Emiten"])
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
+        "📊 Hitung CL & Haircut", "💉 Inject ke Template", "⚙️ Konfigurasi Emiten", "📈 Monitor Harian",
+        "🗂️ Batch Multi-Periode", "🎯 Utilisasi CL", "⚖️ Rekonsiliasi Haircut"
+    ])
     
     with tab1:
-        st.markdown("Unggah file sumber raw data untuk menjalankan perhitungan CL & Haircut.")
+        st.markdown("Unggah file sumber raw data untuk menjalankan perhitungan CL & Haircut. "
+                    "Kalau template target ikut diunggah, hasil langsung di-inject ke template (tanpa unduh/unggah ulang).")
 
         current_month_name = datetime.now().strftime('%B').lower()
         example_filename = f'HCCL_{current_month_name}.xlsx'
 
-        uploaded_file_cl = st.file_uploader(
-            f"📂 Unggah File Sumber (misal: `{example_filename}`)",
-            type=['xlsx'], key='cl_source'
+        col1, col2 = st.columns(2)
+        with col1:
+            uploaded_file_cl = st.file_uploader(
+                f"📂 Unggah File Sumber (misal: `{example_filename}`)",
+                type=['xlsx'], key='cl_source'
+            )
+        with col2:
+            uploaded_template_direct = st.file_uploader(
+                "📋 Template Target (opsional, untuk inject langsung)",
+                type=['xlsx'], key='cl_template_direct'
+            )
+        fill_from_master = st.checkbox(
+            "Isi LISTED SHARES / FREE FLOAT / CLOSING PRICE yang kosong dari stock master",
+            value=False, key='cl_fill_master',
+            help="Nilai master bisa lebih lama dari file sumber; sel yang diisi ditampilkan setelah perhitungan."
         )
 
         if uploaded_file_cl is not None:
-            if st.button("🚀 Jalankan Perhitungan CL", type="primary"):
+            button_label = "🚀 Hitung & Inject ke Template" if uploaded_template_direct is not None else "🚀 Jalankan Perhitungan CL"
+            if st.button(button_label, type="primary"):
                 try:
-                    df_cl_source = pd.read_excel(uploaded_file_cl, engine='openpyxl')
+                    # kolom referensi memperbarui stock master; yang kosong diisi dari master bila dicentang
+                    df_cl_source, n_master, df_filled = sync_cl_source(
+                        pd.read_excel(uploaded_file_cl, engine='openpyxl'), fill_from_master=fill_from_master
+                    )
+                    if n_master:
+                        st.caption(f"Stock master diperbarui: {n_master} saham.")
+                    if not df_filled.empty:
+                        st.warning(f"⚠️ {len(df_filled)} saham memakai nilai stock master untuk sel yang kosong di file sumber.")
+                        with st.expander("Sel yang diisi dari stock master"):
+                            st.dataframe(df_filled, use_container_width=True, hide_index=True)
 
                     with st.spinner('Menghitung Concentration Limit...'):
-                        df_cl_hasil = calculate_concentration_limit(df_cl_source)
+                        df_cl_hasil = attach_pertimbangan_text(
+                            calculate_concentration_limit(df_cl_source, st.session_state['override_mapping'])
+                        )
+                    # disimpan di session supaya Tab 2 bisa inject tanpa unggah ulang file hasil
+                    st.session_state['cl_hasil_df'] = df_cl_hasil
+                    st.session_state['cl_utilization'] = CLUtilization(df_cl_hasil)
 
                     st.success("✅ Perhitungan selesai!")
                     st.subheader("Hasil (Tabel)")
@@ -407,34 +314,61 @@ def main():
                         mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
                     )
 
+                    if uploaded_template_direct is not None:
+                        with st.spinner('Menyuntikkan data ke template...'):
+                            uploaded_template_direct.seek(0)
+                            final_xlsx, n_changed = update_excel_template(uploaded_template_direct, df_cl_hasil)
+
+                        st.success(f"✅ Inject selesai! {sum(n_changed.values())} sel diubah "
+                                   f"(CONC: {n_changed['CONC']}, HC: {n_changed['HC']}).")
+                        st.download_button(
+                            label="⬇️ Unduh Hasil (Injected ke Template)",
+                            data=final_xlsx,
+                            file_name=f'Hasil_Template_{current_month_name}.xlsx',
+                            mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+                        )
+
                 except Exception as e:
                     st.error(f"❌ Gagal. Pastikan format file benar. Error: {e}")
 
     with tab2:
-        st.markdown("Unggah hasil perhitungan dari Tab 1 dan template target untuk inject.")
+        st.markdown("Inject hasil perhitungan Tab 1 (dari memori atau file hasil) ke template target.")
+
+        source_memory = "Hasil Tab 1 (di memori)"
+        source_options = ([source_memory] if 'cl_hasil_df' in st.session_state else []) + ["Unggah file hasil"]
+        hasil_source = st.radio("Sumber hasil perhitungan", source_options, horizontal=True, key='cl_hasil_source')
 
         col1, col2 = st.columns(2)
         with col1:
-            uploaded_hasil = st.file_uploader(
-                "📂 Unggah Hasil Perhitungan (dari Tab 1)",
-                type=['xlsx'], key='cl_hasil'
-            )
+            if hasil_source == source_memory:
+                uploaded_hasil = None
+                st.caption(f"{len(st.session_state['cl_hasil_df'])} baris hasil Tab 1 siap di-inject.")
+            else:
+                uploaded_hasil = st.file_uploader(
+                    "📂 Unggah Hasil Perhitungan (dari Tab 1)",
+                    type=['xlsx'], key='cl_hasil'
+                )
         with col2:
             uploaded_template = st.file_uploader(
                 "📋 Unggah Template Target (XLSX)",
                 type=['xlsx'], key='cl_template'
             )
 
-        if uploaded_hasil is not None and uploaded_template is not None:
+        hasil_ready = hasil_source == source_memory or uploaded_hasil is not None
+        if hasil_ready and uploaded_template is not None:
             if st.button("💉 Inject ke Template", type="primary"):
                 try:
-                    df_hasil = pd.read_excel(uploaded_hasil, engine='openpyxl')
+                    if hasil_source == source_memory:
+                        df_hasil = st.session_state['cl_hasil_df']
+                    else:
+                        df_hasil = pd.read_excel(uploaded_hasil, engine='openpyxl')
 
                     with st.spinner('Menyuntikkan data ke template...'):
                         uploaded_template.seek(0)
-                        final_xlsx = update_excel_template(uploaded_template, df_hasil)
+                        final_xlsx, n_changed = update_excel_template(uploaded_template, df_hasil)
 
-                    st.success("✅ Inject selesai!")
+                    st.success(f"✅ Inject selesai! {sum(n_changed.values())} sel diubah "
+                               f"(CONC: {n_changed['CONC']}, HC: {n_changed['HC']}).")
 
                     current_month_name = datetime.now().strftime('%B').lower()
                     st.download_button(
@@ -447,7 +381,7 @@ def main():
                 except Exception as e:
                     st.error(f"❌ Gagal inject. Error: {e}")
         else:
-            st.info("💡 Upload kedua file di atas untuk mengaktifkan tombol inject.")
+            st.info("💡 Siapkan hasil perhitungan dan template di atas untuk mengaktifkan tombol inject.")
 
     with tab3:
         st.markdown("### Konfigurasi Emiten Khusus")
@@ -519,5 +453,227 @@ def main():
         ])
         st.dataframe(df_emiten, use_container_width=True, hide_index=True)
 
+    with tab4:
+        st.markdown("Cek harian: terapkan closing price terbaru ke basis CL bulan ini dan tampilkan saham yang melewati batas 5% listed, 20% free float atau Rp5 Miliar.")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            uploaded_basis = st.file_uploader(
+                "📂 Unggah File Sumber Bulan Ini (basis, misal: `HCCL_<bulan>.xlsx`)",
+                type=['xlsx'], key='cl_monitor_source'
+            )
+        with col2:
+            uploaded_prices = st.file_uploader(
+                "📈 Unggah Closing Price Harian (kolom `KODE EFEK`, `CLOSING PRICE`)",
+                type=['xlsx', 'csv'], key='cl_monitor_prices'
+            )
+
+        if uploaded_basis is not None and uploaded_prices is not None:
+            try:
+                monitor = _load_cl_monitor(
+                    uploaded_basis.getvalue(), tuple(sorted(st.session_state['override_mapping'].items()))
+                )
+                df_prices = read_closing_prices(uploaded_prices, uploaded_prices.name)
+                df_breach, info = monitor.check(df_prices)
+
+                m1, m2, m3, m4 = st.columns(4)
+                m1.metric("Harga Cocok", f"{info['harga_cocok']} / {info['saham_basis']}")
+                m2.metric("Lewat 5% Listed", int(df_breach['Lewat 5% Listed'].sum()))
+                m3.metric("Lewat 20% Free Float", int(df_breach['Lewat 20% Free Float'].sum()))
+                m4.metric("Lewat Rp5 Miliar", int(df_breach['Lewat Rp5 Miliar'].sum()))
+                if info['kode_tidak_dikenal']:
+                    st.caption(f"{info['kode_tidak_dikenal']} kode di file harga tidak ada di basis bulan ini (diabaikan).")
+
+                if df_breach.empty:
+                    st.success("✅ Tidak ada saham yang melewati batas.")
+                else:
+                    st.dataframe(df_breach, use_container_width=True, hide_index=True)
+
+                    output_buffer_breach = BytesIO()
+                    df_breach.to_excel(output_buffer_breach, index=False)
+                    output_buffer_breach.seek(0)
+                    st.download_button(
+                        label="⬇️ Unduh Daftar Saham Lewat Batas",
+                        data=output_buffer_breach,
+                        file_name=f"monitor_cl_{datetime.now().strftime('%Y%m%d')}.xlsx",
+                        mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+                    )
+
+            except Exception as e:
+                st.error(f"❌ Gagal menjalankan monitor harian. Error: {e}")
+        else:
+            st.info("💡 Upload file basis dan closing price harian untuk menjalankan monitor.")
+
+    with tab5:
+        st.markdown("Hitung banyak file sumber sekaligus (misal 12 file `HCCL_<bulan>.xlsx` untuk review akhir tahun). "
+                    "Periode dibaca dari nama file; tiap file dihitung paralel di proses terpisah.")
+
+        uploaded_batch = st.file_uploader(
+            "📂 Unggah File Sumber per Periode (XLSX, atau satu .zip)",
+            type=['xlsx', 'zip'], accept_multiple_files=True, key='cl_batch_files'
+        )
+
+        if uploaded_batch and st.button("🚀 Jalankan Batch", type="primary", key='run_cl_batch'):
+            files, skipped = group_cl_inputs([(f.name, f.getvalue()) for f in uploaded_batch])
+            for name, reason in skipped:
+                st.warning(f"Skip {name}: {reason}")
+            if not files:
+                st.error("Tidak ada file dengan periode yang dikenali.")
+            else:
+                with st.spinner(f"Menghitung CL untuk {len(files)} periode..."):
+                    results, df_timing = run_cl_batch(files, st.session_state['override_mapping'])
+                    df_summary = cl_cross_period_summary(results)
+
+                st.success(f"✅ Batch selesai: {len(results)} dari {len(files)} periode.")
+                st.dataframe(df_timing, use_container_width=True, hide_index=True)
+                st.subheader("Ringkasan CL & Haircut per Saham")
+                st.dataframe(df_summary, use_container_width=True, hide_index=True)
+
+                try:
+                    with st.spinner("Menyusun workbook..."):
+                        batch_xlsx = write_cl_batch_workbook(results, df_summary, df_timing)
+                except Exception as e:
+                    st.error(f"❌ Gagal menyusun workbook batch. Error: {e}")
+                else:
+                    periods = list(files)
+                    st.download_button(
+                        label="⬇️ Unduh Hasil Batch (Excel)",
+                        data=batch_xlsx,
+                        file_name=f"Hasil Batch HCCL_{periods[0]}-{periods[-1]}.xlsx",
+                        mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+                    )
+
+    with tab6:
+        st.markdown("Bandingkan nilai kolateral aktual per saham (Stock Position Detail) dengan CL USULAN RMCC "
+                    "dan urutkan saham yang paling dekat ke batas. Bisa dijalankan ulang setiap ada file posisi baru.")
+
+        source_memory = "Hasil Tab 1 (di memori)"
+        source_options = ([source_memory] if 'cl_utilization' in st.session_state else []) + ["Unggah file hasil"]
+        util_source = st.radio("Sumber CL", source_options, horizontal=True, key='cl_util_source')
+
+        col1, col2 = st.columns(2)
+        with col1:
+            if util_source == source_memory:
+                uploaded_util_hasil = None
+                st.caption(f"{len(st.session_state['cl_utilization'].kode)} saham CL dari hasil Tab 1.")
+            else:
+                uploaded_util_hasil = st.file_uploader(
+                    "📂 Unggah Hasil Perhitungan CL (dari Tab 1)",
+                    type=['xlsx'], key='cl_util_hasil'
+                )
+        with col2:
+            uploaded_sp = st.file_uploader(
+                "📋 Unggah Stock Position Detail (XLSX)",
+                type=['xlsx'], key='cl_util_sp'
+            )
+        warn_pct = st.slider("Batas waspada utilisasi (%)", 50, 100, 80, step=5, key='cl_util_warn')
+
+        cl_ready = util_source == source_memory or uploaded_util_hasil is not None
+        if cl_ready and uploaded_sp is not None:
+            try:
+                if util_source == source_memory:
+                    utilization = st.session_state['cl_utilization']
+                else:
+                    utilization = _load_cl_utilization(uploaded_util_hasil.getvalue())
+
+                df_sp = pd.read_excel(uploaded_sp, engine='openpyxl')
+                df_util, info = utilization.check(df_sp, warn=warn_pct / 100)
+
+                m1, m2, m3 = st.columns(3)
+                m1.metric("Saham Terekspos", info['saham_terekspos'])
+                m2.metric("Lewat CL", info['lewat'])
+                m3.metric("Waspada", info['waspada'])
+                st.caption(f"Nilai kolateral: {info['sumber_nilai']} · {info['baris_posisi']} baris posisi.")
+                if info['kode_tidak_dikenal']:
+                    st.caption(f"{info['kode_tidak_dikenal']} kode di file posisi tidak ada di hasil CL "
+                               f"(nilai {info['nilai_tidak_dikenal']:,.0f} diabaikan).")
+
+                st.dataframe(df_util, use_container_width=True, hide_index=True)
+
+                output_buffer_util = BytesIO()
+                df_util.to_excel(output_buffer_util, index=False)
+                output_buffer_util.seek(0)
+                st.download_button(
+                    label="⬇️ Unduh Utilisasi CL",
+                    data=output_buffer_util,
+                    file_name=f"utilisasi_cl_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
+                    mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+                )
+
+            except Exception as e:
+                st.error(f"❌ Gagal menghitung utilisasi CL. Error: {e}")
+        else:
+            st.info("💡 Siapkan hasil CL dan Stock Position Detail untuk menghitung utilisasi.")
+
+    with tab7:
+        st.markdown("Bandingkan HAIRCUT PEI USULAN DIVISI dengan publikasi haircut KPEI. Publikasi KPEI cukup "
+                    "disimpan sekali per bulan; rekonsiliasi berikutnya di bulan yang sama memakai data tersimpan.")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            uploaded_kpei = st.file_uploader(
+                "📥 Unggah Publikasi Haircut KPEI (XLSX/CSV)",
+                type=['xlsx', 'csv'], key='hc_recon_kpei'
+            )
+        with col2:
+            kpei_period = st.text_input("Periode publikasi (YYYY-MM)", datetime.now().strftime('%Y-%m'),
+                                        key='hc_recon_period')
+        if uploaded_kpei is not None and st.button("💾 Simpan Publikasi KPEI", key='hc_recon_save'):
+            try:
+                df_kpei_new = read_kpei_publication(uploaded_kpei, uploaded_kpei.name)
+                n_saved = save_kpei_publication(df_kpei_new, kpei_period.strip())
+                st.success(f"✅ {n_saved} haircut KPEI periode {kpei_period.strip()} disimpan.")
+            except Exception as e:
+                st.error(f"❌ Gagal membaca publikasi KPEI. Error: {e}")
+
+        kpei_store = load_kpei_store()
+        if not kpei_store:
+            st.info("💡 Belum ada publikasi KPEI tersimpan. Unggah dan simpan publikasi bulan ini.")
+            return
+        periods = sorted(kpei_store, reverse=True)
+        recon_period = st.selectbox("Publikasi KPEI tersimpan", periods, key='hc_recon_use_period')
+
+        source_memory = "Hasil Tab 1 (di memori)"
+        source_options = ([source_memory] if 'cl_hasil_df' in st.session_state else []) + ["Unggah file hasil"]
+        recon_source = st.radio("Sumber haircut PEI", source_options, horizontal=True, key='hc_recon_source')
+        if recon_source == source_memory:
+            df_recon_hasil = st.session_state['cl_hasil_df']
+        else:
+            uploaded_recon_hasil = st.file_uploader(
+                "📂 Unggah Hasil Perhitungan CL (dari Tab 1)",
+                type=['xlsx'], key='hc_recon_hasil'
+            )
+            df_recon_hasil = (
+                _read_cl_hasil(uploaded_recon_hasil.getvalue()) if uploaded_recon_hasil is not None else None
+            )
+
+        if df_recon_hasil is None:
+            st.info("💡 Siapkan hasil CL untuk direkonsiliasi.")
+            return
+        try:
+            df_recon, df_recon_summary = reconcile_haircut(df_recon_hasil, kpei_store[recon_period])
+
+            st.dataframe(df_recon_summary, hide_index=True)
+            kategori = st.multiselect(
+                "Tampilkan kategori", df_recon_summary[COL_KATEGORI].tolist(),
+                default=[k for k, n in df_recon_summary.itertuples(index=False) if n and k != KATEGORI_SAMA],
+                key='hc_recon_filter'
+            )
+            st.dataframe(df_recon[df_recon[COL_KATEGORI].isin(kategori)], use_container_width=True, hide_index=True)
+
+            output_buffer_recon = BytesIO()
+            with pd.ExcelWriter(output_buffer_recon, engine='openpyxl') as writer:
+                df_recon_summary.to_excel(writer, sheet_name='Ringkasan', index=False)
+                df_recon.to_excel(writer, sheet_name='Rekonsiliasi', index=False)
+            output_buffer_recon.seek(0)
+            st.download_button(
+                label="⬇️ Unduh Rekonsiliasi Haircut",
+                data=output_buffer_recon,
+                file_name=f"rekonsiliasi_haircut_{recon_period}.xlsx",
+                mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+        except Exception as e:
+            st.error(f"❌ Gagal merekonsiliasi haircut. Error: {e}")
+
 if __name__ == '__main__':
     main()
@@ -1,3 +1,5 @@
+import hashlib
+
 import streamlit as st
 import pandas as pd
 import numpy as np
@@ -96,6 +98,49 @@ START_ROW_EXCEL = 11
 def clean_key_extreme(series):
     return series.astype(str).str.strip().str.upper().replace(r'[^A-Z0-9]', '', regex=True)
 
+# ============================
+# BACA FILE (SEKALI PER ISI FILE)
+# ============================
+def read_repo_template(repo_bytes):
+    """
+    Satu kali load_workbook -> (workbook, sheet aktif, df baris data). Header di baris
+    HEADER_ROW_INDEX + 1 Excel; index df = nomor baris Excel, jadi hasil ditulis balik
+    ke baris asalnya.
+    """
+    wb = load_workbook(BytesIO(repo_bytes))
+    sheet = wb.active
+    rows = sheet.iter_rows(min_row=HEADER_ROW_INDEX + 1, values_only=True)
+    header = next(rows, ())
+    columns = [
+        str(h).replace('\n', ' ').strip() if h is not None else f'Unnamed: {i}'
+        for i, h in enumerate(header)
+    ]
+    df = pd.DataFrame(list(rows), columns=columns)
+    df.index = START_ROW_EXCEL + np.arange(len(df))
+    return wb, sheet, df[df['No'].notna()]
+
+
+def read_phei(phei_bytes, filename):
+    if filename.endswith('.csv'):
+        df_phei = pd.read_csv(BytesIO(phei_bytes), encoding='latin1')
+    else:
+        df_phei = pd.read_excel(BytesIO(phei_bytes))
+    df_phei.columns = df_phei.columns.str.strip()
+    return df_phei
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def cached_parse(state_key, digest, data, parse, *args):
+    """Hasil parse disimpan di session_state per hash isi file; rerun widget tidak parse ulang."""
+    cached = st.session_state.get(state_key)
+    if cached is None or cached[0] != digest:
+        cached = (digest, parse(data, *args))
+        st.session_state[state_key] = cached
+    return cached[1]
+
 # ============================
 # FUNGSI PENGOLAHAN DATA UTAMA
 # ============================
@@ -113,6 +158,8 @@ def process_repo_data(df_repo_main, df_phei_lookup):
         right_on=PHEI_KEY_COL,
         how='left'
     )
+    # left join ke PHEI yang sudah unik -> urutan & jumlah baris sama, nomor baris Excel dipertahankan
+    df_merged.index = df_repo_main.index
 
     if PHEI_VALUE_COL in df_merged.columns:
         df_merged['Fair Price PHEI'] = pd.to_numeric(df_merged[PHEI_VALUE_COL], errors='coerce')
@@ -143,40 +190,40 @@ def main():
     if repo_file_upload and phei_lookup_file:
         try:
             repo_bytes = repo_file_upload.getvalue()
-            df_repo_raw = pd.read_excel(BytesIO(repo_bytes), header=HEADER_ROW_INDEX)
-            df_repo_raw.columns = df_repo_raw.columns.str.replace('\n', ' ').str.strip()
-            df_data_only = df_repo_raw[df_repo_raw['No'].notna()].copy()
-
-            if phei_lookup_file.name.endswith('.csv'):
-                df_phei = pd.read_csv(phei_lookup_file, encoding='latin1')
-            else:
-                df_phei = pd.read_excel(phei_lookup_file)
-            df_phei.columns = df_phei.columns.str.strip()
+            phei_bytes = phei_lookup_file.getvalue()
+            upload_hashes = (content_hash(repo_bytes), content_hash(phei_bytes))
 
             if st.button("▶ Jalankan Proses Update"):
-                df_result = process_repo_data(df_data_only, df_phei)
-
-                wb = load_workbook(BytesIO(repo_bytes))
-                sheet = wb.active
+                wb, sheet, df_data_only = cached_parse(
+                    'repo_template', upload_hashes[0], repo_bytes, read_repo_template
+                )
+                df_phei = cached_parse(
+                    'repo_phei', upload_hashes[1], phei_bytes, read_phei, phei_lookup_file.name
+                )
+                df_result = process_repo_data(df_data_only.copy(), df_phei.copy())
 
                 try:
-                    fair_price_col_idx = df_repo_raw.columns.get_loc('Fair Price PHEI') + 1
-                except KeyError:
+                    fair_price_col_idx = list(df_data_only.columns).index('Fair Price PHEI') + 1
+                except ValueError:
                     st.error("Kolom 'Fair Price PHEI' tidak ditemukan di template!")
                     return
 
                 today_date = datetime.now().strftime('%d %b %Y')
                 date_text = f"Daily As of Date : {today_date} - {today_date}"
-                sheet.cell(row=2, column=1, value=date_text)
+                sheet.cell(row=2, column=1).value = date_text
 
-                for i, val in enumerate(df_result['Fair Price PHEI']):
-                    current_row = START_ROW_EXCEL + i
-                    final_val = val if pd.notna(val) else None
-                    sheet.cell(row=current_row, column=fair_price_col_idx, value=final_val)
+                # .value langsung (bukan cell(value=None)) supaya harga lama yang kini kosong ikut terhapus
+                for current_row, val in zip(df_result.index, df_result['Fair Price PHEI']):
+                    sheet.cell(row=current_row, column=fair_price_col_idx).value = val if pd.notna(val) else None
 
                 output_buffer = BytesIO()
                 wb.save(output_buffer)
+                st.session_state['repo_result'] = (upload_hashes, df_result, output_buffer.getvalue())
 
+            # hasil terakhir tetap tampil saat rerun (mis. klik unduh) selama file upload sama
+            repo_result = st.session_state.get('repo_result')
+            if repo_result is not None and repo_result[0] == upload_hashes:
+                _, df_result, output_bytes = repo_result
                 st.success(f"✅ Berhasil memproses {len(df_result)} baris data.")
 
                 # Card: Preview
@@ -191,7 +238,7 @@ def main():
                 st.markdown('<div class="card"><div class="card-title">Unduh Hasil</div>', unsafe_allow_html=True)
                 st.download_button(
                     label="⬇ Unduh File Update",
-                    data=output_buffer.getvalue(),
+                    data=output_bytes,
                     file_name=f"Reverse Repo Bonds Daily Position {datetime.now().strftime('%Y%m%d')}.xlsx",
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                     use_container_width=True,
@@ -10,6 +10,8 @@ import tempfile
 from openpyxl import load_workbook
 import openpyxl
 
+from stock_master import sync_index_membership
+
 warnings.simplefilter(action="ignore", category=FutureWarning)
 
 # ─────────────────────────────────────────
@@ -533,10 +535,6 @@ with tab3:
                 df = pd.read_excel(t3_stock)
                 df.columns = [str(c).strip() for c in df.columns]
 
-                col_index = next(
-                    (c for c in ['Index','Indeks'] if c in df.columns),
-                    df.columns[7]
-                )
                 col_value = next(
                     (c for c in df.columns if 'Collateral' in str(c)), None
                 )
@@ -548,6 +546,27 @@ with tab3:
 
                 df = df[~df.iloc[:,0].astype(str).str.contains('Total', case=False, na=False)]
 
+                # Index membership: kolom Index/Indeks memperbarui stock master;
+                # kalau kolomnya tidak ada, diambil dari stock master
+                col_stock = next(
+                    (c for c in ['Stock Code','Kode Saham'] if c in df.columns),
+                    df.columns[1]
+                )
+                file_index = next(
+                    (c for c in ['Index','Indeks'] if c in df.columns), None
+                )
+                df, col_index, n_master = sync_index_membership(df, col_stock, file_index)
+                if n_master:
+                    logs.append(log_line(f"Stock master diperbarui: {n_master} saham", "info"))
+                if file_index is None:
+                    # saham yang tidak ada di stock master diisi per baris dari kolom ke-8
+                    n_missing = int(df[col_index].isna().sum())
+                    if n_missing:
+                        df[col_index] = df[col_index].where(df[col_index].notna(), df[df.columns[7]])
+                        logs.append(log_line(
+                            f"Index {n_missing} baris tidak ada di stock master, pakai kolom ke-8", "warn"
+                        ))
+
                 def label_group(val):
                     val = str(val).strip()
                     if val == "IHSG,IDX80,LQ45": return "LQ45"
@@ -0,0 +1,220 @@
+"""
+stock_master.py
+------------------
+Stock master lokal: data referensi per saham di satu tempat (stock_master.csv).
+
+Kolom: Stock Code, Stock Name, Listed Shares, Free Float Shares, Closing Price,
+Index Membership, Updated.
+
+- Dimuat SEKALI per proses server (cache per path + mtime file); index-nya
+  CategoricalIndex kode saham, jadi join dari halaman mana pun cukup get_indexer.
+- Tiap upload yang membawa kolom referensi (sumber HCCL, Instrument, Stock Position
+  Detail) meng-upsert master; file hanya ditulis ulang kalau ada nilai yang berubah.
+- Kolom/sel referensi yang kosong di upload diisi dari master (attach_reference),
+  jadi halaman tidak perlu mem-parse ulang kolom yang sama dari setiap upload.
+  Untuk sumber HCCL pengisian ini opt-in (fill_from_master) karena nilai master bisa
+  basi dan langsung mengubah hasil CL; sel yang diisi dikembalikan untuk ditampilkan.
+
+Frame hasil load_stock_master dipakai bersama antar halaman -- jangan diubah in-place.
+"""
+
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+STOCK_MASTER_FILE = 'stock_master.csv'
+
+COL_CODE = 'Stock Code'
+COL_NAME = 'Stock Name'
+COL_LISTED_SHARES = 'Listed Shares'
+COL_FREE_FLOAT = 'Free Float Shares'
+COL_CLOSING_PRICE = 'Closing Price'
+COL_INDEX_MEMBERSHIP = 'Index Membership'
+COL_UPDATED = 'Updated'
+
+MASTER_COLUMNS = [
+    COL_CODE, COL_NAME, COL_LISTED_SHARES, COL_FREE_FLOAT, COL_CLOSING_PRICE,
+    COL_INDEX_MEMBERSHIP, COL_UPDATED,
+]
+NUMERIC_COLUMNS = [COL_LISTED_SHARES, COL_FREE_FLOAT, COL_CLOSING_PRICE]
+REFERENCE_COLUMNS = [COL_NAME, *NUMERIC_COLUMNS, COL_INDEX_MEMBERSHIP]
+
+# Kolom upload -> kolom master per jenis sumber
+HCCL_KEY = 'KODE EFEK'
+HCCL_REFERENCE = {
+    'LISTED SHARES': COL_LISTED_SHARES,
+    'FREE FLOAT (DALAM LEMBAR)': COL_FREE_FLOAT,
+    'CLOSING PRICE': COL_CLOSING_PRICE,
+}
+INSTRUMENT_REFERENCE = {'Stock Name': COL_NAME}
+
+
+def normalise_codes(codes):
+    """Kode saham: str, tanpa spasi, huruf besar (NaN tetap NaN)."""
+    codes = pd.Series(codes, dtype=object)
+    return codes.where(codes.isna(), codes.astype(str).str.strip().str.upper())
+
+
+def normalise_text(values):
+    """Teks referensi: strip, string kosong -> NaN."""
+    values = pd.Series(values, dtype=object)
+    text = values.where(values.isna(), values.astype(str).str.strip())
+    return text.where(text != '', np.nan)
+
+
+# ─────────────────────────────────────────────
+# BACA (CACHE PER PROSES)
+# ─────────────────────────────────────────────
+def _empty_master():
+    df = pd.DataFrame(columns=MASTER_COLUMNS[1:])
+    df.index = pd.CategoricalIndex([], name=COL_CODE)
+    return df
+
+
+@lru_cache(maxsize=4)
+def _read_stock_master(path, mtime):
+    # mtime ikut jadi key cache -> CSV dibaca ulang hanya kalau file berubah
+    if not mtime:
+        return _empty_master()
+    df = pd.read_csv(
+        path, dtype={COL_CODE: str, COL_NAME: str, COL_INDEX_MEMBERSHIP: str}, float_precision='round_trip'
+    )
+    df = df.reindex(columns=MASTER_COLUMNS)
+    df[COL_CODE] = normalise_codes(df[COL_CODE])
+    df = df.dropna(subset=[COL_CODE]).drop_duplicates(COL_CODE, keep='last')
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    df[COL_INDEX_MEMBERSHIP] = df[COL_INDEX_MEMBERSHIP].astype('category')
+    df[COL_UPDATED] = pd.to_datetime(df[COL_UPDATED], errors='coerce')
+
+    codes = df.pop(COL_CODE)
+    df.index = pd.CategoricalIndex(codes, categories=np.sort(codes.unique()), name=COL_CODE)
+    return df.sort_index()
+
+
+def load_stock_master(path=STOCK_MASTER_FILE):
+    """Master ber-index CategoricalIndex 'Stock Code' (frame kosong kalau file belum ada)."""
+    mtime = os.path.getmtime(path) if os.path.exists(path) else 0
+    return _read_stock_master(os.path.abspath(path), mtime)
+
+
+# ─────────────────────────────────────────────
+# JOIN KE UPLOAD
+# ─────────────────────────────────────────────
+def attach_reference(df, key_col, column_map, path=STOCK_MASTER_FILE):
+    """
+    Salinan df dengan kolom referensi diisi dari master.
+
+    column_map : {kolom df: kolom master}. Kolom yang tidak ada di df ditambahkan;
+                 kolom yang ada hanya sel kosongnya yang diisi (nilai upload menang).
+    """
+    master = load_stock_master(path)
+    df = df.copy()
+    pos = master.index.get_indexer(normalise_codes(df[key_col]))
+    found = pos >= 0
+    for df_col, master_col in column_map.items():
+        values = pd.Series(np.nan, index=df.index, dtype=object)
+        values[found] = master[master_col].astype(object).to_numpy()[pos[found]]
+        if master_col in NUMERIC_COLUMNS:
+            values = pd.to_numeric(values, errors='coerce')
+        df[df_col] = values if df_col not in df.columns else df[df_col].where(df[df_col].notna(), values)
+    return df
+
+
+# ─────────────────────────────────────────────
+# UPSERT DARI UPLOAD
+# ─────────────────────────────────────────────
+def _same(a, b):
+    a, b = a.astype(object), b.astype(object)
+    return (a == b) | (a.isna() & b.isna())
+
+
+def update_stock_master(df, key_col, column_map, path=STOCK_MASTER_FILE, as_of=None):
+    """
+    Upsert kolom referensi upload ke master. Nilai kosong di upload tidak menimpa master.
+    CSV hanya ditulis ulang kalau ada baris yang berubah. Return jumlah saham yang berubah.
+    """
+    column_map = {k: v for k, v in column_map.items() if k in df.columns}
+    if not column_map:
+        return 0
+
+    updates = df[[key_col, *column_map]].rename(columns={key_col: COL_CODE, **column_map})
+    updates[COL_CODE] = normalise_codes(updates[COL_CODE])
+    updates = updates.dropna(subset=[COL_CODE]).drop_duplicates(COL_CODE, keep='last').set_index(COL_CODE)
+    for col in updates.columns.intersection(NUMERIC_COLUMNS):
+        updates[col] = pd.to_numeric(updates[col], errors='coerce')
+    for col in updates.columns.difference(NUMERIC_COLUMNS):
+        updates[col] = normalise_text(updates[col])
+
+    current = load_stock_master(path)
+    current = current.set_axis(current.index.astype(str), axis=0).astype({COL_INDEX_MEMBERSHIP: object})
+    merged = updates.combine_first(current).reindex(columns=MASTER_COLUMNS[1:])
+
+    before = current.reindex(merged.index)
+    changed = ~np.logical_and.reduce([_same(merged[c], before[c]).to_numpy() for c in updates.columns])
+    if not changed.any():
+        return 0
+
+    merged.loc[changed, COL_UPDATED] = pd.Timestamp(as_of or pd.Timestamp.now()).normalize()
+    # kolom object (campuran Timestamp/NaN) tidak kena date_format -> jadikan datetime dulu
+    merged[COL_UPDATED] = pd.to_datetime(merged[COL_UPDATED], errors='coerce')
+    merged.index.name = COL_CODE
+    tmp_path = f'{path}.tmp'
+    merged.sort_index().to_csv(tmp_path, date_format='%Y-%m-%d')
+    os.replace(tmp_path, path)
+    return int(changed.sum())
+
+
+# ─────────────────────────────────────────────
+# SUMBER SPESIFIK
+# ─────────────────────────────────────────────
+def filled_reference_cells(df_before, df_after, key_col, column_map, path=STOCK_MASTER_FILE):
+    """
+    Baris yang sel referensinya diisi dari master oleh attach_reference:
+    [key_col, kolom yang terisi (sel lain NaN), Updated master].
+    """
+    cols = list(column_map)
+    filled = df_before.reindex(columns=cols).isna().to_numpy() & df_after[cols].notna().to_numpy()
+    rows = filled.any(axis=1)
+    out = df_after.loc[rows, [key_col, *cols]].copy()
+    out[cols] = out[cols].where(filled[rows])
+    master = load_stock_master(path)
+    pos = master.index.get_indexer(normalise_codes(out[key_col]))
+    out[COL_UPDATED] = master[COL_UPDATED].to_numpy()[pos]
+    return out.reset_index(drop=True)
+
+
+def sync_cl_source(df_cl_source, path=STOCK_MASTER_FILE, fill_from_master=False):
+    """
+    Sumber HCCL: perbarui master dari LISTED SHARES / FREE FLOAT / CLOSING PRICE.
+    fill_from_master=True -> kolom tersebut yang kosong/tidak ada diisi dari master.
+
+    Return (df, jumlah berubah, df_filled); df_filled = sel yang diisi dari master
+    (filled_reference_cells), kosong kalau tidak ada / fill_from_master=False.
+    """
+    key_col = HCCL_KEY if HCCL_KEY in df_cl_source.columns else df_cl_source.columns[0]
+    n_changed = update_stock_master(df_cl_source, key_col, HCCL_REFERENCE, path)
+    if not fill_from_master:
+        df_filled = pd.DataFrame(columns=[key_col, *HCCL_REFERENCE, COL_UPDATED])
+        return df_cl_source, n_changed, df_filled
+    df = attach_reference(df_cl_source, key_col, HCCL_REFERENCE, path)
+    return df, n_changed, filled_reference_cells(df_cl_source, df, key_col, HCCL_REFERENCE, path)
+
+
+def sync_instrument_names(df_inst_lookup, path=STOCK_MASTER_FILE):
+    """Lookup [Stock Code, Stock Name] dari Instrument: perbarui master, isi nama kosong dari master."""
+    n_changed = update_stock_master(df_inst_lookup, COL_CODE, INSTRUMENT_REFERENCE, path)
+    return attach_reference(df_inst_lookup, COL_CODE, INSTRUMENT_REFERENCE, path), n_changed
+
+
+def sync_index_membership(df, key_col, index_col=None, path=STOCK_MASTER_FILE):
+    """
+    Stock Position Detail: kalau ada kolom Index/Indeks (index_col) -> perbarui master;
+    kalau tidak ada -> kolom 'Index' diisi dari master. Return (df, index_col, jumlah berubah).
+    """
+    if index_col is not None:
+        n_changed = update_stock_master(df, key_col, {index_col: COL_INDEX_MEMBERSHIP}, path)
+        return df, index_col, n_changed
+    return attach_reference(df, key_col, {'Index': COL_INDEX_MEMBERSHIP}, path), 'Index', 0
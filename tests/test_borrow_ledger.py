@@ -0,0 +1,73 @@
+import pandas as pd
+
+from borrow_ledger import (
+    COL_KODE_DI_LL, CONTRACT_COLUMNS, DECISION_APPROVED, DECISION_PARTIAL, DECISION_REJECTED,
+    RETURN_COLUMNS, BorrowLedger, allocate_pending_requests, normalise_contracts,
+)
+
+
+def _write(path, columns, rows, mode='w'):
+    df = pd.DataFrame(rows, columns=columns)
+    df.to_csv(path, mode=mode, header=mode == 'w', index=False)
+
+
+def _book(ledger):
+    return ledger.borrow_position().set_index('Stock Code')['Borrow Position'].sort_index().to_dict()
+
+
+def test_sync_applies_only_appended_rows(tmp_path):
+    contracts, returns = tmp_path / 'c.csv', tmp_path / 'r.csv'
+    _write(contracts, CONTRACT_COLUMNS, [
+        ['2025-01-02', 'B1', 'aaaa ', 100, 50, '2025-02-02', 'APPROVED'],
+        ['2025-01-03', 'B2', 'BBBB', 200, 50, '2025-02-03', 'PENDING'],
+    ])
+    _write(returns, RETURN_COLUMNS, [['2025-01-02', 'B1', 'AAAA', 30, '2025-01-10']])
+    ledger = BorrowLedger.from_csv(contracts, returns)
+    assert _book(ledger) == {'AAAA': 70.0}
+
+    _write(contracts, CONTRACT_COLUMNS, [['2025-01-04', 'B2', 'BBBB', 400, 50, '2025-02-04', '']], mode='a')
+    _write(returns, RETURN_COLUMNS, [['2025-01-02', 'B1', 'AAAA', 70, '2025-01-11']], mode='a')
+    with open(contracts, 'a') as f:
+        f.write('2025-01-05,B3,CCCC,')          # baris belum selesai ditulis -> ditunda
+    assert ledger.sync(contracts, returns) == 2
+    assert _book(ledger) == {'BBBB': 400.0}
+
+    with open(contracts, 'a') as f:
+        f.write('10,50,2025-02-05,\n')
+    assert ledger.sync(contracts, returns) == 1
+    assert _book(ledger) == _book(BorrowLedger.from_csv(contracts, returns)) == {'BBBB': 400.0, 'CCCC': 10.0}
+    assert ledger.sync(contracts, returns) == 0
+
+
+def test_record_is_not_applied_twice(tmp_path):
+    contracts, returns = tmp_path / 'c.csv', tmp_path / 'r.csv'
+    ledger = BorrowLedger.from_csv(contracts, returns)
+    ledger.record_contract('2025-01-02', 'B1', 'AAAA', 100, 50, '2025-02-02', path=contracts)
+    _write(contracts, CONTRACT_COLUMNS, [['2025-01-03', 'B1', 'AAAA', 5, 50, '2025-02-03', '']], mode='a')
+    ledger.record_return('2025-01-02', 'B1', 'AAAA', 40, '2025-01-09', path=returns)
+    ledger.sync(contracts, returns)
+    assert _book(ledger) == _book(BorrowLedger.from_csv(contracts, returns)) == {'AAAA': 65.0}
+
+
+def test_rewritten_file_reloads(tmp_path):
+    contracts, returns = tmp_path / 'c.csv', tmp_path / 'r.csv'
+    _write(contracts, CONTRACT_COLUMNS, [['2025-01-02', 'B1', 'AAAA', 100, 50, '2025-02-02', '']] * 3)
+    ledger = BorrowLedger.from_csv(contracts, returns)
+    _write(contracts, CONTRACT_COLUMNS, [['2025-01-02', 'B1', 'AAAA', 100, 50, '2025-02-02', '']])
+    ledger.sync(contracts, returns)
+    assert _book(ledger) == {'AAAA': 100.0}
+
+
+def test_allocation_matches_codes_after_normalising_both_sides():
+    df_contracts = pd.DataFrame([
+        ['2025-01-02', 'B1', ' aaaa', 60, 50, '2025-02-02', 'PENDING'],
+        ['2025-01-03', 'B2', 'AAAA', 60, 50, '2025-02-03', 'PENDING'],
+        ['2025-01-03', 'B3', 'ZZZZ', 10, 50, '2025-02-03', 'PENDING'],
+    ], columns=CONTRACT_COLUMNS)
+    df_contracts = normalise_contracts(df_contracts)
+    available = pd.Series([100.0], index=['aaaa '])
+
+    df_alloc = allocate_pending_requests(df_contracts, available)
+    assert df_alloc['Decision'].tolist() == [DECISION_APPROVED, DECISION_PARTIAL, DECISION_REJECTED]
+    assert df_alloc['Approved Shares'].tolist() == [60.0, 40.0, 0.0]
+    assert df_alloc[COL_KODE_DI_LL].tolist() == [True, True, False]
@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+
+from cl_batch import write_cl_batch_workbook
+
+
+def test_workbook_writes_infinite_cl_as_text():
+    df = pd.DataFrame({
+        'KODE EFEK': ['AAAA', 'BBBB', 'CCCC'],
+        'CONCENTRATION LIMIT USULAN RMCC': [1e10, np.inf, np.nan],
+        'SELISIH': [0.0, -np.inf, 1.0],
+    })
+    out = write_cl_batch_workbook({'2025-01': df}, df, pd.DataFrame({'Periode': ['2025-01']}))
+
+    back = pd.read_excel(out, sheet_name='HCCL 2025-01')
+    for col in ['CONCENTRATION LIMIT USULAN RMCC', 'SELISIH']:
+        np.testing.assert_array_equal(pd.to_numeric(back[col]).to_numpy(), df[col].to_numpy())
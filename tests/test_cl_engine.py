@@ -0,0 +1,215 @@
+import io
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cl_engine import (
+    BINDING_LABELS, DEFAULT_OVERRIDE_MAPPING, attach_pertimbangan_text, binding_constraint,
+    calculate_concentration_limit, cl_stress_grid,
+)
+from cl_monitor import CLDailyMonitor, read_closing_prices
+
+COL_RMCC = 'CONCENTRATION LIMIT USULAN RMCC'
+COL_LISTED = 'CONCENTRATION LIMIT TERKENA % LISTED SHARES'
+COL_FF = 'CONCENTRATION LIMIT TERKENA % FREE FLOAT'
+COL_PERHITUNGAN = 'CONCENTRATION LIMIT SESUAI PERHITUNGAN'
+COL_MARJIN = 'CONCENTRATION LIMIT KARENA SAHAM MARJIN BARU'
+THRESHOLD_5M = 5_000_000_000
+
+
+# ─────────────────────────────────────────────
+# REFERENSI: jalur lama per baris (df.apply axis=1) dari halaman CL sebelum cl_engine
+# ─────────────────────────────────────────────
+def _ref_listed(row):
+    try:
+        if row['PERBANDINGAN DENGAN LISTED SHARES (Sesuai Perhitungan)'] >= 0.05:
+            return 0.0499 * row['LISTED SHARES'] * row['CLOSING PRICE']
+        return None
+    except Exception:
+        return None
+
+
+def _ref_ff(row):
+    try:
+        if row['PERBANDINGAN DENGAN FREE FLOAT (Sesuai Perhitungan)'] >= 0.20:
+            return 0.1999 * row['FREE FLOAT (DALAM LEMBAR)'] * row['CLOSING PRICE']
+        return None
+    except Exception:
+        return None
+
+
+def _ref_keterangan_uma(uma_date):
+    if pd.notna(uma_date):
+        if not isinstance(uma_date, datetime):
+            try:
+                uma_date = pd.to_datetime(str(uma_date))
+            except Exception:
+                return "Sesuai Metode Perhitungan"
+        return f"Sesuai Haircut KPEI, mempertimbangkan pengumuman UMA dari BEI tanggal {uma_date.strftime('%d %b %Y')}"
+    return "Sesuai Metode Perhitungan"
+
+
+def _reference_cl(df_cl_source, mapping):
+    df = df_cl_source.copy()
+    df['KODE EFEK'] = df['KODE EFEK'].astype(str).str.strip()
+    df['SAHAM MARJIN BARU?'] = df['SAHAM MARJIN BARU?'].astype(str).str.upper().str.strip()
+    df[COL_MARJIN] = np.where(df['SAHAM MARJIN BARU?'] == 'YA', df[COL_PERHITUNGAN] * 0.50, df[COL_PERHITUNGAN])
+    df[COL_LISTED] = df.apply(_ref_listed, axis=1)
+    df[COL_FF] = df.apply(_ref_ff, axis=1)
+
+    limit_cols = [COL_MARJIN, COL_LISTED, COL_FF, COL_PERHITUNGAN]
+    min_option = df[limit_cols].fillna(np.inf).min(axis=1)
+    pemicu_nol = np.logical_or.reduce([df[c].fillna(np.inf) < THRESHOLD_5M for c in limit_cols])
+    df[COL_RMCC] = np.where(pemicu_nol, 0.0, min_option)
+
+    def override(row):
+        if row['KODE EFEK'] in mapping:
+            return 0.0 if row[COL_RMCC] == 0.0 else min(row[COL_RMCC], mapping[row['KODE EFEK']])
+        return row[COL_RMCC]
+
+    not_zero = df[COL_RMCC] != 0.0
+    df.loc[not_zero, COL_RMCC] = df.loc[not_zero].apply(override, axis=1).round(0)
+
+    df['HAIRCUT KPEI'] = pd.to_numeric(df['HAIRCUT KPEI'], errors='coerce').fillna(0)
+    df['HAIRCUT PEI USULAN DIVISI'] = np.where(
+        (df['UMA'].fillna('-') != '-') & pd.notna(df['UMA']), df['HAIRCUT KPEI'], df['HAIRCUT PEI']
+    )
+    haircut = pd.to_numeric(df['HAIRCUT PEI USULAN DIVISI'], errors='coerce')
+    df['HAIRCUT PEI USULAN DIVISI'] = haircut
+    df[COL_PERHITUNGAN] = pd.to_numeric(df[COL_PERHITUNGAN], errors='coerce')
+    valid = haircut.dropna()
+    target = 100.0 if not valid.empty and valid.max() > 1 + 1e-6 else 1.0
+    df.loc[(haircut.sub(target).abs() < 1e-6) | (df[COL_PERHITUNGAN] < THRESHOLD_5M), COL_RMCC] = 0.0
+
+    asli = pd.to_numeric(df['HAIRCUT PEI USULAN DIVISI'], errors='coerce')
+    df.loc[df[COL_RMCC] == 0, 'HAIRCUT PEI USULAN DIVISI'] = 1.0
+
+    hc_text = df['UMA'].apply(_ref_keterangan_uma)
+    cl_text = pd.Series('Sesuai metode perhitungan', index=df.index)
+
+    emiten = df['KODE EFEK'].isin(list(mapping))
+    nol = (df[COL_RMCC] == 0) & ~emiten
+    lt5m = np.logical_or.reduce(
+        [df[c].fillna(np.inf) < THRESHOLD_5M for c in limit_cols + [COL_RMCC]]
+    ) & nol
+    hc100 = ((asli.sub(1.0).abs() < 1e-6) | (asli.sub(100.0).abs() < 1e-6)) & nol & ~lt5m
+    non_nol = df[COL_RMCC] != 0
+    cap = df['KODE EFEK'].map(mapping).fillna(np.inf)
+    emiten_override = non_nol & emiten & (df[COL_RMCC].round(0) == cap.round(0))
+    other = non_nol & ~emiten_override
+    listed_saja = other & (df[COL_RMCC].round(0) == df[COL_LISTED].round(0))
+    ff_saja = other & (df[COL_RMCC].round(0) == df[COL_FF].round(0)) & ~listed_saja
+    marjin = other & (df[COL_RMCC].round(0) == df[COL_MARJIN].round(0)) & \
+        (df['SAHAM MARJIN BARU?'] == 'YA') & ~listed_saja & ~ff_saja
+    ganda = (listed_saja | ff_saja) & df[COL_LISTED].notna() & df[COL_FF].notna()
+
+    cl_text[lt5m] = 'Penyesuaian karena Batas Konsentrasi < Rp5 Miliar'
+    hc_text[lt5m] = 'Penyesuaian karena Batas Konsentrasi 0'
+    cl_text[hc100] = 'Penyesuaian karena Haircut PEI 100%'
+    cl_text[emiten & nol] = 'Penyesuaian karena profil emiten'
+    cl_text[emiten_override] = 'Penyesuaian karena profil emiten'
+    cl_text[marjin] = 'Penyesuaian karena saham baru masuk marjin'
+    cl_text[listed_saja] = 'Penyesuaian karena melebihi 5% listed shares'
+    cl_text[ff_saja] = 'Penyesuaian karena melebihi 20% free float'
+    cl_text[ganda] = 'Penyesuaian karena melebihi 5% listed & 20% free float'
+    return df, hc_text, cl_text
+
+
+def _source(n, seed):
+    rng = np.random.default_rng(seed)
+    codes = np.array([f'K{i:04d}' for i in range(n)], dtype=object)
+    codes[:6] = ['LPKR', 'MLPL', 'NOBU', 'PTPP', 'SILO', ' LPCK ']
+    listed = rng.integers(1e8, 5e10, n).astype(float)
+    uma = np.where(rng.random(n) < 0.1, pd.Timestamp('2026-09-10'), None).astype(object)
+    uma[rng.random(n) < 0.3] = '-'
+    uma[rng.random(n) < 0.05] = '2026-08-03'
+    # angka dari Excel: yyyymmdd terbaca tanggal, serial Excel tidak (sama dengan jalur lama)
+    uma[rng.random(n) < 0.05] = 20250304
+    uma[rng.random(n) < 0.05] = 45720
+    df = pd.DataFrame({
+        'KODE EFEK': codes,
+        'SAHAM MARJIN BARU?': rng.choice(['YA', 'TIDAK', 'ya '], n),
+        'LISTED SHARES': listed,
+        'FREE FLOAT (DALAM LEMBAR)': listed * rng.uniform(0.05, 0.9, n),
+        'CLOSING PRICE': rng.choice([50, 100, 500, 1000, 5000], n).astype(float),
+        'PERBANDINGAN DENGAN LISTED SHARES (Sesuai Perhitungan)': rng.choice([0.01, 0.05, 0.08, np.nan], n),
+        'PERBANDINGAN DENGAN FREE FLOAT (Sesuai Perhitungan)': rng.choice([0.1, 0.2, 0.35], n),
+        COL_PERHITUNGAN: rng.lognormal(23, 2, n),
+        'HAIRCUT KPEI': rng.choice([0.3, 0.5, 1.0], n),
+        'HAIRCUT PEI': rng.choice([0.3, 0.5, 1.0, 0.6], n),
+        'UMA': uma,
+    })
+    df.loc[0, COL_PERHITUNGAN] = 60_000_000_000     # LPKR di atas cap 10M -> cap emiten terpicu
+    # semua opsi limit NaN -> RMCC inf, jalur lama dan baru harus sama
+    df.loc[7, [COL_PERHITUNGAN, 'PERBANDINGAN DENGAN LISTED SHARES (Sesuai Perhitungan)']] = np.nan
+    df.loc[7, 'PERBANDINGAN DENGAN FREE FLOAT (Sesuai Perhitungan)'] = 0.1
+    return df
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+@pytest.mark.parametrize('mapping', [None, {'LPKR': 10_000_000_000, 'PTPP': 50_000_000_000}])
+def test_matches_row_wise_reference(seed, mapping):
+    df_source = _source(2000, seed)
+    ref_mapping = DEFAULT_OVERRIDE_MAPPING if mapping is None else mapping
+    ref, ref_hc_text, ref_cl_text = _reference_cl(df_source, ref_mapping)
+    got = attach_pertimbangan_text(calculate_concentration_limit(df_source, mapping))
+
+    for col in [COL_MARJIN, COL_LISTED, COL_FF, COL_RMCC, 'HAIRCUT PEI USULAN DIVISI']:
+        np.testing.assert_array_equal(
+            pd.to_numeric(got[col]).to_numpy(dtype=float), pd.to_numeric(ref[col]).to_numpy(dtype=float), err_msg=col
+        )
+    assert got['PERTIMBANGAN DIVISI (HAIRCUT)'].tolist() == ref_hc_text.tolist()
+    assert got['PERTIMBANGAN DIVISI (CONC LIMIT)'].tolist() == ref_cl_text.tolist()
+
+
+def test_stress_grid_and_monitor_share_price_model():
+    df_source = _source(500, 3)
+    # rasio di bawah batas yang baru kena kriteria setelah harga turun 30%
+    df_source['PERBANDINGAN DENGAN LISTED SHARES (Sesuai Perhitungan)'] = np.resize([0.01, 0.04, 0.08], 500)
+    df_source['PERBANDINGAN DENGAN FREE FLOAT (Sesuai Perhitungan)'] = np.resize([0.1, 0.16, 0.35, 0.16], 500)
+    _, df_cl, df_binding = cl_stress_grid(df_source, shocks=(-0.3,))
+    monitor = CLDailyMonitor(df_source)
+
+    day = monitor._evaluate(monitor.price * 0.7)
+    np.testing.assert_array_equal(df_cl['-30%'].to_numpy(), day['cl'])
+    assert df_binding['-30%'].tolist() == list(np.asarray(BINDING_LABELS)[day['binding']])
+
+
+def test_all_nan_options_have_no_binding_constraint():
+    df_source = _source(20, 4)
+    df_source['KODE EFEK'] = [f'X{i}' for i in range(20)]
+    df_source.loc[7, 'HAIRCUT PEI'] = 0.3
+
+    _, df_cl, df_binding = cl_stress_grid(df_source, shocks=())
+    assert np.isinf(df_cl.loc[7, 'Harga Saat Ini'])
+    assert df_binding.loc[7, 'Harga Saat Ini'] == 'TANPA KENDALA'
+
+    result = calculate_concentration_limit(df_source)
+    assert np.isinf(result.loc[7, COL_RMCC])
+    assert binding_constraint(result)[7] == 'TANPA KENDALA'
+    assert (binding_constraint(result).drop(7) != 'TANPA KENDALA').all()
+
+
+def test_monitor_matches_codes_case_insensitively():
+    df_source = _source(50, 7)
+    df_source.loc[10, 'KODE EFEK'] = ' abcd'
+    monitor = CLDailyMonitor(df_source)
+    prices = pd.DataFrame({'KODE EFEK': ['ABCD', 'k0011 '], 'CLOSING PRICE': [1.0, 1.0]})
+    _, info = monitor.check(read_closing_prices(io.StringIO(prices.to_csv(index=False)), 'harga.csv'))
+    assert info['harga_cocok'] == 2 and info['kode_tidak_dikenal'] == 0
+
+
+def test_binding_tie_with_emiten_cap_is_emiten_everywhere():
+    df_source = _source(500, 8)
+    # LPKR: limit % listed persis sama dengan cap 10M
+    df_source.loc[0, ['PERBANDINGAN DENGAN LISTED SHARES (Sesuai Perhitungan)', 'CLOSING PRICE']] = [0.08, 1000.0]
+    df_source.loc[0, 'LISTED SHARES'] = 10_000_000_000 / (0.0499 * 1000.0)
+    df_source.loc[0, 'HAIRCUT PEI'] = 0.3
+    df_source.loc[0, 'UMA'] = '-'
+
+    _, _, df_binding = cl_stress_grid(df_source, shocks=())
+    expected = binding_constraint(calculate_concentration_limit(df_source))
+    assert df_binding.loc[0, 'Harga Saat Ini'] == expected[0] == 'EMITEN'
+    assert df_binding['Harga Saat Ini'].tolist() == expected.astype(str).tolist()
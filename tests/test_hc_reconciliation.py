@@ -0,0 +1,38 @@
+import pandas as pd
+
+from hc_reconciliation import (
+    COL_HC_KPEI_PUB, COL_KATEGORI, KATEGORI_PEI_KOSONG, KATEGORI_PEI_LEBIH_RENDAH, KATEGORI_SAMA,
+    haircut_fraction, reconcile_haircut,
+)
+
+
+def test_forced_full_haircut_in_percent_column():
+    # kolom 0-100, saham CCCC CL = 0 -> haircut dipaksa 1.0 (= 100%)
+    df_hasil = pd.DataFrame({
+        'KODE EFEK': ['AAAA', 'BBBB', 'CCCC'],
+        'HAIRCUT PEI USULAN DIVISI': [30.0, 50.0, 1.0],
+    })
+    df_kpei = pd.DataFrame({'KODE EFEK': ['AAAA', 'BBBB', 'CCCC'], COL_HC_KPEI_PUB: [0.3, 0.5, 1.0]})
+
+    df_recon, _ = reconcile_haircut(df_hasil, df_kpei)
+    assert (df_recon[COL_KATEGORI] == KATEGORI_SAMA).all()
+    assert df_recon.set_index('KODE EFEK').loc['CCCC', 'HAIRCUT PEI USULAN DIVISI'] == 1.0
+
+
+def test_haircut_fraction_scales():
+    assert haircut_fraction(pd.Series([0.3, 1.0])).tolist() == [0.3, 1.0]
+    assert haircut_fraction(pd.Series([30.0, 1.0])).tolist() == [0.3, 0.01]
+    assert haircut_fraction(pd.Series([30.0, 1.0]), forced_full=True).tolist() == [0.3, 1.0]
+
+
+def test_empty_or_non_numeric_pei_haircut_has_own_category():
+    df_hasil = pd.DataFrame({
+        'KODE EFEK': ['AAAA', 'BBBB', 'CCCC'],
+        'HAIRCUT PEI USULAN DIVISI': [0.2, None, 'n/a'],
+    })
+    df_kpei = pd.DataFrame({'KODE EFEK': ['AAAA', 'BBBB', 'CCCC'], COL_HC_KPEI_PUB: [0.3, 0.3, 0.3]})
+
+    df_recon, _ = reconcile_haircut(df_hasil, df_kpei)
+    kategori = df_recon.set_index('KODE EFEK')[COL_KATEGORI]
+    assert kategori['AAAA'] == KATEGORI_PEI_LEBIH_RENDAH
+    assert kategori['BBBB'] == kategori['CCCC'] == KATEGORI_PEI_KOSONG
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from holdings_index import HoldingsIndex
+from ll_engine import FIRST_LARGERST_COL, SECOND_LARGERST_COL, top_two_holders
+from ll_intraday import IntradayLLState
+
+
+def _stock_position(rng, n=3000, n_stocks=40, n_accounts=60):
+    """Stock Position Detail sintetis: kolom A akun, B kode saham, K quantity; akun bisa punya >1 baris per saham."""
+    df = pd.DataFrame({f'C{i}': 0 for i in range(11)}, index=range(n))
+    df['C0'] = [f'ACC{a:03d}' for a in rng.integers(0, n_accounts, n)]
+    df['C1'] = [f'S{s:02d}' for s in rng.integers(0, n_stocks, n)]
+    df['C10'] = rng.integers(0, 50, n).astype(float) * 100
+    return df
+
+
+def _engine_top_two(df_sp):
+    return top_two_holders(df_sp, 'C1', 'C10').set_index('C1')
+
+
+def test_holdings_index_top2_matches_engine():
+    rng = np.random.default_rng(1)
+    df_sp = _stock_position(rng)
+    index = HoldingsIndex.from_stock_position(df_sp)
+    expected = _engine_top_two(df_sp)
+
+    for stock in index.stocks:
+        top = index.top_holders(stock, k=2)['Quantity'].tolist()
+        assert top + [0.0] * (2 - len(top)) == expected.loc[stock].tolist()
+
+    # rank 1/2 per akun harus konsisten dengan First/Second Largerst
+    ranks = pd.concat(
+        [index.stocks_where_top2(acc) for acc in index.accounts], ignore_index=True
+    )
+    for rank, col in ((1, FIRST_LARGERST_COL), (2, SECOND_LARGERST_COL)):
+        sel = ranks[ranks['Rank'] == rank].set_index('Stock Code')['Quantity']
+        assert sel.index.is_unique
+        np.testing.assert_allclose(sel.to_numpy(), expected.loc[sel.index, col].to_numpy())
+
+
+def test_rebuilt_from_intraday_state_matches_post_delta_aggregates():
+    rng = np.random.default_rng(5)
+    df_sp = _stock_position(rng)
+    top = _engine_top_two(df_sp)
+    state = IntradayLLState(pd.DataFrame({
+        'Stock Code': top.index, 'Stock Name': '',
+        'Quantity On Hand': df_sp.groupby('C1')['C10'].sum().reindex(top.index).to_numpy(),
+        FIRST_LARGERST_COL: top[FIRST_LARGERST_COL].to_numpy(),
+        SECOND_LARGERST_COL: top[SECOND_LARGERST_COL].to_numpy(),
+        'REPO_Base': 0.0, 'Borrow Position': 0.0,
+    }), df_sp)
+    pairs = df_sp[['C1', 'C0']].drop_duplicates().sample(150, random_state=6)
+    state.apply_delta(pd.DataFrame({
+        'Stock Code': pairs['C1'].to_numpy(), 'Account': pairs['C0'].to_numpy(),
+        'Quantity': rng.integers(0, 80, len(pairs)) * 100.0,
+    }))
+
+    index = HoldingsIndex.from_intraday(state)
+    agg = state.aggregates().set_index('Stock Code')
+    for stock in index.stocks:
+        top2 = index.top_holders(stock, k=2)['Quantity'].tolist()
+        assert top2 + [0.0] * (2 - len(top2)) == agg.loc[stock, [FIRST_LARGERST_COL, SECOND_LARGERST_COL]].tolist()
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ll_engine import (
+    FIRST_LARGERST_COL, SECOND_LARGERST_COL, build_ll_aggregates, top_k_per_group, top_two_holders,
+    unmatched_borrow_position,
+)
+
+
+def _reference_top_two(df_sp, stock_col, qty_col):
+    """Jalur lama halaman LL: groupby + sorted()[:2] per saham."""
+    top_values = (
+        df_sp.groupby(stock_col)[qty_col]
+        .apply(lambda x: sorted(x.dropna(), reverse=True)[:2])
+        .reset_index()
+    )
+    top_values[FIRST_LARGERST_COL] = top_values[qty_col].apply(lambda x: x[0] if len(x) > 0 else 0)
+    top_values[SECOND_LARGERST_COL] = top_values[qty_col].apply(lambda x: x[1] if len(x) > 1 else 0)
+    return top_values.drop(columns=[qty_col])
+
+
+def _assert_same(df_sp):
+    got = top_two_holders(df_sp, 'Stock', 'Qty')
+    ref = _reference_top_two(df_sp, 'Stock', 'Qty')
+    pd.testing.assert_frame_equal(
+        got.reset_index(drop=True), ref.reset_index(drop=True), check_dtype=False
+    )
+
+
+def test_ties_nan_keys_and_values():
+    df_sp = pd.DataFrame({
+        'Stock': ['AAAA', 'AAAA', 'AAAA', 'BBBB', 'BBBB', np.nan, 'CCCC', 'DDDD', 'DDDD', 'EEEE'],
+        'Qty':   [500.0,  500.0,  300.0,  np.nan, 200.0,  999.0,  np.nan, 100.0,  100.0,  0.0],
+    })
+    got = top_two_holders(df_sp, 'Stock', 'Qty').set_index('Stock')
+
+    assert got.loc['AAAA'].tolist() == [500.0, 500.0]      # tie dihitung dua kali
+    assert got.loc['BBBB'].tolist() == [200.0, 0.0]        # NaN diabaikan
+    assert got.loc['CCCC'].tolist() == [0.0, 0.0]          # hanya NaN -> tetap ada, nol
+    assert got.loc['DDDD'].tolist() == [100.0, 100.0]
+    assert got.loc['EEEE'].tolist() == [0.0, 0.0]
+    assert 999.0 not in got.to_numpy()                     # kunci NaN dibuang
+    _assert_same(df_sp)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_matches_groupby_reference(seed):
+    rng = np.random.default_rng(seed)
+    n = 5000
+    stocks = np.array([f'S{i:03d}' for i in range(300)] + [None], dtype=object)
+    qty = rng.integers(0, 20, n).astype(float)             # rentang kecil -> banyak tie
+    qty[rng.random(n) < 0.05] = np.nan
+    df_sp = pd.DataFrame({'Stock': stocks[rng.integers(0, len(stocks), n)], 'Qty': qty})
+    _assert_same(df_sp)
+
+
+def test_top_k_fill_value_and_order():
+    uniques, top = top_k_per_group(['X', 'Y', 'X', 'X'], [1.0, 7.0, 3.0, 2.0], k=3, fill_value=-1.0)
+    assert list(uniques) == ['X', 'Y']
+    assert top.tolist() == [[3.0, 2.0, 1.0], [7.0, -1.0, -1.0]]
+
+
+def test_borrow_position_merge_normalises_codes():
+    df_sp = pd.DataFrame({f'c{i}': [0] * 2 for i in range(11)})
+    df_sp['c1'] = ['AAAA', 'BBBB']
+    df_sp['c10'] = [1000, 500]
+    df_instr = pd.DataFrame({
+        'Local Code': ['AAAA', 'BBBB'], 'Used Loan Qty': [0, 0], 'Used Reverse Repo Qty': [0, 0],
+    })
+    df_lookup = pd.DataFrame({'Stock Code': ['AAAA', 'BBBB'], 'Stock Name': ['A', 'B']})
+    df_bp = pd.DataFrame({'Stock Code': ['aaaa ', 'AAAA', 'ZZZZ'], 'Borrow Position': [10, 5, 7]})
+
+    df_agg = build_ll_aggregates(df_sp, df_instr, df_lookup, df_bp)
+    assert df_agg.set_index('Stock Code')['Borrow Position'].to_dict() == {'AAAA': 15, 'BBBB': 0}
+    assert unmatched_borrow_position(df_agg, df_bp).to_dict() == {'ZZZZ': 7}
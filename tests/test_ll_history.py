@@ -0,0 +1,11 @@
+import numpy as np
+import pandas as pd
+
+from ll_history import load_ll_day, save_ll_run
+
+
+def test_missing_stock_name_stays_null(tmp_path):
+    db = str(tmp_path / 'll_history.sqlite')
+    df = pd.DataFrame({'Stock Code': ['AAAA', 'BBBB'], 'Stock Name': ['Alpha', np.nan]})
+    save_ll_run(df, '2025-01-02', db)
+    assert load_ll_day('2025-01-02', db)['Stock Name'].isna().tolist() == [False, True]
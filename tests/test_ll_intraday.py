@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+from ll_engine import (
+    FIRST_LARGERST_COL, SECOND_LARGERST_COL, compute_lendable_limit, split_ll_result, top_two_holders,
+)
+from ll_intraday import IntradayLLState
+
+
+def _stock_position(rng, n=3000, n_stocks=40, n_accounts=60):
+    """Stock Position Detail sintetis: kolom A akun, B kode saham, K quantity; akun bisa punya >1 baris per saham."""
+    df = pd.DataFrame({f'C{i}': 0 for i in range(11)}, index=range(n))
+    df['C0'] = [f'ACC{a:03d}' for a in rng.integers(0, n_accounts, n)]
+    df['C1'] = [f'S{s:02d}' for s in rng.integers(0, n_stocks, n)]
+    df['C10'] = rng.integers(0, 50, n).astype(float) * 100
+    return df
+
+
+def _engine_top_two(df_sp):
+    return top_two_holders(df_sp, 'C1', 'C10').set_index('C1')
+
+
+def _aggregates(df_sp):
+    top = _engine_top_two(df_sp)
+    return pd.DataFrame({
+        'Stock Code': top.index,
+        'Stock Name': '',
+        'Quantity On Hand': df_sp.groupby('C1')['C10'].sum().reindex(top.index).to_numpy(),
+        FIRST_LARGERST_COL: top[FIRST_LARGERST_COL].to_numpy(),
+        SECOND_LARGERST_COL: top[SECOND_LARGERST_COL].to_numpy(),
+        'REPO_Base': 0.0,
+        'Borrow Position': 0.0,
+    })
+
+
+def test_intraday_delta_reconciles_with_engine():
+    rng = np.random.default_rng(0)
+    df_sp = _stock_position(rng)
+    state = IntradayLLState(_aggregates(df_sp), df_sp)
+
+    # delta: posisi baru (absolut) untuk pasangan (saham, akun) yang sudah ada + akun baru
+    pairs = df_sp[['C1', 'C0']].drop_duplicates().sample(200, random_state=1)
+    df_delta = pd.DataFrame({
+        'Stock Code': np.r_[pairs['C1'].to_numpy(), ['S00', 'S01']],
+        'Account': np.r_[pairs['C0'].to_numpy(), ['NEW1', 'NEW2']],
+        'Quantity': np.r_[rng.integers(0, 80, len(pairs)) * 100.0, [1e6, 0.0]],
+    })
+    state.apply_delta(df_delta)
+
+    # referensi: baris akun di saham itu diganti satu baris posisi baru, lalu ll_engine penuh
+    replaced = df_sp.set_index(['C1', 'C0']).index.isin(df_delta.set_index(['Stock Code', 'Account']).index)
+    new_rows = pd.DataFrame({f'C{i}': 0 for i in range(11)}, index=range(len(df_delta)))
+    new_rows['C0'], new_rows['C1'], new_rows['C10'] = df_delta['Account'], df_delta['Stock Code'], df_delta['Quantity']
+    expected = _aggregates(pd.concat([df_sp[~replaced], new_rows], ignore_index=True)).set_index('Stock Code')
+
+    got = state.aggregates().set_index('Stock Code')
+    for col in ['Quantity On Hand', FIRST_LARGERST_COL, SECOND_LARGERST_COL]:
+        np.testing.assert_allclose(got[col].to_numpy(), expected.loc[got.index, col].to_numpy())
+
+
+def _static_total(df_agg):
+    _, df_static = split_ll_result(compute_lendable_limit(df_agg))
+    return df_static['Available Lendable Limit'].sum()
+
+
+def test_running_total_and_borrow_position_match_full_recompute():
+    rng = np.random.default_rng(2)
+    df_sp = _stock_position(rng)
+    df_agg = _aggregates(df_sp)
+    df_agg['REPO_Base'] = rng.integers(0, 1000, len(df_agg)) * 10.0
+    df_agg.loc[0, 'Stock Code'] = 'BEBS'          # blacklist tidak ikut total
+    state = IntradayLLState(df_agg, df_sp)
+    assert np.isclose(state.total_available, _static_total(state.aggregates()))
+
+    pairs = df_sp[['C1', 'C0']].drop_duplicates().sample(100, random_state=3)
+    state.apply_delta(pd.DataFrame({
+        'Stock Code': pairs['C1'].to_numpy(), 'Account': pairs['C0'].to_numpy(),
+        'Quantity': rng.integers(0, 80, len(pairs)) * 100.0,
+    }))
+    assert np.isclose(state.total_available, _static_total(state.aggregates()))
+
+    df_bp = pd.DataFrame({'Stock Code': [' s01', 'S02', 'S02'], 'Borrow Position': [500.0, 100.0, 50.0]})
+    df_changed = state.set_borrow_position(df_bp)
+    assert sorted(df_changed['Stock Code']) == ['S01', 'S02']
+    got = state.aggregates().set_index('Stock Code')['Borrow Position']
+    assert got['S01'] == 500.0 and got['S02'] == 150.0 and got.drop(['S01', 'S02']).eq(0).all()
+    assert np.isclose(state.total_available, _static_total(state.aggregates()))
+
+
+def test_codes_and_accounts_normalised_on_both_sides():
+    df_sp = pd.DataFrame({f'C{i}': 0 for i in range(11)}, index=range(3))
+    df_sp['C0'] = [101.0, 102.0, np.nan]          # kolom akun terbaca float
+    df_sp['C1'] = [' AAAA ', 'AAAA', 'AAAA']
+    df_sp['C10'] = [300.0, 200.0, 100.0]
+    state = IntradayLLState(pd.DataFrame({
+        'Stock Code': ['AAAA'], 'Stock Name': [''], 'Quantity On Hand': [600.0],
+        FIRST_LARGERST_COL: [300.0], SECOND_LARGERST_COL: [200.0], 'REPO_Base': [0.0], 'Borrow Position': [0.0],
+    }), df_sp)
+
+    state.apply_delta(pd.DataFrame({'Stock Code': ['aaaa'], 'Account': ['101'], 'Quantity': [50.0]}))
+    row = state.aggregates().iloc[0]
+    assert (row['Quantity On Hand'], row[FIRST_LARGERST_COL], row[SECOND_LARGERST_COL]) == (350.0, 200.0, 100.0)
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from stock_master import sync_cl_source
+
+
+def _source():
+    return pd.DataFrame({
+        'KODE EFEK': ['AAAA', 'BBBB', 'CCCC'],
+        'LISTED SHARES': [1e9, 2e9, 3e9],
+        'FREE FLOAT (DALAM LEMBAR)': [1e8, 2e8, 3e8],
+        'CLOSING PRICE': [100.0, 200.0, 300.0],
+    })
+
+
+def test_fill_from_master_is_opt_in_and_reported(tmp_path):
+    path = str(tmp_path / 'stock_master.csv')
+    sync_cl_source(_source(), path)
+
+    upload = _source()
+    upload.loc[1, 'CLOSING PRICE'] = np.nan
+    upload.loc[2, 'LISTED SHARES'] = np.nan
+
+    df, _, df_filled = sync_cl_source(upload, path)
+    assert df['CLOSING PRICE'].isna()[1] and df['LISTED SHARES'].isna()[2]
+    assert df_filled.empty
+
+    df, _, df_filled = sync_cl_source(upload, path, fill_from_master=True)
+    assert df.loc[1, 'CLOSING PRICE'] == 200.0 and df.loc[2, 'LISTED SHARES'] == 3e9
+    assert df_filled['KODE EFEK'].tolist() == ['BBBB', 'CCCC']
+    assert df_filled.loc[0, 'CLOSING PRICE'] == 200.0 and np.isnan(df_filled.loc[0, 'LISTED SHARES'])
+    assert df_filled['Updated'].notna().all()
+
+
+def test_updated_written_as_date(tmp_path):
+    path = tmp_path / 'stock_master.csv'
+    sync_cl_source(_source(), str(path))
+    updated = pd.read_csv(path)['Updated']
+    assert updated.str.fullmatch(r'\d{4}-\d{2}-\d{2}').all()